@@ -1,21 +1,25 @@
 import streamlit as st
+import asyncio
 import os
+import time
 import uuid
 
-from tempfile import NamedTemporaryFile
 from datetime import datetime
 
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.runnables import ConfigurableFieldSpec,RunnableLambda
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_openai import ChatOpenAI
-from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain.agents import create_tool_calling_agent
 
 # Import project modules
 #from utils import setup_database
-from utils import RAGManager
-from utils import setup_tools
+from utils.chat_history import TokenBudgetedChatMessageHistory
+from utils.parallel_agent import ParallelAgentExecutor
+from utils.python_workers import POOL_SIZE
+from utils.resources import (
+    finish_turn, get_agent_llm, get_chat_history_store, get_ingestion_queue, get_tools_for_user, record_run,
+    timing_report
+)
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -27,13 +31,7 @@ os.makedirs("fintech_app/data", exist_ok=True)
 # Configure page
 st.set_page_config(page_title="Siva Fintech Assistant", page_icon="💰", layout="wide")
 
-# Initialize LLM
-llm = ChatOpenAI(model="gpt-4o-mini")
-
 # Initialize session state
-if "store" not in st.session_state:
-    st.session_state.store = {}
-
 if "user_id" not in st.session_state:
     st.session_state.user_id = ""  
 
@@ -60,11 +58,29 @@ if "user_email" not in st.session_state:
 if "email_submitted" not in st.session_state:
     st.session_state.email_submitted = False
 
+if "streaming" not in st.session_state:
+    st.session_state.streaming = True
+
 # Chat message history management
-def get_session_history(user_id: str, conversation_id: str) -> ChatMessageHistory:
-    if (user_id, conversation_id) not in st.session_state.store:
-        st.session_state.store[(user_id, conversation_id)] = ChatMessageHistory()
-    return st.session_state.store[(user_id, conversation_id)]
+# History lives in SQLite, so it survives restarts and only a token-budgeted window is sent to the model
+def get_session_history(user_id: str, conversation_id: str) -> TokenBudgetedChatMessageHistory:
+    return get_chat_history_store().get_history(user_id, conversation_id)
+
+def load_saved_conversations(user_id):
+    """Restore a user's stored conversations into the sidebar."""
+    store = get_chat_history_store()
+    for conv_id in store.list_conversations(user_id):
+        if conv_id in st.session_state.conversations:
+            continue
+        st.session_state.conversation_counter += 1
+        st.session_state.conversations[conv_id] = {
+            "number": st.session_state.conversation_counter,
+            "messages": [
+                {"role": "user" if message.type == "human" else "assistant", "content": message.content}
+                for message in store.get_transcript(user_id, conv_id)
+                if message.type in ("human", "ai") and message.content
+            ]
+        }
 
 def create_new_conversation():
     st.session_state.conversation_counter += 1
@@ -78,6 +94,77 @@ def create_new_conversation():
 def switch_conversation(conv_id):
     st.session_state.current_conversation_id = conv_id
 
+async def _close_run(events):
+    """Close an event stream and cancel the tasks its run left behind, as asyncio.run does."""
+    await events.aclose()
+    pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+def iter_run_events(runnable, inputs, config):
+    """Yield the astream_events of a run to synchronous code, driving them on a private event loop.
+    
+    langchain-core 0.1 only has the async event stream (and only its v1 format). Closing the
+    generator, as a Streamlit rerun does, cancels the run.
+    """
+    loop = asyncio.new_event_loop()
+    events = runnable.astream_events(inputs, config=config, version="v1")
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(_close_run(events))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+def stream_agent_response(agent_executor_with_history, prompt, config, response_container, activity_container):
+    """Run the agent through its event stream, rendering tool activity and answer tokens as they arrive.
+    
+    Returns:
+        str: The final answer of the agent
+    """
+    answer = ""
+    final_output = None
+    activity = []
+    activity_lines = {}
+    tool_starts = {}
+    root_run_id = None
+    
+    for event in iter_run_events(agent_executor_with_history, {"input": prompt}, config):
+        kind = event["event"]
+        
+        if root_run_id is None and kind == "on_chain_start":
+            # The first run to start is the top-level one
+            root_run_id = event["run_id"]
+        elif kind == "on_tool_start":
+            tool_starts[event["run_id"]] = time.perf_counter()
+            activity_lines[event["run_id"]] = len(activity)
+            activity.append(f"🔧 Using `{event['name']}`...")
+            activity_container.markdown("\n\n".join(activity))
+        elif kind in ("on_tool_end", "on_tool_error"):
+            elapsed = time.perf_counter() - tool_starts.pop(event["run_id"], time.perf_counter())
+            icon = "✅" if kind == "on_tool_end" else "❌"
+            line = activity_lines.get(event["run_id"])
+            if line is not None:
+                activity[line] = f"{icon} `{event['name']}` ({elapsed:.1f}s)"
+                activity_container.markdown("\n\n".join(activity))
+        elif kind == "on_chat_model_stream" and "agent_answer" in event.get("tags", []):
+            content = event["data"]["chunk"].content
+            if isinstance(content, str) and content:
+                answer += content
+                response_container.markdown(answer + "▌")
+        elif kind == "on_chain_end" and event["run_id"] == root_run_id:
+            # End of the top-level run: this holds the agent's final output
+            output = event["data"].get("output")
+            if isinstance(output, dict):
+                final_output = output.get("output")
+    
+    return final_output if final_output is not None else answer
+
 def handle_chat_input(prompt, agent_executor_with_history):
     current_conv = st.session_state.conversations[st.session_state.current_conversation_id]
     current_conv["messages"].append({"role": "user", "content": prompt})
@@ -91,26 +178,58 @@ def handle_chat_input(prompt, agent_executor_with_history):
     }
     
     with st.chat_message("assistant", avatar="💰"):
+        activity_container = st.empty()
         response_container = st.empty()
         response_container.markdown("Thinking...")
         
+        if not st.session_state.streaming:
+            try:
+                result = agent_executor_with_history.invoke(
+                    {"input": prompt},
+                    config=config,
+                )
+                
+                response_container.markdown(result["output"])
+                current_conv["messages"].append({"role": "assistant", "content": result["output"]})
+                finish_turn(st.session_state.user_email)
+            except Exception as e:
+                response_container.markdown(f"Error: {str(e)}")
+                current_conv["messages"].append({"role": "assistant", "content": f"Error: {str(e)}"})
+                finish_turn(st.session_state.user_email, completed=False)
+            return
+        
+        # Clicking Stop triggers a Streamlit rerun, which interrupts the stream below
+        st.button("⏹ Stop", key=f"stop_{len(current_conv['messages'])}")
+        
+        completed = False
+        succeeded = False
         try:
-            result = agent_executor_with_history.invoke(
-                {"input": prompt},
-                config=config,
+            output = stream_agent_response(
+                agent_executor_with_history, prompt, config, response_container, activity_container
             )
-            
-            response_container.markdown(result["output"])
-            current_conv["messages"].append({"role": "assistant", "content": result["output"]})
+            response_container.markdown(output)
+            current_conv["messages"].append({"role": "assistant", "content": output})
+            completed = succeeded = True
         except Exception as e:
             response_container.markdown(f"Error: {str(e)}")
             current_conv["messages"].append({"role": "assistant", "content": f"Error: {str(e)}"})
-
-def setup_agent(tools):
+            completed = True
+        finally:
+            if not completed:
+                # The run was cancelled before the agent finished
+                current_conv["messages"].append({"role": "assistant", "content": "_Response cancelled._"})
+            finish_turn(st.session_state.user_email, completed=succeeded)
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def get_agent_for_user(user_email):
+    """Build the agent for one user once per process and reuse it across reruns and sessions."""
+    return setup_agent(get_tools_for_user(user_email), user_email)
+
+def setup_agent(tools, user_email):
     # Define agent prompt
-    system_message = f"""You are a personal finance assistant for user with email {st.session_state.user_email}.
+    system_message = f"""You are a personal finance assistant for user with email {user_email}.
 When querying the database for user data, always filter results using:
-WHERE email_id = '{st.session_state.user_email}'
+WHERE email_id = '{user_email}'
 
 You have access to tools to help with financial queries. Use these tools to provide accurate and helpful responses.
 
@@ -120,6 +239,9 @@ For each request:
 3. Use the tool to get the information needed
 4. Present the information in a clear, educational way
 
+When users ask about their spending, income or expenses by category or month, use the get_spending_summary tool instead of writing SQL.
+When users ask how their portfolio or investments are performing, use the get_portfolio_performance tool; it already computes every figure.
+For other questions about their transactions or portfolio, try the lookup_saved_query tool with the user's question before writing SQL.
 When users ask for financial advice, investment recommendations, or best practices, use the retrieve_financial_knowledge tool to get relevant information from our knowledge base.
 
 Always be helpful, clear, and educational in your responses. Explain financial concepts simply.
@@ -135,8 +257,15 @@ Never make up information - if you don't know or need more data, say so.
     ])
     
     # Create the agent using tool calling approach
-    agent = create_tool_calling_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+    agent = create_tool_calling_agent(get_agent_llm(), tools, prompt)
+    # Tool calls of one step run concurrently; Python calls share the user's session, so they run in order
+    agent_executor = ParallelAgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=True,
+        serial_tools=["python_calculator"],
+        tool_concurrency={"python_calculator": POOL_SIZE, "market_research": 4}
+    )
     
     # Create a combined runnable with message history
     agent_executor_with_history = RunnableWithMessageHistory(
@@ -169,31 +298,51 @@ def set_role(role):
         st.session_state.user_id = ""
     
 # Admin interface for uploading RAG content
-def show_admin_interface(rag_manager):
+def show_admin_interface(ingestion_queue):
     st.title("💰 Fintech Knowledge Administration")
     
     st.info("As an admin, you can upload financial knowledge that will be used to power the chatbot's responses.")
     
     # File upload option
-    st.subheader("Upload Knowledge File")
-    uploaded_file = st.file_uploader("Choose a text file", type=["txt"], key="file_uploader")
+    st.subheader("Upload Knowledge Files")
+    uploaded_files = st.file_uploader("Choose text or PDF files", type=["txt", "pdf"],
+                                      accept_multiple_files=True, key="file_uploader")
     
-    if uploaded_file:
-        # Save the uploaded file to a temporary file
-        with NamedTemporaryFile(delete=False, suffix=".txt") as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            temp_path = tmp_file.name
-        
-        # Process the file
-        if st.button("Process File"):
-            with st.spinner("Processing file..."):
-                result = rag_manager.add_document_from_file(temp_path)
-                st.success(result)
-            
-            # Clean up the temporary file
-            os.unlink(temp_path)
+    # Files are queued and processed in the background, one after another
+    if uploaded_files and st.button("Process Files"):
+        for uploaded_file in uploaded_files:
+            ingestion_queue.submit(uploaded_file.getvalue(), uploaded_file.name)
+        st.success(f"Queued {len(uploaded_files)} file(s) for processing.")
     
+    show_ingestion_jobs(ingestion_queue)
 
+def show_ingestion_jobs(ingestion_queue):
+    """Show recent ingestion jobs, polling while any of them is still queued or running."""
+    jobs = ingestion_queue.list_jobs()
+    if not jobs:
+        return
+    
+    st.subheader("Processing Jobs")
+    for job in jobs:
+        if job["status"] == "queued":
+            st.caption(f"⏳ {job['source']}: queued")
+        elif job["status"] == "running":
+            if job["pages_total"]:
+                fraction = min(job["pages_done"] / job["pages_total"], 1.0)
+                text = f"{job['source']}: page {job['pages_done']}/{job['pages_total']}, {job['chunks_stored']} chunks stored"
+            else:
+                fraction = 0.5
+                text = f"{job['source']}: {job['chunks_stored']} chunks stored"
+            st.progress(fraction, text=text)
+        elif job["status"] == "done":
+            st.caption(f"✅ {job['source']}: added {job['chunks_stored']} chunks "
+                       f"({job['chunks_skipped']} unchanged chunks skipped)")
+        else:
+            st.caption(f"❌ {job['source']}: {job['error']}")
+    
+    if ingestion_queue.has_active_jobs():
+        time.sleep(1)
+        st.rerun()
 
 # User interface for chatting with the assistant
 def show_user_interface(agent_executor_with_history):
@@ -290,19 +439,37 @@ def submit_email(email):
         st.session_state.user_email = email
         st.session_state.user_id = email  # Use email as the user_id
         st.session_state.email_submitted = True
+        load_saved_conversations(email)
         return True
     else:
         return False
 
+def show_timing_report():
+    """Show cold vs warm rerun latency in the sidebar."""
+    report = timing_report()
+    with st.sidebar.expander("Startup timing"):
+        if report["cold_run_seconds"] is not None:
+            st.caption(f"Cold run: {report['cold_run_seconds']:.2f}s")
+        if report["last_warm_run_seconds"] is not None:
+            st.caption(f"Last warm rerun: {report['last_warm_run_seconds']:.3f}s "
+                       f"(median {report['median_warm_run_seconds']:.3f}s over {report['warm_runs']} runs)")
+        for name, seconds in report["build_seconds"].items():
+            st.caption(f"Built {name} in {seconds:.2f}s")
+
 # Main app
 def main():
+    run_start = time.perf_counter()
+    
     # Set up components
+    # Heavy resources are built once per process and shared across reruns and sessions
     #db = setup_database()
-    rag_manager = RAGManager("fintech_app/data/chroma_db")
+    ingestion_queue = get_ingestion_queue()
+    
+    # Set up agent with tools including SQL toolkit; only the user-specific parts are per user
+    agent_executor_with_history = get_agent_for_user(st.session_state.user_email)
     
-    # Set up agent with tools including SQL toolkit
-    tools = setup_tools(rag_manager, llm=llm, user_email=st.session_state.user_email)
-    agent_executor_with_history = setup_agent(tools)
+    record_run(time.perf_counter() - run_start)
+    show_timing_report()
     
     # Add role selector in sidebar
     with st.sidebar:
@@ -312,9 +479,10 @@ def main():
         if selected_role != st.session_state.role:
             set_role(selected_role)
             st.rerun()
+        st.session_state.streaming = st.toggle("Stream responses", value=st.session_state.streaming)
     # Show interface based on role
     if st.session_state.role == "admin":
-        show_admin_interface(rag_manager)
+        show_admin_interface(ingestion_queue)
     else:
         show_user_interface(agent_executor_with_history)
 
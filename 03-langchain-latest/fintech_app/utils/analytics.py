@@ -0,0 +1,290 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .spending import parse_period
+
+ANALYSES = ("by_category", "monthly", "rolling", "mom", "top", "outliers")
+
+
+def _month_index(month: str) -> int:
+    year, month_number = map(int, month.split("-"))
+    return year * 12 + month_number - 1
+
+
+def _month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+class _UserFrame:
+    """One user's transactions as NumPy columns sorted by date, plus their daily spend per category.
+
+    Categories and descriptions are stored as integer codes into a list of
+    names, so grouping by them is a bincount.
+    """
+
+    def __init__(self, version: tuple, rows: pd.DataFrame):
+        self.version = version
+        self.categories = list(rows["category"].cat.categories)
+        self.descriptions = list(rows["description"].cat.categories)
+        self.category = rows["category"].cat.codes.to_numpy().astype(np.intp)
+        self.description = rows["description"].cat.codes.to_numpy().astype(np.intp)
+        self.day = rows["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        self.month = rows["month"].to_numpy()
+        self.amount = rows["amount"].to_numpy()
+        self.spend = np.where(self.amount < 0, -self.amount, 0.0)
+        self.income = np.where(self.amount > 0, self.amount, 0.0)
+        self.dates = rows["date"].dt.strftime("%Y-%m-%d").to_numpy() if len(rows) else np.array([], dtype=object)
+
+        # Monthly totals per category answer by_category without touching the rows
+        n_categories = max(len(self.categories), 1)
+        monthly_keys, inverse = np.unique(self.month * n_categories + self.category, return_inverse=True)
+        self.monthly_month = monthly_keys // n_categories
+        self.monthly_category = monthly_keys % n_categories
+        self.monthly_spend = np.bincount(inverse, weights=self.spend, minlength=len(monthly_keys))
+        self.monthly_income = np.bincount(inverse, weights=self.income, minlength=len(monthly_keys))
+        self.monthly_count = np.bincount(inverse, minlength=len(monthly_keys))
+
+        # Daily spend per category is much smaller than the rows, and answers the monthly, rolling and MoM analyses
+        spending = self.spend > 0
+        keys = self.day[spending] * len(self.categories) + self.category[spending]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        self.daily_spend = np.bincount(inverse, weights=self.spend[spending]) if len(keys) else np.zeros(0)
+        self.daily_day = unique_keys // max(len(self.categories), 1)
+        self.daily_category = unique_keys % max(len(self.categories), 1)
+        daily_dates = self.daily_day.astype("datetime64[D]")
+        years = daily_dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        months = daily_dates.astype("datetime64[M]").astype(np.int64) % 12
+        self.daily_month = years * 12 + months
+
+
+class SpendingAnalytics:
+    """Vectorized spending analyses over cached, columnar copies of each user's transactions.
+
+    A user's transactions are read from SQLite once and kept as NumPy columns
+    sorted by date, with monthly and daily totals per category. The columns
+    are reloaded only when the data version of the database changes: the
+    transactions row of table_versions when the version triggers are installed,
+    otherwise SQLite's PRAGMA data_version. Every analysis is then a handful of
+    vectorized operations on the cached columns or totals.
+    """
+
+    def __init__(self, db_path: str, table: str = "transactions", user_column: Optional[str] = None,
+                 max_users: int = 64):
+        """Open the database.
+
+        Args:
+            db_path: Path to the SQLite database
+            table: Table with date, amount, category and description columns
+            user_column: Column holding the user's email, or None if the table belongs to one user
+            max_users: Users whose frames are kept in memory
+        """
+        self.db_path = db_path
+        self.table = table
+        self.user_column = user_column
+        self.max_users = max_users
+
+        self.loads = 0
+        self.queries = 0
+        self._frames: "OrderedDict[str, _UserFrame]" = OrderedDict()
+        # A long-lived connection, since PRAGMA data_version only reports commits made by other connections
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def _data_version(self) -> tuple:
+        try:
+            row = self._conn.execute("SELECT version FROM table_versions WHERE table_name = ?",
+                                     (self.table,)).fetchone()
+            if row is not None:
+                return ("table", row[0])
+        except sqlite3.OperationalError:
+            pass
+        return ("database", self._conn.execute("PRAGMA data_version").fetchone()[0])
+
+    def _load(self, user: Optional[str], version: tuple) -> _UserFrame:
+        query = f'SELECT date, amount, category, description FROM "{self.table}"'
+        params = ()
+        if self.user_column:
+            query += f' WHERE "{self.user_column}" = ?'
+            params = (user,)
+        rows = pd.read_sql_query(query, self._conn, params=params)
+        rows["date"] = pd.to_datetime(rows["date"], errors="coerce")
+        rows = rows.dropna(subset=["date", "amount"]).sort_values("date", kind="stable").reset_index(drop=True)
+        rows["amount"] = rows["amount"].astype(np.float64)
+        rows["category"] = rows["category"].fillna("Uncategorized").astype("category")
+        rows["description"] = rows["description"].fillna("").astype("category")
+        rows["month"] = rows["date"].dt.year * 12 + rows["date"].dt.month - 1
+        self.loads += 1
+        return _UserFrame(version, rows)
+
+    def frame(self, user: Optional[str] = None) -> _UserFrame:
+        """Get a user's cached frame, reloading it if the data changed since it was read."""
+        key = user or ""
+        with self._lock:
+            version = self._data_version()
+            cached = self._frames.get(key)
+            if cached is None or cached.version != version:
+                cached = self._load(user, version)
+                self._frames[key] = cached
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_users:
+                self._frames.popitem(last=False)
+            return cached
+
+    def analyze(self, analysis: str = "by_category", user: Optional[str] = None, category: Optional[str] = None,
+                period: Optional[str] = "all", top_n: int = 10, z_threshold: float = 2.5,
+                today: Optional[date] = None) -> str:
+        """Run one analysis of a user's spending.
+
+        Args:
+            analysis: One of ANALYSES
+            user: Email of the user, if the table holds several users
+            category: Optional category to restrict the analysis to
+            period: Period to analyze (see spending.parse_period)
+            top_n: Rows returned by the top and outliers analyses
+            z_threshold: Minimum absolute z-score of an outlier within its category
+
+        Returns:
+            str: The result as a markdown table or text for the agent
+        """
+        if analysis not in ANALYSES:
+            raise ValueError(f"Unknown analysis '{analysis}'. Use one of {', '.join(ANALYSES)}.")
+        data = self.frame(user)
+        with self._lock:
+            self.queries += 1
+        first_month, last_month = parse_period(period or "all", today)
+        low, high = _month_index(first_month), _month_index(last_month)
+
+        # Rows and daily totals are sorted by date, so a period is a slice found by binary search
+        rows = slice(np.searchsorted(data.month, low, "left"), np.searchsorted(data.month, high, "right"))
+        daily = slice(np.searchsorted(data.daily_month, low, "left"), np.searchsorted(data.daily_month, high, "right"))
+        row_mask = np.ones(rows.stop - rows.start, dtype=bool)
+        daily_mask = np.ones(daily.stop - daily.start, dtype=bool)
+        if category:
+            codes = [code for code, name in enumerate(data.categories) if name.lower() == category.lower()]
+            code = codes[0] if codes else -1
+            row_mask = data.category[rows] == code
+            daily_mask = data.daily_category[daily] == code
+        if not row_mask.any():
+            return f"No transactions found for {category or 'any category'} in this period."
+        n_categories = len(data.categories)
+
+        if analysis == "by_category":
+            months = slice(np.searchsorted(data.monthly_month, low, "left"),
+                           np.searchsorted(data.monthly_month, high, "right"))
+            month_categories = data.monthly_category[months]
+            result = pd.DataFrame({
+                "spent": np.bincount(month_categories, weights=data.monthly_spend[months], minlength=n_categories),
+                "income": np.bincount(month_categories, weights=data.monthly_income[months], minlength=n_categories),
+                "transactions": np.bincount(month_categories, weights=data.monthly_count[months],
+                                            minlength=n_categories),
+            }, index=pd.Index(data.categories, name="category"))
+            if category:
+                result = result[[name.lower() == category.lower() for name in data.categories]]
+            result = result[result["transactions"] > 0].sort_values("spent", ascending=False)
+            result["share_%"] = result["spent"] / (result["spent"].sum() or 1.0) * 100
+            return result.to_markdown(floatfmt=("", ",.2f", ",.2f", ",.0f", ",.1f"))
+
+        daily_spend = data.daily_spend[daily][daily_mask]
+        if not len(daily_spend):
+            return f"No spending found for {category or 'any category'} in this period."
+        daily_months = data.daily_month[daily][daily_mask]
+        daily_categories = data.daily_category[daily][daily_mask]
+        daily_days = data.daily_day[daily][daily_mask]
+
+        if analysis in ("monthly", "mom"):
+            first = daily_months[0]
+            n_months = daily_months[-1] - first + 1
+            matrix = np.bincount((daily_months - first) * n_categories + daily_categories, weights=daily_spend,
+                                 minlength=n_months * n_categories).reshape(n_months, n_categories)
+            used = matrix.any(axis=0)
+            monthly = pd.DataFrame(matrix[:, used], columns=np.array(data.categories, dtype=object)[used],
+                                   index=[_month_label(first + i) for i in range(n_months)])
+            monthly["Total"] = monthly.sum(axis=1)
+            if analysis == "monthly":
+                return monthly.to_markdown(floatfmt=",.2f")
+            if n_months < 2:
+                return f"Only one month of spending ({monthly.index[0]}); nothing to compare."
+            current, previous = monthly.iloc[-1], monthly.iloc[-2]
+            result = pd.DataFrame({monthly.index[-2]: previous, monthly.index[-1]: current,
+                                   "change": current - previous})
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result["change_%"] = np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+            return result.to_markdown(floatfmt=",.2f")
+
+        if analysis == "rolling":
+            first = daily_days[0]
+            per_day = np.bincount(daily_days - first, weights=daily_spend)
+            cumulative = np.concatenate(([0.0], np.cumsum(per_day)))
+            ends = np.arange(1, len(per_day) + 1)
+            rolling = pd.DataFrame({
+                "rolling_30d": cumulative[ends] - cumulative[np.maximum(ends - 30, 0)],
+                "rolling_90d": cumulative[ends] - cumulative[np.maximum(ends - 90, 0)],
+            }, index=(first + ends - 1).astype("datetime64[D]"))
+            # Value on the last day of each month (or the last day with data)
+            months = rolling.index.to_numpy().astype("datetime64[M]")
+            month_ends = rolling[np.append(months[1:] != months[:-1], True)].tail(top_n)
+            month_ends.index = month_ends.index.strftime("%Y-%m-%d")
+            return month_ends.to_markdown(floatfmt=",.2f")
+
+        spending = np.flatnonzero(row_mask & (data.spend[rows] > 0)) + rows.start
+        if analysis == "top":
+            descriptions = data.description[spending]
+            n_descriptions = len(data.descriptions)
+            spent = np.bincount(descriptions, weights=data.spend[spending], minlength=n_descriptions)
+            counts = np.bincount(descriptions, minlength=n_descriptions)
+            # Rows are sorted by date, so the last row of a description is its latest
+            last_row = np.full(n_descriptions, -1)
+            last_row[descriptions] = spending
+            top = np.argsort(-spent)[:top_n]
+            top = top[counts[top] > 0]
+            result = pd.DataFrame({"spent": spent[top], "transactions": counts[top],
+                                   "last_date": data.dates[last_row[top]]},
+                                  index=pd.Index(np.array(data.descriptions, dtype=object)[top], name="description"))
+            return result.to_markdown(floatfmt=("", ",.2f", ",.0f", ""))
+
+        # outliers: transactions far from the mean spend of their category
+        categories, spend = data.category[spending], data.spend[spending]
+        counts = np.bincount(categories, minlength=n_categories)
+        mean = np.bincount(categories, weights=spend, minlength=n_categories) / np.maximum(counts, 1)
+        squares = np.bincount(categories, weights=(spend - mean[categories]) ** 2, minlength=n_categories)
+        std = np.sqrt(squares / np.maximum(counts - 1, 1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(std[categories] > 0, (spend - mean[categories]) / std[categories], 0.0)
+        found = np.flatnonzero(np.abs(z) >= z_threshold)
+        if not len(found):
+            return f"No transactions with a z-score of {z_threshold} or more within their category."
+        found = found[np.argsort(-np.abs(z[found]), kind="stable")[:top_n]]
+        picked = spending[found]
+        result = pd.DataFrame({
+            "date": data.dates[picked],
+            "category": np.array(data.categories, dtype=object)[data.category[picked]],
+            "description": np.array(data.descriptions, dtype=object)[data.description[picked]],
+            "amount": data.amount[picked],
+            "z_score": z[found],
+        })
+        return result.to_markdown(index=False, floatfmt=",.2f")
+
+    def stats(self) -> Dict[str, int]:
+        """Return load and query counts for the analytics service."""
+        with self._lock:
+            return {"users_cached": len(self._frames), "loads": self.loads, "queries": self.queries}
+
+
+_shared_services: Dict[tuple, SpendingAnalytics] = {}
+_shared_lock = threading.Lock()
+
+
+def get_spending_analytics(db_path: str, table: str = "transactions",
+                           user_column: Optional[str] = None) -> SpendingAnalytics:
+    """Get the process-wide analytics service for a table."""
+    key = (db_path, table, user_column)
+    with _shared_lock:
+        if key not in _shared_services:
+            _shared_services[key] = SpendingAnalytics(db_path, table, user_column)
+        return _shared_services[key]
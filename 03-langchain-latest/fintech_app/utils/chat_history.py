@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import List, Sequence
+
+import tiktoken
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import (
+    BaseMessage,
+    SystemMessage,
+    get_buffer_string,
+    message_to_dict,
+    messages_from_dict,
+)
+
+SUMMARY_PROMPT = """Progressively summarize the conversation between a user and their personal finance assistant.
+Extend the current summary with the new lines and return only the new summary.
+Keep facts the assistant may need later: amounts, tickers, goals, preferences and open questions.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
+
+
+class ChatHistoryStore:
+    """Durable chat history keyed by (user_id, conversation_id), stored in SQLite.
+
+    Every message is kept on disk with its token count. When the unsummarized
+    part of a conversation grows past the token budget, the oldest turns are
+    folded into a stored running summary, so the history sent to the model
+    stays roughly constant in size no matter how long the conversation gets.
+    """
+
+    def __init__(self, db_path: str = "fintech_app/data/chat_history.db", token_budget: int = 2000,
+                 summary_llm=None, encoding_name: str = "cl100k_base"):
+        """Initialize the chat history store.
+
+        Args:
+            db_path: SQLite file where messages and summaries are stored
+            token_budget: Maximum number of tokens of history sent to the model
+            summary_llm: Optional LLM used to fold older turns into a running summary.
+                         Without it, older turns are simply left out of the window.
+            encoding_name: tiktoken encoding used to count tokens
+        """
+        self.db_path = db_path
+        self.token_budget = token_budget
+        self.summary_llm = summary_llm
+        self.encoding = tiktoken.get_encoding(encoding_name)
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                conversation_id TEXT,
+                message TEXT,
+                tokens INTEGER,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+            conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_chat_messages_conversation
+            ON chat_messages (user_id, conversation_id, id)
+            ''')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS chat_summaries (
+                user_id TEXT,
+                conversation_id TEXT,
+                summary TEXT,
+                summarized_through INTEGER,
+                PRIMARY KEY (user_id, conversation_id)
+            )
+            ''')
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_history(self, user_id: str, conversation_id: str) -> "TokenBudgetedChatMessageHistory":
+        """Get the chat history for one conversation."""
+        return TokenBudgetedChatMessageHistory(self, user_id, conversation_id)
+
+    def count_tokens(self, message: BaseMessage) -> int:
+        # A few extra tokens per message for the role and separators
+        return len(self.encoding.encode(get_buffer_string([message]), disallowed_special=())) + 4
+
+    def list_conversations(self, user_id: str) -> List[str]:
+        """List a user's conversation ids, oldest first."""
+        with self.connect() as conn:
+            rows = conn.execute('''
+            SELECT conversation_id FROM chat_messages WHERE user_id = ?
+            GROUP BY conversation_id ORDER BY MIN(id)
+            ''', (user_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def get_transcript(self, user_id: str, conversation_id: str) -> List[BaseMessage]:
+        """Get every stored message of a conversation, including summarized ones."""
+        with self.connect() as conn:
+            rows = conn.execute('''
+            SELECT message FROM chat_messages WHERE user_id = ? AND conversation_id = ? ORDER BY id
+            ''', (user_id, conversation_id)).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+
+class TokenBudgetedChatMessageHistory(BaseChatMessageHistory):
+    """Chat history for one conversation that fits its messages into a token budget."""
+
+    def __init__(self, store: ChatHistoryStore, user_id: str, conversation_id: str):
+        self.store = store
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        """The running summary (if any) followed by the newest messages that fit the budget."""
+        summary, summarized_through = self._get_summary()
+        budget = self.store.token_budget
+        if summary:
+            budget -= len(self.store.encoding.encode(summary, disallowed_special=()))
+
+        window = []
+        with self.store.connect() as conn:
+            rows = conn.execute('''
+            SELECT message, tokens FROM chat_messages
+            WHERE user_id = ? AND conversation_id = ? AND id > ?
+            ORDER BY id DESC
+            ''', (self.user_id, self.conversation_id, summarized_through))
+            for message, tokens in rows:
+                if window and tokens > budget:
+                    break
+                window.append(json.loads(message))
+                budget -= tokens
+
+        messages = messages_from_dict(list(reversed(window)))
+        if summary:
+            messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation: {summary}"))
+        return messages
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """Store new messages, then fold older turns into the summary if over budget."""
+        with self.store.connect() as conn:
+            conn.executemany('''
+            INSERT INTO chat_messages (user_id, conversation_id, message, tokens) VALUES (?, ?, ?, ?)
+            ''', [(self.user_id, self.conversation_id, json.dumps(message_to_dict(message)),
+                   self.store.count_tokens(message)) for message in messages])
+        if self.store.summary_llm is not None:
+            self._fold_into_summary()
+
+    def clear(self) -> None:
+        with self.store.connect() as conn:
+            conn.execute("DELETE FROM chat_messages WHERE user_id = ? AND conversation_id = ?",
+                         (self.user_id, self.conversation_id))
+            conn.execute("DELETE FROM chat_summaries WHERE user_id = ? AND conversation_id = ?",
+                         (self.user_id, self.conversation_id))
+
+    def _get_summary(self):
+        with self.store.connect() as conn:
+            row = conn.execute('''
+            SELECT summary, summarized_through FROM chat_summaries WHERE user_id = ? AND conversation_id = ?
+            ''', (self.user_id, self.conversation_id)).fetchone()
+        return row if row else ("", 0)
+
+    def _fold_into_summary(self) -> None:
+        summary, summarized_through = self._get_summary()
+        with self.store.connect() as conn:
+            rows = conn.execute('''
+            SELECT id, message, tokens FROM chat_messages
+            WHERE user_id = ? AND conversation_id = ? AND id > ?
+            ORDER BY id
+            ''', (self.user_id, self.conversation_id, summarized_through)).fetchall()
+
+        total = sum(tokens for _, _, tokens in rows)
+        if total <= self.store.token_budget:
+            return
+
+        # Fold the oldest turns until only half the budget is left unsummarized,
+        # so the summary LLM is called once every few turns rather than every turn
+        to_fold = []
+        for message_id, message, tokens in rows[:-1]:
+            if total <= self.store.token_budget // 2:
+                break
+            to_fold.append((message_id, json.loads(message)))
+            total -= tokens
+        if not to_fold:
+            return
+
+        new_lines = get_buffer_string(messages_from_dict([message for _, message in to_fold]))
+        response = self.store.summary_llm.invoke(
+            SUMMARY_PROMPT.format(summary=summary or "(none)", new_lines=new_lines)
+        )
+        with self.store.connect() as conn:
+            conn.execute('''
+            INSERT OR REPLACE INTO chat_summaries (user_id, conversation_id, summary, summarized_through)
+            VALUES (?, ?, ?, ?)
+            ''', (self.user_id, self.conversation_id, str(response.content).strip(), to_fold[-1][0]))
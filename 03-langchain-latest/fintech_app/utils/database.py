@@ -2,15 +2,28 @@ import sqlite3
 import random
 from datetime import datetime, timedelta
 
-from langchain_community.utilities import SQLDatabase
-from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
 from langchain_core.language_models.base import BaseLanguageModel
 
-def setup_database():
-    """Set up SQLite database for transaction history and investment portfolio"""
-    conn = sqlite3.connect('fintech_app/data/finance_data.db')
-    c = conn.cursor()
-    
+from .migrations import migrate
+from .sql_engine import CachedSQLDatabaseToolkit, get_sql_database
+
+CATEGORIES = ['Income', 'Food', 'Utilities', 'Transportation', 'Housing', 'Entertainment', 'Healthcare', 'Shopping', 'Education']
+DESCRIPTIONS = {
+    'Income': ['Salary', 'Freelance work', 'Investment returns', 'Side hustle', 'Bonus'],
+    'Food': ['Grocery shopping', 'Restaurant', 'Coffee shop', 'Food delivery', 'Lunch'],
+    'Utilities': ['Electricity bill', 'Water bill', 'Internet bill', 'Phone bill', 'Gas bill'],
+    'Transportation': ['Gas', 'Uber ride', 'Public transport', 'Car maintenance', 'Parking fee'],
+    'Housing': ['Rent', 'Mortgage', 'Home repairs', 'Furniture', 'Home insurance'],
+    'Entertainment': ['Streaming service', 'Movie tickets', 'Concert', 'Video games', 'Books'],
+    'Healthcare': ['Doctor visit', 'Prescription', 'Health insurance', 'Gym membership', 'Therapy'],
+    'Shopping': ['Clothes', 'Electronics', 'Gifts', 'Home goods', 'Personal care'],
+    'Education': ['Tuition', 'Textbooks', 'Online course', 'Workshop', 'Certification']
+}
+STOCK_SYMBOLS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA', 'NVDA', 'JPM', 'V', 'WMT',
+                 'DIS', 'NFLX', 'PYPL', 'ADBE', 'CRM', 'CSCO', 'INTC', 'AMD', 'IBM', 'ORCL']
+
+def create_tables(c):
+    """Create the transactions, portfolio and users tables if they do not exist."""
     # Create transactions table with email_id
     c.execute('''
     CREATE TABLE IF NOT EXISTS transactions (
@@ -43,6 +56,13 @@ def setup_database():
         join_date TEXT
     )
     ''')
+
+def setup_database():
+    """Set up SQLite database for transaction history and investment portfolio"""
+    conn = sqlite3.connect('fintech_app/data/finance_data.db')
+    c = conn.cursor()
+    
+    create_tables(c)
     
     # Insert sample users if table is empty
     c.execute("SELECT COUNT(*) FROM users")
@@ -65,18 +85,8 @@ def setup_database():
         
         # Generate sample transactions
         sample_transactions = []
-        categories = ['Income', 'Food', 'Utilities', 'Transportation', 'Housing', 'Entertainment', 'Healthcare', 'Shopping', 'Education']
-        descriptions = {
-            'Income': ['Salary', 'Freelance work', 'Investment returns', 'Side hustle', 'Bonus'],
-            'Food': ['Grocery shopping', 'Restaurant', 'Coffee shop', 'Food delivery', 'Lunch'],
-            'Utilities': ['Electricity bill', 'Water bill', 'Internet bill', 'Phone bill', 'Gas bill'],
-            'Transportation': ['Gas', 'Uber ride', 'Public transport', 'Car maintenance', 'Parking fee'],
-            'Housing': ['Rent', 'Mortgage', 'Home repairs', 'Furniture', 'Home insurance'],
-            'Entertainment': ['Streaming service', 'Movie tickets', 'Concert', 'Video games', 'Books'],
-            'Healthcare': ['Doctor visit', 'Prescription', 'Health insurance', 'Gym membership', 'Therapy'],
-            'Shopping': ['Clothes', 'Electronics', 'Gifts', 'Home goods', 'Personal care'],
-            'Education': ['Tuition', 'Textbooks', 'Online course', 'Workshop', 'Certification']
-        }
+        categories = CATEGORIES
+        descriptions = DESCRIPTIONS
         
         # Generate dates from 6 months ago to today
         today = datetime.now()
@@ -114,8 +124,7 @@ def setup_database():
         
         # Generate sample portfolio
         sample_portfolio = []
-        stock_symbols = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA', 'NVDA', 'JPM', 'V', 'WMT', 
-                         'DIS', 'NFLX', 'PYPL', 'ADBE', 'CRM', 'CSCO', 'INTC', 'AMD', 'IBM', 'ORCL']
+        stock_symbols = STOCK_SYMBOLS
         
         # Generate dates from 1 year ago to today
         today = datetime.now()
@@ -144,18 +153,30 @@ def setup_database():
                      sample_portfolio)
     
     conn.commit()
+    
+    # Bring indexes and other schema changes up to date
+    migrate(conn)
     conn.close()
     
-    return SQLDatabase.from_uri("sqlite:///fintech_app/data/finance_data.db")
+    return get_sql_database("sqlite:///fintech_app/data/finance_data.db")
 
-def get_db_toolkit(llm: BaseLanguageModel) -> SQLDatabaseToolkit:
+def get_db_toolkit(llm: BaseLanguageModel) -> CachedSQLDatabaseToolkit:
     """Get SQL Database toolkit with pre-configured tools for the finance database.
     
+    The toolkit queries through the shared read-only connection pool, and the
+    schema and sample rows it shows the model are cached until the schema changes.
+    Query results are cached until a table they read is written to.
+    
     Args:
         llm: The language model to use for the toolkit
         
     Returns:
-        A SQLDatabaseToolkit configured for the finance database
+        A CachedSQLDatabaseToolkit configured for the finance database
     """
-    db = SQLDatabase.from_uri("sqlite:///fintech_app/data/finance_data.db")
-    return SQLDatabaseToolkit(db=db, llm=llm) 
\ No newline at end of file
+    # Make sure indexes and aggregate tables exist before the schema is reflected
+    conn = sqlite3.connect('fintech_app/data/finance_data.db')
+    migrate(conn)
+    conn.close()
+    
+    db = get_sql_database("sqlite:///fintech_app/data/finance_data.db")
+    return CachedSQLDatabaseToolkit(db=db, llm=llm, scope="fintech_app") 
\ No newline at end of file
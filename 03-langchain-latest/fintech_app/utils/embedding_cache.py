@@ -0,0 +1,189 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that stores vectors in an on-disk SQLite cache.
+
+    Vectors are keyed by (model, dimensions, text hash) and stored as compact
+    float32 blobs. Both document and query embeddings go through the cache, and
+    the least recently used entries are evicted once ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, underlying: Embeddings, cache_path: str, max_entries: int = 200_000,
+                 eviction_check_interval: int = 1000):
+        """Initialize the embedding cache.
+
+        Args:
+            underlying: Embeddings used to compute vectors on a cache miss
+            cache_path: SQLite file where vectors are stored
+            max_entries: Maximum number of vectors kept in the cache
+            eviction_check_interval: Number of inserts between eviction checks
+        """
+        self.underlying = underlying
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.eviction_check_interval = eviction_check_interval
+        self.model = str(getattr(underlying, "model", type(underlying).__name__))
+        self.dimensions = int(getattr(underlying, "dimensions", None) or 0)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._inserts_since_check = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT,
+            dimensions INTEGER,
+            text_hash TEXT,
+            vector BLOB,
+            last_used REAL,
+            PRIMARY KEY (model, dimensions, text_hash)
+        ) WITHOUT ROWID
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, only calling the underlying model for uncached texts."""
+        hashes = [self._hash(text) for text in texts]
+        cached = self._lookup(set(hashes))
+
+        # Embed each distinct missing text once
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+        miss_count = sum(1 for text_hash in hashes if text_hash not in cached)
+        with self._lock:
+            self.hits += len(texts) - miss_count
+            self.misses += miss_count
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), vectors))
+            self._store(new_vectors)
+            cached.update(new_vectors)
+
+        return [list(cached[text_hash]) for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, using the cache when the same query was seen before."""
+        text_hash = self._hash(text)
+        cached = self._lookup({text_hash})
+        if text_hash in cached:
+            with self._lock:
+                self.hits += 1
+            return list(cached[text_hash])
+
+        with self._lock:
+            self.misses += 1
+        vector = self.underlying.embed_query(text)
+        self._store({text_hash: vector})
+        return vector
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss metrics for the cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+            }
+
+    def _hash(self, text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes) -> Dict[str, array]:
+        found = {}
+        hashes = list(hashes)
+        now = time.time()
+        with self._lock:
+            # Stay below SQLite's limit on bound parameters
+            for start in range(0, len(hashes), 500):
+                group = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(group))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND dimensions = ? "
+                    f"AND text_hash IN ({placeholders})",
+                    [self.model, self.dimensions, *group],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[text_hash] = vector
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND dimensions = ? AND text_hash = ?",
+                    [(now, self.model, self.dimensions, text_hash) for text_hash in found],
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, dimensions, text_hash, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(self.model, self.dimensions, text_hash, array("f", vector).tobytes(), now)
+                 for text_hash, vector in vectors.items()],
+            )
+            self._conn.commit()
+            self._inserts_since_check += len(vectors)
+            if self._inserts_since_check >= self.eviction_check_interval:
+                self._inserts_since_check = 0
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = entries - self.max_entries
+        if excess <= 0:
+            return
+        # Remove the least recently used vectors
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE (model, dimensions, text_hash) IN "
+            "(SELECT model, dimensions, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+        self.evictions += excess
+
+
+_shared_embeddings: Dict[tuple, CachedEmbeddings] = {}
+_shared_lock = threading.Lock()
+
+
+def get_cached_embeddings(model: Optional[str] = None,
+                          cache_path: str = "fintech_app/data/embedding_cache.db") -> CachedEmbeddings:
+    """Get the process-wide cached OpenAI embeddings for a model.
+
+    Args:
+        model: OpenAI embedding model name (defaults to the OpenAIEmbeddings default)
+        cache_path: SQLite file where vectors are stored
+    """
+    key = (model, cache_path)
+    with _shared_lock:
+        if key not in _shared_embeddings:
+            underlying = OpenAIEmbeddings(model=model) if model else OpenAIEmbeddings()
+            _shared_embeddings[key] = CachedEmbeddings(underlying, cache_path)
+        return _shared_embeddings[key]
@@ -0,0 +1,262 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# Keeps terms like "401(k)", "brk.b" and "72" as single tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\([a-z0-9]+\))?(?:[.\-][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it its my of on or should the to what when "
+    "which who why with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase a text and split it into BM25 terms."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    """Inverted-index BM25 keyword index over vector store chunk ids.
+
+    Documents are added incrementally at ingestion time. Posting lists are kept
+    as NumPy arrays so a query is scored with a few vectorized operations per
+    query term, and the index is persisted as a single ``.npz`` file.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        """Initialize the index, loading it from disk if it exists.
+
+        Args:
+            path: Optional ``.npz`` file where the index is persisted
+            k1: BM25 term frequency saturation parameter
+            b: BM25 document length normalization parameter
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._ids: List[str] = []
+        self._id_to_index: Dict[str, int] = {}
+        self._doc_len: List[int] = []
+        self._doc_len_array: Optional[np.ndarray] = None
+        # term -> (document indices, term frequencies)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # term -> ([document indices], [term frequencies]) added since the last compaction
+        self._pending: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._id_to_index
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> int:
+        """Add documents to the index, ignoring ids that are already indexed.
+
+        Returns:
+            int: Number of documents added
+        """
+        added = 0
+        with self._lock:
+            for doc_id, text in zip(ids, texts):
+                if doc_id in self._id_to_index:
+                    continue
+                index = len(self._ids)
+                self._ids.append(doc_id)
+                self._id_to_index[doc_id] = index
+                counts = Counter(tokenize(text))
+                self._doc_len.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    indices, tfs = self._pending.setdefault(term, ([], []))
+                    indices.append(index)
+                    tfs.append(tf)
+                added += 1
+            if added:
+                self._doc_len_array = None
+        return added
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return the top k (id, score) pairs for a query, best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._ids)
+            if not n_docs or not terms:
+                return []
+            if self._doc_len_array is None:
+                self._doc_len_array = np.asarray(self._doc_len, dtype=np.float32)
+            doc_len = self._doc_len_array
+            avg_doc_len = max(float(doc_len.mean()), 1.0)
+
+            scores = np.zeros(n_docs, dtype=np.float32)
+            for term in terms:
+                posting = self._posting(term)
+                if posting is None:
+                    continue
+                indices, tfs = posting
+                df = len(indices)
+                idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * doc_len[indices] / avg_doc_len)
+                scores[indices] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+            candidates = np.flatnonzero(scores)
+            if not len(candidates):
+                return []
+            k = min(k, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[i], float(scores[i])) for i in top]
+
+    def sync_with_collection(self, collection, page_size: int = 1000) -> int:
+        """Index any chunks in a Chroma collection that the index does not know yet.
+
+        Returns:
+            int: Number of documents added
+        """
+        if collection.count() <= len(self):
+            return 0
+        added = 0
+        offset = 0
+        while True:
+            page = collection.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            added += self.add(page["ids"], [text or "" for text in page["documents"]])
+            offset += len(page["ids"])
+        if added:
+            self.save()
+        return added
+
+    def save(self) -> None:
+        """Persist the index to its ``.npz`` file."""
+        if not self.path:
+            return
+        with self._lock:
+            terms = sorted(set(self._postings) | set(self._pending))
+            postings = [self._posting(term) for term in terms]
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(indices) for indices, _ in postings])
+            empty = np.zeros(0, dtype=np.int32)
+            indices = np.concatenate([p[0] for p in postings]) if postings else empty
+            tfs = np.concatenate([p[1] for p in postings]) if postings else empty.astype(np.float32)
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    ids=np.array(json.dumps(self._ids)),
+                    terms=np.array(json.dumps(terms)),
+                    doc_len=np.asarray(self._doc_len, dtype=np.int32),
+                    offsets=offsets,
+                    indices=indices,
+                    tfs=tfs,
+                )
+            os.replace(tmp_path, self.path)
+
+    def _posting(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Get a term's posting list, merging in documents added since the last query."""
+        pending = self._pending.pop(term, None)
+        if pending:
+            new_indices = np.asarray(pending[0], dtype=np.int32)
+            new_tfs = np.asarray(pending[1], dtype=np.float32)
+            if term in self._postings:
+                indices, tfs = self._postings[term]
+                new_indices = np.concatenate([indices, new_indices])
+                new_tfs = np.concatenate([tfs, new_tfs])
+            self._postings[term] = (new_indices, new_tfs)
+        return self._postings.get(term)
+
+    def _load(self) -> None:
+        with np.load(self.path) as data:
+            self._ids = json.loads(str(data["ids"]))
+            terms = json.loads(str(data["terms"]))
+            self._doc_len = data["doc_len"].tolist()
+            offsets = data["offsets"]
+            indices = data["indices"]
+            tfs = data["tfs"]
+        self._id_to_index = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._postings = {
+            term: (indices[offsets[i]:offsets[i + 1]], tfs[offsets[i]:offsets[i + 1]])
+            for i, term in enumerate(terms)
+        }
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], rrf_k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists into one, scoring each id by sum(1 / (rrf_k + rank))."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def hybrid_search(vector_store, bm25_index: BM25Index, query: str, k: int = 5,
+                  fetch_k: int = 20, rrf_k: int = 60) -> List[Tuple[Document, float]]:
+    """Search a Chroma vector store and a BM25 index and fuse the results.
+
+    Args:
+        vector_store: Chroma vector store
+        bm25_index: BM25 index over the same chunk ids
+        query: Search query
+        k: Number of results to return
+        fetch_k: Number of candidates taken from each retriever
+        rrf_k: Reciprocal rank fusion constant
+
+    Returns:
+        List of (document, fused score) pairs, best first
+    """
+    collection = vector_store._collection
+    count = collection.count()
+    if not count:
+        return []
+
+    query_embedding = vector_store.embeddings.embed_query(query)
+    vector_hits = collection.query(
+        query_embeddings=[query_embedding],
+        n_results=min(fetch_k, count),
+        include=["documents", "metadatas"],
+    )
+    vector_ids = vector_hits["ids"][0]
+    documents = {
+        doc_id: Document(page_content=text or "", metadata=metadata or {})
+        for doc_id, text, metadata in zip(vector_ids, vector_hits["documents"][0], vector_hits["metadatas"][0])
+    }
+    keyword_ids = [doc_id for doc_id, _ in bm25_index.search(query, fetch_k)]
+
+    fused = reciprocal_rank_fusion([vector_ids, keyword_ids], rrf_k)[:k]
+
+    # Fetch the keyword-only hits from the vector store
+    missing = [doc_id for doc_id, _ in fused if doc_id not in documents]
+    if missing:
+        extra = collection.get(ids=missing, include=["documents", "metadatas"])
+        for doc_id, text, metadata in zip(extra["ids"], extra["documents"], extra["metadatas"]):
+            documents[doc_id] = Document(page_content=text or "", metadata=metadata or {})
+
+    return [(documents[doc_id], score) for doc_id, score in fused if doc_id in documents]
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever that fuses vector similarity and BM25 results with reciprocal rank fusion."""
+
+    vector_store: Any
+    bm25_index: Any
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        results = hybrid_search(self.vector_store, self.bm25_index, query,
+                                k=self.k, fetch_k=self.fetch_k, rrf_k=self.rrf_k)
+        return [doc for doc, _ in results]
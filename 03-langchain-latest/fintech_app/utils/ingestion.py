@@ -0,0 +1,270 @@
+import hashlib
+import os
+import pathlib
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import tiktoken
+from pypdf import PdfReader
+from langchain_community.document_loaders import TextLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+
+@dataclass
+class IngestionProgress:
+    """Progress of a running ingestion, passed to progress callbacks."""
+    source: str
+    pages_total: Optional[int] = None
+    pages_done: int = 0
+    chunks_embedded: int = 0
+    chunks_stored: int = 0
+    chunks_skipped: int = 0
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so formatting-only differences hash the same."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def chunk_id(source: str, text: str, splitter_config: str) -> str:
+    """Deterministic id for a chunk: hash of source, normalized text and splitter config."""
+    key = "\x1f".join([str(source), normalize_text(text), splitter_config])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _extract_pdf_pages(file_path: str, start: int, end: int) -> List[tuple]:
+    """Extract the text of pages [start, end) from a PDF. Runs in a worker process."""
+    reader = PdfReader(file_path)
+    return [(page_number, reader.pages[page_number].extract_text() or "")
+            for page_number in range(start, end)]
+
+
+def iter_pdf_pages(file_path: str, max_workers: Optional[int] = None,
+                   pages_per_task: int = 8) -> Iterator[Document]:
+    """Lazily yield the pages of a PDF as documents, in page order.
+
+    Page ranges are extracted in a process pool, and only a bounded number of
+    ranges are in flight at once so memory stays flat for very large files.
+
+    Args:
+        file_path: Path to the PDF file
+        max_workers: Number of extraction processes (defaults to the CPU count)
+        pages_per_task: Number of pages handled by each worker task
+    """
+    page_count = len(PdfReader(file_path).pages)
+    ranges = [(start, min(start + pages_per_task, page_count))
+              for start in range(0, page_count, pages_per_task)]
+
+    def to_documents(pages):
+        for page_number, text in pages:
+            yield Document(page_content=text, metadata={"source": file_path, "page": page_number})
+
+    # Small documents are not worth the cost of starting a process pool
+    if len(ranges) <= 1:
+        for start, end in ranges:
+            yield from to_documents(_extract_pdf_pages(file_path, start, end))
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        remaining = iter(ranges)
+        for start, end in remaining:
+            pending.append(pool.submit(_extract_pdf_pages, file_path, start, end))
+            if len(pending) >= max_workers * 2:
+                break
+        while pending:
+            pages = pending.popleft().result()
+            next_range = next(remaining, None)
+            if next_range is not None:
+                pending.append(pool.submit(_extract_pdf_pages, file_path, *next_range))
+            yield from to_documents(pages)
+
+
+def iter_chunks(pages: Iterable[Document], text_splitter) -> Iterator[Document]:
+    """Split pages one at a time and yield the resulting chunks."""
+    for page in pages:
+        yield from text_splitter.split_documents([page])
+
+
+def iter_token_batches(chunks: Iterable[tuple], max_tokens: int,
+                       max_items: int = 512, encoding_name: str = "cl100k_base") -> Iterator[List[tuple]]:
+    """Group (id, chunk) pairs into batches whose total token count stays under max_tokens."""
+    encoding = tiktoken.get_encoding(encoding_name)
+    batch, batch_tokens = [], 0
+    for item in chunks:
+        chunk = item[1]
+        tokens = len(encoding.encode(chunk.page_content, disallowed_special=()))
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+class IngestionPipeline:
+    """Streaming file ingestion: lazy page extraction, chunking, batched embedding and upserts.
+
+    Embedding requests run concurrently on a thread pool while the calling thread
+    is the only one writing to the vector store. Every chunk gets a deterministic
+    id, and chunks already present in the store are skipped before embedding, so
+    re-ingesting unchanged content costs no embedding calls.
+    """
+
+    def __init__(self, vector_store, embeddings, chunk_size=1000, chunk_overlap=100,
+                 batch_tokens=8000, max_concurrency=4, upsert_batch_size=256, page_workers=None,
+                 bm25_index=None):
+        """Initialize the ingestion pipeline.
+
+        Args:
+            vector_store: Chroma vector store the chunks are written to
+            embeddings: Embeddings used to embed the chunks
+            chunk_size: Chunk size passed to the text splitter
+            chunk_overlap: Chunk overlap passed to the text splitter
+            batch_tokens: Maximum number of tokens sent in one embedding request
+            max_concurrency: Maximum number of embedding requests in flight
+            upsert_batch_size: Maximum number of chunks written to the vector store at once
+            page_workers: Number of processes used for PDF page extraction
+            bm25_index: Optional BM25Index kept in sync with the vector store
+        """
+        self.vector_store = vector_store
+        self.embeddings = embeddings
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+        self.batch_tokens = batch_tokens
+        self.max_concurrency = max_concurrency
+        self.upsert_batch_size = upsert_batch_size
+        self.page_workers = page_workers
+        self.bm25_index = bm25_index
+        self.splitter_config = f"recursive:{chunk_size}:{chunk_overlap}"
+
+    def iter_pages(self, file_path: str) -> Iterator[Document]:
+        """Yield the pages of a PDF or TXT file lazily."""
+        file_extension = pathlib.Path(file_path).suffix.lower()
+        if file_extension == '.pdf':
+            return iter_pdf_pages(file_path, max_workers=self.page_workers)
+        if file_extension == '.txt':
+            return TextLoader(file_path).lazy_load()
+        raise ValueError(f"Unsupported file type: {file_extension}. Please use PDF or TXT files.")
+
+    def run(self, file_path: str, source: Optional[str] = None,
+            progress_callback: Optional[Callable[[IngestionProgress], None]] = None) -> IngestionProgress:
+        """Ingest a file into the vector store.
+
+        Args:
+            file_path: Path to the file (PDF or TXT)
+            source: Optional source name stored with the chunks (defaults to file_path).
+                    Use a stable name for temporary files so re-uploads are recognised.
+            progress_callback: Optional callable invoked after every stored batch
+
+        Returns:
+            IngestionProgress: Final counts for the ingestion
+        """
+        progress = IngestionProgress(source=source or file_path)
+        if pathlib.Path(file_path).suffix.lower() == '.pdf':
+            progress.pages_total = len(PdfReader(file_path).pages)
+
+        def pages():
+            for page in self.iter_pages(file_path):
+                page.metadata["source"] = progress.source
+                yield page
+
+        return self.ingest_documents(pages(), progress=progress,
+                                     progress_callback=progress_callback)
+
+    def ingest_documents(self, documents: Iterable[Document], split: bool = True,
+                         progress: Optional[IngestionProgress] = None,
+                         progress_callback: Optional[Callable[[IngestionProgress], None]] = None) -> IngestionProgress:
+        """Ingest documents into the vector store, skipping chunks that already exist.
+
+        Args:
+            documents: Documents (or pages) to ingest
+            split: Whether to split the documents into chunks first
+            progress: Optional progress object to update
+            progress_callback: Optional callable invoked after every stored batch
+
+        Returns:
+            IngestionProgress: Final counts for the ingestion
+        """
+        progress = progress or IngestionProgress(source="documents")
+        splitter_config = self.splitter_config if split else "unsplit"
+
+        def counted_pages():
+            for page in documents:
+                progress.pages_done += 1
+                yield page
+
+        chunks = iter_chunks(counted_pages(), self.text_splitter) if split else counted_pages()
+        new_chunks = self._iter_new_chunks(chunks, splitter_config, progress)
+        batches = iter_token_batches(new_chunks, self.batch_tokens)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            in_flight = deque()
+            for batch in batches:
+                in_flight.append((batch, pool.submit(self._embed, batch)))
+                if len(in_flight) >= self.max_concurrency:
+                    self._store(*in_flight.popleft(), progress, progress_callback)
+            while in_flight:
+                self._store(*in_flight.popleft(), progress, progress_callback)
+
+        if self.bm25_index is not None and progress.chunks_stored:
+            self.bm25_index.save()
+
+        return progress
+
+    def _iter_new_chunks(self, chunks: Iterable[Document], splitter_config: str,
+                         progress: IngestionProgress, group_size: int = 256) -> Iterator[tuple]:
+        """Yield (id, chunk) pairs for chunks that are not in the vector store yet."""
+        seen = set()
+        group = []
+
+        def flush():
+            ids = [chunk_key for chunk_key, _ in group]
+            existing = set(self.vector_store._collection.get(ids=ids, include=[])["ids"])
+            for chunk_key, chunk in group:
+                if chunk_key in existing:
+                    progress.chunks_skipped += 1
+                else:
+                    yield chunk_key, chunk
+            group.clear()
+
+        for chunk in chunks:
+            chunk_key = chunk_id(chunk.metadata.get("source", ""), chunk.page_content, splitter_config)
+            # The same chunk can appear twice in one document
+            if chunk_key in seen:
+                progress.chunks_skipped += 1
+                continue
+            seen.add(chunk_key)
+            group.append((chunk_key, chunk))
+            if len(group) >= group_size:
+                yield from flush()
+        if group:
+            yield from flush()
+
+    def _embed(self, batch: List[tuple]) -> List[List[float]]:
+        return self.embeddings.embed_documents([chunk.page_content for _, chunk in batch])
+
+    def _store(self, batch, future, progress, progress_callback) -> None:
+        vectors = future.result()
+        progress.chunks_embedded += len(batch)
+        for start in range(0, len(batch), self.upsert_batch_size):
+            items = batch[start:start + self.upsert_batch_size]
+            self.vector_store._collection.upsert(
+                ids=[chunk_key for chunk_key, _ in items],
+                embeddings=vectors[start:start + self.upsert_batch_size],
+                documents=[chunk.page_content for _, chunk in items],
+                metadatas=[chunk.metadata for _, chunk in items],
+            )
+            if self.bm25_index is not None:
+                self.bm25_index.add([chunk_key for chunk_key, _ in items],
+                                    [chunk.page_content for _, chunk in items])
+            progress.chunks_stored += len(items)
+            if progress_callback:
+                progress_callback(progress)
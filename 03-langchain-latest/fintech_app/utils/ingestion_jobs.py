@@ -0,0 +1,183 @@
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+JOB_COLUMNS = [
+    "id", "source", "file_path", "status", "pages_total", "pages_done",
+    "chunks_stored", "chunks_skipped", "error", "created_at", "started_at", "finished_at",
+]
+
+
+class IngestionJobQueue:
+    """Local queue of knowledge ingestion jobs, persisted in SQLite.
+
+    Uploads are saved to disk and queued, so submitting returns immediately.
+    A single worker thread runs the jobs one after another; it is the only
+    writer to the vector store, so concurrent uploads never contend on the
+    Chroma directory. Job status and progress are written to the job table,
+    where the UI can poll them.
+    """
+
+    def __init__(self, rag_manager, db_path: str = "fintech_app/data/ingestion_jobs.db",
+                 upload_dir: str = "fintech_app/data/uploads", progress_interval: float = 0.5):
+        """Initialize the job queue and start its worker thread.
+
+        Args:
+            rag_manager: RAGManager whose ingestion pipeline runs the jobs
+            db_path: SQLite file where jobs are stored
+            upload_dir: Directory where uploaded files wait until they are processed
+            progress_interval: Minimum number of seconds between progress writes
+        """
+        self.rag_manager = rag_manager
+        self.db_path = db_path
+        self.upload_dir = upload_dir
+        self.progress_interval = progress_interval
+        self._wakeup = threading.Event()
+
+        os.makedirs(upload_dir, exist_ok=True)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                id TEXT PRIMARY KEY,
+                source TEXT,
+                file_path TEXT,
+                status TEXT,
+                pages_total INTEGER,
+                pages_done INTEGER DEFAULT 0,
+                chunks_stored INTEGER DEFAULT 0,
+                chunks_skipped INTEGER DEFAULT 0,
+                error TEXT,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL
+            )
+            ''')
+            # Jobs interrupted by a restart are picked up again; chunk ids make this idempotent
+            conn.execute("UPDATE ingestion_jobs SET status = 'queued' WHERE status = 'running'")
+
+        self._worker = threading.Thread(target=self._run_worker, name="ingestion-worker", daemon=True)
+        self._worker.start()
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, data: bytes, filename: str) -> str:
+        """Save an uploaded file and queue it for ingestion.
+
+        Args:
+            data: Contents of the uploaded file
+            filename: Original file name, stored as the source of the chunks
+
+        Returns:
+            str: Id of the queued job
+        """
+        file_extension = pathlib.Path(filename).suffix.lower()
+        if file_extension not in ('.pdf', '.txt'):
+            raise ValueError(f"Unsupported file type: {file_extension}. Please use PDF or TXT files.")
+
+        job_id = uuid.uuid4().hex
+        file_path = os.path.join(self.upload_dir, job_id + file_extension)
+        with open(file_path, "wb") as f:
+            f.write(data)
+
+        with self.connect() as conn:
+            conn.execute('''
+            INSERT INTO ingestion_jobs (id, source, file_path, status, created_at)
+            VALUES (?, ?, ?, 'queued', ?)
+            ''', (job_id, filename, file_path, time.time()))
+        self._wakeup.set()
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get the status of one job."""
+        with self.connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM ingestion_jobs WHERE id = ?",
+                               (job_id,)).fetchone()
+        return dict(zip(JOB_COLUMNS, row)) if row else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict]:
+        """List the most recent jobs, newest first."""
+        with self.connect() as conn:
+            rows = conn.execute(f'''
+            SELECT {', '.join(JOB_COLUMNS)} FROM ingestion_jobs ORDER BY created_at DESC LIMIT ?
+            ''', (limit,)).fetchall()
+        return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+    def has_active_jobs(self) -> bool:
+        """Check whether any job is queued or running."""
+        with self.connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM ingestion_jobs WHERE status IN ('queued', 'running') LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+    def _claim_next_job(self) -> Optional[Dict]:
+        with self.connect() as conn:
+            row = conn.execute('''
+            SELECT id, source, file_path FROM ingestion_jobs
+            WHERE status = 'queued' ORDER BY created_at LIMIT 1
+            ''').fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE ingestion_jobs SET status = 'running', started_at = ? WHERE id = ?",
+                         (time.time(), row[0]))
+        return {"id": row[0], "source": row[1], "file_path": row[2]}
+
+    def _run_worker(self) -> None:
+        while True:
+            job = self._claim_next_job()
+            if job is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            self._run_job(job)
+
+    def _run_job(self, job: Dict) -> None:
+        last_write = 0.0
+
+        def save_progress(progress, force=False):
+            nonlocal last_write
+            now = time.time()
+            if not force and now - last_write < self.progress_interval:
+                return
+            last_write = now
+            with self.connect() as conn:
+                conn.execute('''
+                UPDATE ingestion_jobs
+                SET pages_total = ?, pages_done = ?, chunks_stored = ?, chunks_skipped = ?
+                WHERE id = ?
+                ''', (progress.pages_total, progress.pages_done, progress.chunks_stored,
+                      progress.chunks_skipped, job["id"]))
+
+        try:
+            progress = self.rag_manager.ingestion_pipeline.run(
+                job["file_path"], source=job["source"], progress_callback=save_progress
+            )
+            save_progress(progress, force=True)
+            status, error = "done", None
+        except Exception as e:
+            print(f"Ingestion job {job['id']} failed:\n{traceback.format_exc()}")
+            status, error = "failed", str(e)
+
+        with self.connect() as conn:
+            conn.execute("UPDATE ingestion_jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                         (status, error, time.time(), job["id"]))
+        try:
+            os.unlink(job["file_path"])
+        except OSError:
+            pass
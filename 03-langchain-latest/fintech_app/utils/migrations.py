@@ -0,0 +1,143 @@
+import sqlite3
+
+# Triggers that keep monthly_category_totals in step with the transactions table
+MONTHLY_TOTALS_TRIGGERS = {
+    "trg_transactions_totals_insert": """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_totals_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO monthly_category_totals (email_id, month, category, total, transaction_count)
+        VALUES (NEW.email_id, substr(NEW.date, 1, 7), NEW.category, NEW.amount, 1)
+        ON CONFLICT (email_id, month, category) DO UPDATE
+        SET total = total + excluded.total, transaction_count = transaction_count + 1;
+    END""",
+    "trg_transactions_totals_delete": """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_totals_delete AFTER DELETE ON transactions
+    BEGIN
+        UPDATE monthly_category_totals
+        SET total = total - OLD.amount, transaction_count = transaction_count - 1
+        WHERE email_id = OLD.email_id AND month = substr(OLD.date, 1, 7) AND category = OLD.category;
+        DELETE FROM monthly_category_totals
+        WHERE email_id = OLD.email_id AND month = substr(OLD.date, 1, 7) AND category = OLD.category
+        AND transaction_count <= 0;
+    END""",
+    "trg_transactions_totals_update": """
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_totals_update
+    AFTER UPDATE OF email_id, date, amount, category ON transactions
+    BEGIN
+        UPDATE monthly_category_totals
+        SET total = total - OLD.amount, transaction_count = transaction_count - 1
+        WHERE email_id = OLD.email_id AND month = substr(OLD.date, 1, 7) AND category = OLD.category;
+        DELETE FROM monthly_category_totals
+        WHERE email_id = OLD.email_id AND month = substr(OLD.date, 1, 7) AND category = OLD.category
+        AND transaction_count <= 0;
+        INSERT INTO monthly_category_totals (email_id, month, category, total, transaction_count)
+        VALUES (NEW.email_id, substr(NEW.date, 1, 7), NEW.category, NEW.amount, 1)
+        ON CONFLICT (email_id, month, category) DO UPDATE
+        SET total = total + excluded.total, transaction_count = transaction_count + 1;
+    END""",
+}
+
+REBUILD_MONTHLY_TOTALS = [
+    "DELETE FROM monthly_category_totals",
+    """INSERT INTO monthly_category_totals (email_id, month, category, total, transaction_count)
+    SELECT email_id, substr(date, 1, 7), category, SUM(amount), COUNT(*)
+    FROM transactions GROUP BY email_id, substr(date, 1, 7), category""",
+]
+
+# Schema migrations for finance_data.db, applied in order.
+# The number of the last applied migration is kept in PRAGMA user_version.
+MIGRATIONS = [
+    (
+        1,
+        "Index transactions and portfolio by user",
+        [
+            # Date ranges and recent-transaction queries for one user
+            "CREATE INDEX IF NOT EXISTS idx_transactions_email_date ON transactions (email_id, date)",
+            # Category breakdowns and category-over-time queries for one user
+            "CREATE INDEX IF NOT EXISTS idx_transactions_email_category_date "
+            "ON transactions (email_id, category, date)",
+            # Holdings of one user, optionally for one symbol
+            "CREATE INDEX IF NOT EXISTS idx_portfolio_email_symbol_date "
+            "ON portfolio (email_id, symbol, purchase_date)",
+            # Give the query planner statistics for the new indexes
+            "ANALYZE",
+        ],
+    ),
+    (
+        2,
+        "Add monthly_category_totals maintained by triggers",
+        [
+            """CREATE TABLE IF NOT EXISTS monthly_category_totals (
+                email_id TEXT,
+                month TEXT,
+                category TEXT,
+                total REAL,
+                transaction_count INTEGER,
+                PRIMARY KEY (email_id, month, category)
+            ) WITHOUT ROWID""",
+            *MONTHLY_TOTALS_TRIGGERS.values(),
+            *REBUILD_MONTHLY_TOTALS,
+        ],
+    ),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Get the number of the last migration applied to a database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply the migrations a database does not have yet.
+
+    Migration statements are idempotent, so an interrupted migration is simply run again.
+
+    Args:
+        conn: Connection to the finance database
+
+    Returns:
+        int: Number of migrations applied
+    """
+    current = get_schema_version(conn)
+    applied = 0
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        print(f"Applying migration {version}: {description}")
+        with conn:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+        applied += 1
+    return applied
+
+
+def suspend_aggregate_triggers(conn: sqlite3.Connection) -> bool:
+    """Drop the aggregate triggers before a bulk load.
+
+    The query result cache's data version triggers are dropped as well; the
+    cache reinstalls them, and invalidates every cached result, once it sees
+    the schema change.
+
+    Returns:
+        bool: Whether any aggregate triggers were dropped (and must be restored afterwards)
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    for name in existing:
+        if name.startswith("trg_version_"):
+            conn.execute(f"DROP TRIGGER {name}")
+    dropped = False
+    for name in MONTHLY_TOTALS_TRIGGERS:
+        if name in existing:
+            conn.execute(f"DROP TRIGGER {name}")
+            dropped = True
+    return dropped
+
+
+def restore_aggregate_triggers(conn: sqlite3.Connection) -> None:
+    """Recreate the aggregate triggers and recompute the aggregates after a bulk load."""
+    with conn:
+        for statement in MONTHLY_TOTALS_TRIGGERS.values():
+            conn.execute(statement)
+        for statement in REBUILD_MONTHLY_TOTALS:
+            conn.execute(statement)
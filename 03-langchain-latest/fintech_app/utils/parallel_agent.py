@@ -0,0 +1,169 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Union
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+
+# Set while AgentExecutor._iter_next_step runs, so tool calls are submitted instead of run inline
+_step_batch = contextvars.ContextVar("parallel_step_batch", default=None)
+
+_thread_pools: Dict[int, ThreadPoolExecutor] = {}
+_tool_semaphores: Dict[tuple, threading.BoundedSemaphore] = {}
+_lock = threading.Lock()
+
+
+def _get_thread_pool(max_workers: int) -> ThreadPoolExecutor:
+    with _lock:
+        if max_workers not in _thread_pools:
+            _thread_pools[max_workers] = ThreadPoolExecutor(max_workers=max_workers,
+                                                            thread_name_prefix="agent-tool")
+        return _thread_pools[max_workers]
+
+
+def _get_tool_semaphore(tool: str, limit: int) -> threading.BoundedSemaphore:
+    """Process-wide semaphore for a tool, shared by every executor that uses the same limit."""
+    with _lock:
+        key = (tool, limit)
+        if key not in _tool_semaphores:
+            _tool_semaphores[key] = threading.BoundedSemaphore(limit)
+        return _tool_semaphores[key]
+
+
+async def _acquire(semaphore: threading.BoundedSemaphore) -> None:
+    """Wait for a thread semaphore without blocking the event loop.
+
+    Only non-blocking acquires are made, so a cancelled wait never leaves the semaphore taken.
+    """
+    delay = 0.005
+    while not semaphore.acquire(blocking=False):
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.1)
+
+
+class _StepBatch:
+    """Tool calls of one agent step."""
+
+    def __init__(self):
+        self.actions: List[AgentAction] = []
+        self.futures: List[Future] = []
+        # Last call of each serial tool, so the calls of the step run one at a time, in order
+        self.last_serial: Dict[str, Future] = {}
+        # Same ordering on the async path
+        self.serial_locks: Dict[str, asyncio.Lock] = {}
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """AgentExecutor that runs the tool calls of one step concurrently.
+
+    When the model asks for several tools in one step, the calls run on a
+    bounded thread pool and their observations are added to the scratchpad in
+    the order the model asked for them. Calls of a tool in serial_tools run one
+    at a time, in the order the model made them within the step.
+    tool_concurrency caps how many calls of a tool run at once across the whole
+    process. The async path (astream_events) already gathers the calls of a
+    step, and applies the same ordering and limits.
+    """
+
+    max_workers: int = 8
+    serial_tools: List[str] = []
+    tool_concurrency: Dict[str, int] = {}
+
+    def _iter_next_step(
+        self,
+        name_to_tool_map,
+        color_mapping,
+        inputs,
+        intermediate_steps,
+        run_manager=None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        batch = _StepBatch()
+        steps = super()._iter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager)
+        while True:
+            token = _step_batch.set(batch)
+            try:
+                item = next(steps)
+            except StopIteration:
+                break
+            finally:
+                _step_batch.reset(token)
+            if isinstance(item, Future):
+                continue
+            if isinstance(item, AgentAction):
+                batch.actions.append(item)
+            yield item
+        # Observations in the order the model asked for the tools
+        for future in batch.futures:
+            yield future.result()
+
+    async def _aiter_next_step(
+        self,
+        name_to_tool_map,
+        color_mapping,
+        inputs,
+        intermediate_steps,
+        run_manager=None,
+    ) -> AsyncIterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        batch = _StepBatch()
+        steps = super()._aiter_next_step(name_to_tool_map, color_mapping, inputs, intermediate_steps,
+                                         run_manager)
+        while True:
+            # The tasks gathering the step's tool calls copy the batch from this context
+            token = _step_batch.set(batch)
+            try:
+                item = await steps.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                _step_batch.reset(token)
+            yield item
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        batch = _step_batch.get()
+        if batch is None or len(batch.actions) <= 1:
+            return self._run_limited(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        # Run in a copy of the caller's context (callbacks, tracing), outside of the step batch
+        context = contextvars.copy_context()
+        context.run(_step_batch.set, None)
+        previous = batch.last_serial.get(agent_action.tool)
+
+        def run():
+            if previous is not None:
+                previous.exception()
+            return context.run(self._run_limited, name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        future = _get_thread_pool(self.max_workers).submit(run)
+        if agent_action.tool in self.serial_tools:
+            batch.last_serial[agent_action.tool] = future
+        batch.futures.append(future)
+        return future
+
+    def _run_limited(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> AgentStep:
+        limit = self.tool_concurrency.get(agent_action.tool)
+        if not limit:
+            return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        with _get_tool_semaphore(agent_action.tool, limit):
+            return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        batch = _step_batch.get()
+        if batch is None or agent_action.tool not in self.serial_tools:
+            return await self._arun_limited(name_to_tool_map, color_mapping, agent_action, run_manager)
+        # The gathered calls reach the lock in the order the model made them, and it is first come, first served
+        lock = batch.serial_locks.setdefault(agent_action.tool, asyncio.Lock())
+        async with lock:
+            return await self._arun_limited(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+    async def _arun_limited(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> AgentStep:
+        limit = self.tool_concurrency.get(agent_action.tool)
+        if not limit:
+            return await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        semaphore = _get_tool_semaphore(agent_action.tool, limit)
+        await _acquire(semaphore)
+        try:
+            return await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        finally:
+            semaphore.release()
@@ -0,0 +1,154 @@
+import sqlite3
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .market_data import MarketDataProvider, get_market_data_provider
+
+# History periods tried, shortest first, until one covers the oldest purchase
+_HISTORY_PERIODS = [("1y", 365), ("2y", 730), ("5y", 1826), ("max", None)]
+
+
+def _history_period(first_purchase: date, today: date) -> str:
+    days = (today - first_purchase).days + 7
+    for period, period_days in _HISTORY_PERIODS:
+        if period_days is None or days <= period_days:
+            return period
+    return "max"
+
+
+def time_weighted_returns(closes: np.ndarray, lot_columns: np.ndarray, lot_days: np.ndarray,
+                          lot_shares: np.ndarray, lot_costs: np.ndarray) -> np.ndarray:
+    """Time-weighted return of each column of a price matrix, and of all columns together.
+
+    Purchases are cash flows: on the day a lot is bought its cost is taken out of
+    that day's return, so buying more does not count as performance.
+
+    Args:
+        closes: Daily closes, one row per day and one column per symbol (no gaps)
+        lot_columns: Column of each lot
+        lot_days: Row of the day each lot was bought
+        lot_shares: Shares of each lot
+        lot_costs: Amount paid for each lot
+
+    Returns:
+        Array with the return of each column followed by the return of the whole portfolio
+    """
+    n_days, n_columns = closes.shape
+    bought = np.zeros((n_days, n_columns))
+    flows = np.zeros((n_days, n_columns))
+    np.add.at(bought, (lot_days, lot_columns), lot_shares)
+    np.add.at(flows, (lot_days, lot_columns), lot_costs)
+    values = np.cumsum(bought, axis=0) * closes
+
+    # Append the portfolio as a last column
+    values = np.column_stack([values, values.sum(axis=1)])
+    flows = np.column_stack([flows, flows.sum(axis=1)])
+    previous = np.vstack([np.zeros((1, n_columns + 1)), values[:-1]])
+    growth = np.ones_like(values)
+    # Day of the first purchase: from the price paid to the close
+    first = (previous == 0) & (flows > 0)
+    growth[first] = values[first] / flows[first]
+    held = previous > 0
+    growth[held] = (values[held] - flows[held]) / previous[held]
+    return np.prod(growth, axis=0) - 1
+
+
+def get_portfolio_performance(db_path: str, email_id: str, provider: Optional[MarketDataProvider] = None,
+                              today: Optional[date] = None) -> str:
+    """Summarize a user's holdings at current prices.
+
+    Holdings are joined with one batched price snapshot and one batched price
+    history; cost basis, market value, unrealized P&L, weights and
+    time-weighted returns are all computed as NumPy arrays.
+
+    Args:
+        db_path: Path to finance_data.db
+        email_id: Email of the user
+        provider: Market data provider, the shared one by default
+
+    Returns:
+        str: Performance table and totals for the agent
+    """
+    provider = provider or get_market_data_provider()
+    today = today or date.today()
+    conn = sqlite3.connect(db_path)
+    try:
+        lots = pd.read_sql_query(
+            "SELECT symbol, shares, purchase_price, purchase_date FROM portfolio WHERE email_id = ?",
+            conn, params=(email_id,))
+    finally:
+        conn.close()
+    if lots.empty:
+        return f"No holdings found for {email_id}."
+
+    lots["symbol"] = lots["symbol"].str.strip().str.upper()
+    lots["purchase_date"] = pd.to_datetime(lots["purchase_date"], errors="coerce")
+    symbols = list(dict.fromkeys(lots["symbol"]))
+    quotes = provider.get_quotes(symbols)
+    priced: List[str] = [symbol for symbol in symbols if symbol in quotes]
+    missing = [symbol for symbol in symbols if symbol not in quotes]
+    if not priced:
+        return f"No price data found for any holding of {email_id} ({', '.join(symbols)})."
+
+    lots = lots[lots["symbol"].isin(priced)].reset_index(drop=True)
+    column = pd.Index(priced).get_indexer(lots["symbol"])
+    shares = lots["shares"].to_numpy(dtype=np.float64)
+    lot_costs = shares * lots["purchase_price"].to_numpy(dtype=np.float64)
+    prices = np.array([quotes[symbol].price for symbol in priced])
+
+    # Positions: all lots of a symbol together
+    n = len(priced)
+    position_shares = np.bincount(column, weights=shares, minlength=n)
+    cost_basis = np.bincount(column, weights=lot_costs, minlength=n)
+    market_value = position_shares * prices
+    pnl = market_value - cost_basis
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_pct = np.where(cost_basis > 0, pnl / cost_basis * 100, np.nan)
+    weights = market_value / market_value.sum() * 100 if market_value.sum() else np.zeros(n)
+
+    twr = np.full(n + 1, np.nan)
+    twr_note = ""
+    dated = lots["purchase_date"].notna().to_numpy()
+    if dated.any():
+        first_purchase = lots["purchase_date"][dated].min().date()
+        histories = provider.get_history(priced, _history_period(first_purchase, today))
+        if all(symbol in histories for symbol in priced):
+            closes = pd.concat({symbol: histories[symbol]["Close"] for symbol in priced}, axis=1).sort_index()
+            closes = closes.ffill().bfill()
+            # Value today at the snapshot price, so the returns agree with the P&L
+            if closes.index[-1].date() < today:
+                closes.loc[pd.Timestamp(today)] = prices
+            else:
+                closes.iloc[-1] = prices
+            # Lots bought on a non-trading day count from the next trading day
+            days = np.searchsorted(closes.index.to_numpy(), lots["purchase_date"][dated].to_numpy(), "left")
+            if (days == 0).any() and lots["purchase_date"][dated].min() < closes.index[0]:
+                twr_note = f" (price history starts {closes.index[0]:%Y-%m-%d})"
+            days = np.minimum(days, len(closes) - 1)
+            twr = time_weighted_returns(closes.to_numpy(), column[dated], days, shares[dated], lot_costs[dated]) * 100
+
+    lines = [f"Portfolio performance for {email_id} (prices as of {max(q.as_of or '' for q in quotes.values())}):",
+             "| Symbol | Shares | Avg cost | Price | Cost basis | Market value | P&L | P&L % | Weight % | TWR % |",
+             "|:--|--:|--:|--:|--:|--:|--:|--:|--:|--:|"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_cost = np.where(position_shares > 0, cost_basis / position_shares, np.nan)
+    for i in np.argsort(-market_value):
+        twr_text = "n/a" if np.isnan(twr[i]) else f"{twr[i]:+.2f}"
+        lines.append(
+            f"| {priced[i]} | {position_shares[i]:,.2f} | ${average_cost[i]:,.2f} | "
+            f"${prices[i]:,.2f} | ${cost_basis[i]:,.2f} | ${market_value[i]:,.2f} | ${pnl[i]:+,.2f} | "
+            f"{pnl_pct[i]:+.2f} | {weights[i]:.1f} | {twr_text} |"
+        )
+    total_cost, total_value = cost_basis.sum(), market_value.sum()
+    lines.append(f"Total cost basis: ${total_cost:,.2f}")
+    lines.append(f"Total market value: ${total_value:,.2f}")
+    lines.append(f"Unrealized P&L: ${total_value - total_cost:+,.2f} "
+                 f"({(total_value / total_cost - 1) * 100 if total_cost else 0.0:+.2f}%)")
+    if not np.isnan(twr[-1]):
+        lines.append(f"Time-weighted return: {twr[-1]:+.2f}%{twr_note}")
+    if missing:
+        lines.append(f"No price data for {', '.join(missing)}; left out of the totals.")
+    return "\n".join(lines)
@@ -0,0 +1,117 @@
+import argparse
+import sqlite3
+import sys
+from typing import List, Tuple
+
+from .database import create_tables
+from .migrations import migrate
+
+# Representative queries the agent runs against finance_data.db, with sample parameters
+REPRESENTATIVE_QUERIES = {
+    "spending_by_category": (
+        "SELECT category, SUM(amount) FROM transactions WHERE email_id = ? AND amount < 0 GROUP BY category",
+        ("siva@gmail.com",),
+    ),
+    "recent_transactions": (
+        "SELECT date, amount, category, description FROM transactions WHERE email_id = ? "
+        "ORDER BY date DESC LIMIT 10",
+        ("siva@gmail.com",),
+    ),
+    "transactions_in_date_range": (
+        "SELECT date, amount, category, description FROM transactions "
+        "WHERE email_id = ? AND date BETWEEN ? AND ? ORDER BY date",
+        ("siva@gmail.com", "2024-01-01", "2024-03-31"),
+    ),
+    "category_since_date": (
+        "SELECT date, amount, description FROM transactions "
+        "WHERE email_id = ? AND category = ? AND date >= ? ORDER BY date",
+        ("siva@gmail.com", "Food", "2024-01-01"),
+    ),
+    "category_totals_in_date_range": (
+        "SELECT category, SUM(amount), COUNT(*) FROM transactions "
+        "WHERE email_id = ? AND date >= ? AND date < ? GROUP BY category",
+        ("siva@gmail.com", "2024-01-01", "2024-02-01"),
+    ),
+    "monthly_totals": (
+        "SELECT strftime('%Y-%m', date) AS month, SUM(amount) FROM transactions "
+        "WHERE email_id = ? GROUP BY month ORDER BY month",
+        ("siva@gmail.com",),
+    ),
+    "total_income": (
+        "SELECT SUM(amount) FROM transactions WHERE email_id = ? AND category = 'Income'",
+        ("siva@gmail.com",),
+    ),
+    "spending_summary": (
+        "SELECT category, SUM(total), SUM(transaction_count) FROM monthly_category_totals "
+        "WHERE email_id = ? AND month BETWEEN ? AND ? GROUP BY category",
+        ("siva@gmail.com", "2024-01", "2024-03"),
+    ),
+    "portfolio_holdings": (
+        "SELECT symbol, shares, purchase_price, purchase_date FROM portfolio WHERE email_id = ?",
+        ("siva@gmail.com",),
+    ),
+    "portfolio_symbol": (
+        "SELECT shares, purchase_price, purchase_date FROM portfolio WHERE email_id = ? AND symbol = ?",
+        ("siva@gmail.com", "AAPL"),
+    ),
+    "portfolio_cost_basis": (
+        "SELECT u.name, SUM(p.shares * p.purchase_price) FROM users u "
+        "JOIN portfolio p ON p.email_id = u.email_id WHERE u.email_id = ? GROUP BY u.name",
+        ("siva@gmail.com",),
+    ),
+}
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    """Get the EXPLAIN QUERY PLAN detail lines of a query."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def find_full_scans(plan: List[str]) -> List[str]:
+    """Return the plan lines that scan a whole table (or whole index) instead of searching an index."""
+    return [
+        line for line in plan
+        if line.startswith("SCAN ") and not line.startswith(("SCAN CONSTANT ROW", "SCAN SUBQUERY"))
+    ]
+
+
+def check_query_plans(conn: sqlite3.Connection) -> List[Tuple[str, List[str]]]:
+    """Run every representative query under EXPLAIN QUERY PLAN.
+
+    Returns:
+        List of (query name, offending plan lines) for queries that fall back to a full scan
+    """
+    failures = []
+    for name, (sql, params) in REPRESENTATIVE_QUERIES.items():
+        full_scans = find_full_scans(explain(conn, sql, params))
+        if full_scans:
+            failures.append((name, full_scans))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fail if any representative agent query needs a full table scan."
+    )
+    parser.add_argument("--db-path", default=None,
+                        help="Database to check (defaults to a fresh in-memory copy of the schema)")
+    args = parser.parse_args()
+
+    if args.db_path:
+        conn = sqlite3.connect(args.db_path)
+    else:
+        conn = sqlite3.connect(":memory:")
+        create_tables(conn.cursor())
+        migrate(conn)
+
+    failures = check_query_plans(conn)
+    conn.close()
+
+    for name, full_scans in failures:
+        print(f"FAIL {name}: {'; '.join(full_scans)}")
+    print(f"{len(REPRESENTATIVE_QUERIES) - len(failures)}/{len(REPRESENTATIVE_QUERIES)} queries use an index")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
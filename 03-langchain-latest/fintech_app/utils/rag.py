@@ -1,26 +1,72 @@
 import os
 import pathlib
-from langchain_community.document_loaders import TextLoader, PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import re
+import threading
+from operator import itemgetter
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.chains.combine_documents.stuff import create_stuff_documents_chain
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain_openai import ChatOpenAI
-from langchain.chains import create_history_aware_retriever
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+from .embedding_cache import get_cached_embeddings
+from .hybrid_search import BM25Index, HybridRetriever
+from .ingestion import IngestionPipeline
+from .session_store import SessionHistoryStore
+
+# Words that usually point back to something said earlier in the conversation
+_ANAPHORA_RE = re.compile(
+    r"\b(it|its|it's|that|this|those|these|they|them|their|there|he|she|his|her|one|ones|"
+    r"same|above|previous|previously|earlier|mentioned|former|latter|else|more|instead|too|also)\b",
+    re.IGNORECASE,
+)
+# Phrases that usually start a follow-up question
+_FOLLOW_UP_RE = re.compile(
+    r"^\s*(and|but|so|then|also|what about|how about|why|why not|what if|tell me more|"
+    r"explain|elaborate|go on|continue|ok|okay)\b",
+    re.IGNORECASE,
+)
+
+
+def needs_question_rewrite(question, chat_history):
+    """Decide whether a question has to be rewritten into a standalone question.
+    
+    The rewrite is skipped when there is no chat history, or when the question
+    has no anaphora or follow-up markers and is long enough to stand on its own.
+    
+    Args:
+        question: The latest user question
+        chat_history: Messages of the conversation so far
+        
+    Returns:
+        bool: True if the question should be rewritten with the LLM
+    """
+    if not chat_history:
+        return False
+    if _FOLLOW_UP_RE.search(question) or _ANAPHORA_RE.search(question):
+        return True
+    # Very short questions ("and bonds?") are usually elliptical follow-ups
+    return len(question.split()) < 4
 
 class RAGManager:
-    def __init__(self, persist_directory="fintech_app/data/chroma_db"):
+    def __init__(self, persist_directory="fintech_app/data/chroma_db", max_sessions=256,
+                 max_messages_per_session=20, session_spill_path=None):
         """Initialize the RAG manager with a vector store.
         
         Args:
             persist_directory: Directory where Chroma will persist the vector store data.
                               When this is provided, Chroma automatically persists data.
+            max_sessions: Maximum number of conversation histories kept in memory
+            max_messages_per_session: Maximum number of messages kept per conversation
+            session_spill_path: Optional SQLite file where evicted conversations are stored
         """
         self.persist_directory = persist_directory
-        self.embeddings = OpenAIEmbeddings()
+        # Embeddings go through the shared on-disk cache so repeated texts are not re-embedded
+        self.embeddings = get_cached_embeddings()
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
         
         # Create directory if it doesn't exist
@@ -34,46 +80,63 @@ class RAGManager:
             embedding_function=self.embeddings
         )
         
-        # Set up retriever
-        self.retriever = self.vector_store.as_retriever(search_kwargs={"k": 5})
+        # BM25 keyword index persisted alongside the Chroma data
+        self.bm25_index = BM25Index(os.path.join(persist_directory, "bm25_index.npz"))
+        self.bm25_index.sync_with_collection(self.vector_store._collection)
+        
+        # Set up retriever fusing vector and keyword results with reciprocal rank fusion
+        self.retriever = HybridRetriever(
+            vector_store=self.vector_store,
+            bm25_index=self.bm25_index,
+            k=5
+        )
+        
+        # Streaming ingestion pipeline used for file uploads
+        self.ingestion_pipeline = IngestionPipeline(
+            self.vector_store,
+            self.embeddings,
+            bm25_index=self.bm25_index
+        )
+        
+        # Conversation histories are shared by every call to the conversational chain
+        self.session_store = SessionHistoryStore(
+            max_sessions=max_sessions,
+            max_messages=max_messages_per_session,
+            spill_path=session_spill_path
+        )
+        self._conversational_rag_chain = None
+        self._chain_lock = threading.Lock()
         
-    def add_document_from_file(self, file_path):
+        # Counts how often the question-rewrite LLM call was made or avoided
+        self.rewrite_stats = {"rewrites": 0, "rewrites_skipped": 0}
+        self._stats_lock = threading.Lock()
+        
+    def add_document_from_file(self, file_path, progress_callback=None, source=None):
         """Load a document from a file and add it to the vector store.
         
-        Supports both PDF and TXT files.
+        Supports both PDF and TXT files. Pages are extracted lazily, chunks are
+        embedded in token-sized batches and written to Chroma in bounded batches.
+        Chunks that are already in the vector store are skipped.
         
         Args:
             file_path: Path to the file (PDF or TXT)
+            progress_callback: Optional callable receiving an IngestionProgress after each stored batch
+            source: Optional stable source name for the chunks (defaults to file_path)
             
         Returns:
             str: Success or error message
         """
         try:
-            # Determine file type and use appropriate loader
             file_extension = pathlib.Path(file_path).suffix.lower()
-            
-            if file_extension == '.pdf':
-                loader = PyPDFLoader(file_path)
-            elif file_extension == '.txt':
-                loader = TextLoader(file_path)
-            else:
+            if file_extension not in ('.pdf', '.txt'):
                 return f"Unsupported file type: {file_extension}. Please use PDF or TXT files."
             
-            # Load the document
-            documents = loader.load()
-            
-            # Split the document into chunks
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=100
-            )
-            splits = text_splitter.split_documents(documents)
-            
-            # Add to vector store
+            # Stream the file through the ingestion pipeline
             # Data is automatically persisted when using persist_directory
-            self.vector_store.add_documents(splits)
+            progress = self.ingestion_pipeline.run(file_path, source=source, progress_callback=progress_callback)
             
-            return f"Successfully added {len(splits)} chunks from {file_path}"
+            return (f"Successfully added {progress.chunks_stored} chunks from {source or file_path} "
+                    f"({progress.chunks_skipped} unchanged chunks skipped)")
         except Exception as e:
             return f"Error adding document: {str(e)}"
             
@@ -86,18 +149,12 @@ class RAGManager:
             
             document = Document(page_content=text, metadata=metadata)
             
-            # Split the document
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=100
-            )
-            splits = text_splitter.split_documents([document])
-            
-            # Add to vector store
+            # Split the document and add only new chunks to the vector store
             # Data is automatically persisted when using persist_directory
-            self.vector_store.add_documents(splits)
+            progress = self.ingestion_pipeline.ingest_documents([document])
             
-            return f"Successfully added text ({len(splits)} chunks)"
+            return (f"Successfully added text ({progress.chunks_stored} chunks, "
+                    f"{progress.chunks_skipped} unchanged chunks skipped)")
         except Exception as e:
             return f"Error adding text: {str(e)}"
     
@@ -119,12 +176,19 @@ class RAGManager:
             ("human", contextualize_q_prompt),
         ])
         
+        # Only pay for the rewrite LLM call when the question depends on the chat history
+        rewrite_retriever = contextualize_q_prompt_template | self.llm | StrOutputParser() | self.retriever
+        direct_retriever = itemgetter("input") | self.retriever
+        
+        def route_retrieval(inputs):
+            if needs_question_rewrite(inputs["input"], inputs.get("chat_history")):
+                self._count_rewrite("rewrites")
+                return rewrite_retriever
+            self._count_rewrite("rewrites_skipped")
+            return direct_retriever
+        
         # Create history-aware retriever
-        history_aware_retriever = create_history_aware_retriever(
-            self.llm, 
-            self.retriever, 
-            contextualize_q_prompt_template
-        )
+        history_aware_retriever = RunnableLambda(route_retrieval).with_config(run_name="chat_retriever_chain")
         
         # Create the final response prompt
         qa_prompt = ChatPromptTemplate.from_messages([
@@ -142,6 +206,10 @@ class RAGManager:
         
         return rag_chain
     
+    def _count_rewrite(self, key):
+        with self._stats_lock:
+            self.rewrite_stats[key] += 1
+    
     def add_default_knowledge(self):
         """Add default financial knowledge to the vector store."""
         financial_docs = [
@@ -158,43 +226,33 @@ class RAGManager:
         ]
         
         documents = [Document(page_content=doc, metadata={"source": "default_knowledge"}) for doc in financial_docs]
+        # Only documents that are not already in the store are embedded and inserted
         # Data is automatically persisted when using persist_directory
-        self.vector_store.add_documents(documents)
+        progress = self.ingestion_pipeline.ingest_documents(documents, split=False)
         
-        return "Added default financial knowledge to the vector store."
+        return (f"Added default financial knowledge to the vector store "
+                f"({progress.chunks_stored} inserted, {progress.chunks_skipped} skipped).")
     
     def get_conversational_rag_chain(self):
         """
-        Creates a conversational RAG chain with automatic message history management.
+        Returns the conversational RAG chain with automatic message history management.
+        
+        The chain is built once per RAGManager and reused, and all calls share the
+        same bounded session store so follow-up questions see earlier turns.
         
         Returns:
             A runnable chain that can be used with session IDs to maintain conversation history.
         """
-        from langchain_community.chat_message_histories import ChatMessageHistory
-        from langchain_core.chat_history import BaseChatMessageHistory
-        from langchain_core.runnables.history import RunnableWithMessageHistory
-        
-        # Create a store to keep track of conversation histories
-        store = {}
-        
-        # Function to get or create a new chat history for a session
-        def get_session_history(session_id: str) -> BaseChatMessageHistory:
-            if session_id not in store:
-                store[session_id] = ChatMessageHistory()
-            return store[session_id]
-        
-        # Create the basic RAG chain
-        rag_chain = self.create_rag_chain()
-        
-        # Wrap it with message history management
-        conversational_rag_chain = RunnableWithMessageHistory(
-            rag_chain,
-            get_session_history,
-            input_messages_key="input",
-            history_messages_key="chat_history",
-            output_messages_key="answer",
-        )
+        if self._conversational_rag_chain is None:
+            with self._chain_lock:
+                if self._conversational_rag_chain is None:
+                    # Wrap the basic RAG chain with message history management
+                    self._conversational_rag_chain = RunnableWithMessageHistory(
+                        self.create_rag_chain(),
+                        self.session_store.get,
+                        input_messages_key="input",
+                        history_messages_key="chat_history",
+                        output_messages_key="answer",
+                    )
         
-        return conversational_rag_chain
-    
-    
\ No newline at end of file
+        return self._conversational_rag_chain
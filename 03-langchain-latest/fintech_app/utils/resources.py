@@ -0,0 +1,113 @@
+import statistics
+import threading
+import time
+
+import streamlit as st
+from langchain_openai import ChatOpenAI
+
+from .chat_history import ChatHistoryStore
+from .ingestion_jobs import IngestionJobQueue
+from .rag import RAGManager
+from .tools import finish_user_turn, setup_shared_tools, setup_user_tools
+
+# Seconds spent building each shared resource (only filled on a cold start)
+_build_timings = {}
+# Wall-clock latency of every script run in this process
+_rerun_timings = {"cold": None, "warm": []}
+_timings_lock = threading.Lock()
+
+
+def _timed(name, build):
+    start = time.perf_counter()
+    resource = build()
+    with _timings_lock:
+        _build_timings[name] = time.perf_counter() - start
+    return resource
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm():
+    """Get the LLM shared by every session."""
+    return _timed("llm", lambda: ChatOpenAI(model="gpt-4o-mini"))
+
+
+@st.cache_resource(show_spinner=False)
+def get_agent_llm():
+    """Get the streaming LLM used by the agents.
+
+    The tag lets the UI stream only the agent's own answer tokens.
+    """
+    return _timed("agent_llm", lambda: ChatOpenAI(model="gpt-4o-mini", streaming=True, tags=["agent_answer"]))
+
+
+@st.cache_resource(show_spinner="Loading knowledge base...")
+def get_rag_manager():
+    """Get the RAG manager (embeddings, Chroma client, BM25 index) shared by every session."""
+    return _timed("rag_manager", lambda: RAGManager(
+        "fintech_app/data/chroma_db",
+        session_spill_path="fintech_app/data/rag_sessions.db"
+    ))
+
+
+@st.cache_resource(show_spinner="Loading tools...")
+def get_shared_tools():
+    """Get the user-independent tools (SQL toolkit, search, market data).
+
+    The SQL schema is reflected only once per process.
+    """
+    rag_manager = get_rag_manager()
+    llm = get_llm()
+    return _timed("shared_tools", lambda: setup_shared_tools(rag_manager, llm))
+
+
+@st.cache_resource(show_spinner=False)
+def get_chat_history_store():
+    """Get the durable chat history store shared by every session."""
+    return _timed("chat_history_store", lambda: ChatHistoryStore(
+        "fintech_app/data/chat_history.db",
+        summary_llm=get_llm()
+    ))
+
+
+@st.cache_resource(show_spinner=False)
+def get_ingestion_queue():
+    """Get the ingestion job queue; its worker is the only writer to the vector store."""
+    return _timed("ingestion_queue", lambda: IngestionJobQueue(
+        get_rag_manager(),
+        "fintech_app/data/ingestion_jobs.db",
+        upload_dir="fintech_app/data/uploads"
+    ))
+
+
+def get_tools_for_user(user_email):
+    """Get the shared tools plus the cheap tools bound to one user."""
+    return get_shared_tools() + setup_user_tools(get_rag_manager(), user_email)
+
+
+def finish_turn(user_email, completed=True):
+    """End the user's chat turn, so the SQL plan cache can learn from it."""
+    finish_user_turn(get_rag_manager(), user_email, completed)
+
+
+def record_run(seconds):
+    """Record how long a script run took. The first run in the process counts as cold."""
+    with _timings_lock:
+        if _rerun_timings["cold"] is None:
+            _rerun_timings["cold"] = seconds
+        else:
+            _rerun_timings["warm"].append(seconds)
+            # Only keep recent warm runs
+            del _rerun_timings["warm"][:-100]
+
+
+def timing_report():
+    """Summarize cold vs warm run latency and resource build times."""
+    with _timings_lock:
+        warm = list(_rerun_timings["warm"])
+        return {
+            "cold_run_seconds": _rerun_timings["cold"],
+            "warm_runs": len(warm),
+            "last_warm_run_seconds": warm[-1] if warm else None,
+            "median_warm_run_seconds": statistics.median(warm) if warm else None,
+            "build_seconds": dict(_build_timings),
+        }
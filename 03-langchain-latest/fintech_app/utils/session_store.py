@@ -0,0 +1,122 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+
+
+class BoundedChatMessageHistory(ChatMessageHistory):
+    """In-memory chat history that only keeps the most recent messages."""
+
+    max_messages: int = 20
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.messages.append(message)
+        # Drop the oldest messages once we go over the limit
+        if self.max_messages and len(self.messages) > self.max_messages:
+            del self.messages[: len(self.messages) - self.max_messages]
+
+
+class SessionHistoryStore:
+    """LRU store of chat histories keyed by session id.
+
+    At most ``max_sessions`` histories are kept in memory. When a session is
+    evicted and ``spill_path`` is set, its messages are written to SQLite and
+    loaded back the next time the session is used.
+    """
+
+    def __init__(self, max_sessions: int = 256, max_messages: int = 20, spill_path: Optional[str] = None):
+        """Initialize the session store.
+
+        Args:
+            max_sessions: Maximum number of session histories kept in memory
+            max_messages: Maximum number of messages kept per session
+            spill_path: Optional SQLite file used to persist evicted sessions
+        """
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.spill_path = spill_path
+        self._sessions: "OrderedDict[str, BoundedChatMessageHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if spill_path:
+            if os.path.dirname(spill_path):
+                os.makedirs(os.path.dirname(spill_path), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS session_messages (
+                    session_id TEXT PRIMARY KEY,
+                    messages TEXT
+                )
+                ''')
+
+    def __call__(self, session_id: str) -> BaseChatMessageHistory:
+        return self.get(session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> BaseChatMessageHistory:
+        """Get the history for a session, creating or restoring it if needed."""
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is not None:
+                self._sessions.move_to_end(session_id)
+                return history
+
+            history = BoundedChatMessageHistory(max_messages=self.max_messages)
+            for message in self._load(session_id):
+                history.add_message(message)
+            self._sessions[session_id] = history
+
+            while len(self._sessions) > self.max_sessions:
+                evicted_id, evicted = self._sessions.popitem(last=False)
+                self._save(evicted_id, evicted.messages)
+            return history
+
+    def clear(self, session_id: str) -> None:
+        """Forget a session both in memory and in the spill file."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self.spill_path:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+
+    def flush(self) -> None:
+        """Write every in-memory session to the spill file."""
+        with self._lock:
+            for session_id, history in self._sessions.items():
+                self._save(session_id, history.messages)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.spill_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _load(self, session_id: str):
+        if not self.spill_path:
+            return []
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT messages FROM session_messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return messages_from_dict(json.loads(row[0])) if row else []
+
+    def _save(self, session_id: str, messages) -> None:
+        if not self.spill_path:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_messages (session_id, messages) VALUES (?, ?)",
+                (session_id, json.dumps(messages_to_dict(messages))),
+            )
@@ -0,0 +1,113 @@
+import re
+import sqlite3
+from datetime import date
+from typing import Optional, Tuple
+
+# Named periods accepted by the spending summary, as a number of months back from the current month
+NAMED_PERIODS = {
+    "current_month": 0,
+    "this_month": 0,
+    "last_month": 1,
+    "last_3_months": 2,
+    "last_6_months": 5,
+    "last_12_months": 11,
+}
+# Month range of the 'all' period
+_ALL_TIME = ("0000-01", "9999-12")
+
+
+def _shift_month(month: str, months: int) -> str:
+    year, month_number = map(int, month.split("-"))
+    index = year * 12 + month_number - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def parse_period(period: Optional[str], today: Optional[date] = None) -> Tuple[str, str]:
+    """Turn a period into an inclusive (first month, last month) range of 'YYYY-MM' strings.
+
+    Accepts the names in NAMED_PERIODS, 'year_to_date', 'all', a single month
+    ('2024-03'), a year ('2024') or a month range ('2024-01:2024-03').
+    """
+    today = today or date.today()
+    current = today.strftime("%Y-%m")
+    period = (period or "current_month").strip().lower().replace(" ", "_")
+
+    if period in NAMED_PERIODS:
+        if period == "last_month":
+            previous = _shift_month(current, -1)
+            return previous, previous
+        return _shift_month(current, -NAMED_PERIODS[period]), current
+    if period == "year_to_date":
+        return f"{today.year:04d}-01", current
+    if period == "all":
+        return _ALL_TIME
+    if re.fullmatch(r"\d{4}", period):
+        return f"{period}-01", f"{period}-12"
+    if re.fullmatch(r"\d{4}-\d{2}", period):
+        return period, period
+    match = re.fullmatch(r"(\d{4}-\d{2})(?::|_to_|-to-)(\d{4}-\d{2})", period)
+    if match:
+        return match.group(1), match.group(2)
+    raise ValueError(
+        f"Unknown period '{period}'. Use one of {', '.join(NAMED_PERIODS)}, year_to_date, all, "
+        f"YYYY, YYYY-MM or YYYY-MM:YYYY-MM."
+    )
+
+
+def get_spending_summary(db_path: str, email_id: str, period: Optional[str] = "current_month",
+                         category: Optional[str] = None, today: Optional[date] = None) -> str:
+    """Summarize a user's spending and income from the precomputed monthly totals.
+
+    Args:
+        db_path: Path to finance_data.db
+        email_id: Email of the user
+        period: Period to summarize (see parse_period)
+        category: Optional category to break down month by month
+
+    Returns:
+        str: Summary text for the agent
+    """
+    first_month, last_month = parse_period(period, today)
+    conn = sqlite3.connect(db_path)
+    try:
+        if category:
+            rows = conn.execute('''
+            SELECT month, total, transaction_count FROM monthly_category_totals
+            WHERE email_id = ? AND month BETWEEN ? AND ? AND category = ? COLLATE NOCASE
+            ORDER BY month
+            ''', (email_id, first_month, last_month, category)).fetchall()
+        else:
+            rows = conn.execute('''
+            SELECT category, SUM(total), SUM(transaction_count) FROM monthly_category_totals
+            WHERE email_id = ? AND month BETWEEN ? AND ?
+            GROUP BY category ORDER BY SUM(total)
+            ''', (email_id, first_month, last_month)).fetchall()
+    finally:
+        conn.close()
+
+    if (first_month, last_month) == _ALL_TIME:
+        period_label = "all time"
+    else:
+        period_label = first_month if first_month == last_month else f"{first_month} to {last_month}"
+    if not rows:
+        return f"No transactions found for {category or 'any category'} in {period_label}."
+
+    if category:
+        lines = [f"{category} for {email_id}, {period_label}:"]
+        for month, total, count in rows:
+            lines.append(f"- {month}: ${abs(total):,.2f} ({count} transactions)")
+        overall = sum(total for _, total, _ in rows)
+        lines.append(f"Total: ${abs(overall):,.2f} over {sum(count for _, _, count in rows)} transactions")
+        return "\n".join(lines)
+
+    income = sum(total for name, total, _ in rows if name == "Income")
+    expenses = [(name, total, count) for name, total, count in rows if name != "Income"]
+    spent = -sum(total for _, total, _ in expenses)
+    lines = [f"Spending by category for {email_id}, {period_label}:"]
+    for name, total, count in expenses:
+        share = -total / spent * 100 if spent else 0.0
+        lines.append(f"- {name}: ${-total:,.2f} ({share:.1f}%, {count} transactions)")
+    lines.append(f"Total spending: ${spent:,.2f}")
+    lines.append(f"Total income: ${income:,.2f}")
+    lines.append(f"Net: ${income - spent:,.2f}")
+    return "\n".join(lines)
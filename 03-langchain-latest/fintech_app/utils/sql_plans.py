@@ -0,0 +1,321 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .database import CATEGORIES, STOCK_SYMBOLS
+from .sql_engine import CachedSQLDatabase, normalize_sql
+
+# Entity patterns, in the order they are masked (longer patterns first)
+_ENTITY_PATTERNS = [
+    ("email", re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")),
+    ("date", re.compile(r"\b\d{4}-\d{2}-\d{2}\b")),
+    ("month", re.compile(r"\b\d{4}-\d{2}\b")),
+    ("category", re.compile(r"\b(" + "|".join(CATEGORIES) + r")\b", re.IGNORECASE)),
+    ("symbol", re.compile(r"\$[A-Z]{1,5}\b|\b(?:" + "|".join(STOCK_SYMBOLS) + r")\b")),
+    ("number", re.compile(r"\$?\b\d+(?:,\d{3})*(?:\.\d+)?\b")),
+]
+_CATEGORY_NAMES = {category.lower(): category for category in CATEGORIES}
+# Uppercase words that are not tickers
+_NOT_SYMBOLS = {"I", "A", "USD", "US", "ETF", "IRA", "SQL", "ID", "OK", "YTD", "MOM", "YOY"}
+# Words that set the time window of a question; a template only fits questions that use the same ones
+_PERIOD_WORDS_RE = re.compile(
+    r"\b(today|yesterday|now|current|this|last|past|previous|next|recent|since|ago|so far|to date|ytd|mtd"
+    r"|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve"
+    r"|days?|weeks?|months?|quarters?|years?|daily|weekly|monthly|quarterly|yearly|annual\w*"
+    r"|january|february|march|april|may|june|july|august|september|october|november|december)\b"
+)
+# Unbound literals of these shapes almost always come from the question, so such queries are not learned
+_QUESTION_LITERAL_RE = re.compile(r"\d{4}-\d{2}|@")
+
+
+def mask_question(question: str, user_email: str) -> Tuple[str, Dict[str, Any]]:
+    """Replace the entities of a question with typed placeholders.
+
+    'Spending on Food since 2024-01-01' becomes 'spending on <category> since <date>',
+    with {'category_0': 'Food', 'date_0': '2024-01-01'}. The logged in user's email
+    is always available as email_0, whether or not the question mentions it.
+
+    Returns:
+        Tuple of the masked question and its entities by slot name
+    """
+    entities: Dict[str, Any] = {"email_0": user_email}
+    counts = {"email": 1}
+    masked = question.strip()
+    for kind, pattern in _ENTITY_PATTERNS:
+        def replace(match, kind=kind):
+            raw = match.group(0)
+            if kind == "email":
+                if raw.lower() == user_email.lower():
+                    return "<email>"
+                value = raw
+            elif kind == "category":
+                value = _CATEGORY_NAMES[raw.lower()]
+            elif kind == "symbol":
+                value = raw.lstrip("$")
+                if value in _NOT_SYMBOLS:
+                    return raw
+            elif kind == "number":
+                digits = raw.lstrip("$").replace(",", "")
+                value = float(digits) if "." in digits else int(digits)
+            else:
+                value = raw
+            slot = f"{kind}_{counts.get(kind, 0)}"
+            counts[kind] = counts.get(kind, 0) + 1
+            entities[slot] = value
+            return f"<{kind}>"
+        masked = pattern.sub(replace, masked)
+    return " ".join(masked.lower().split()), entities
+
+
+def _placeholders(masked: str) -> List[str]:
+    return re.findall(r"<(\w+)>", masked)
+
+
+def parameterize_sql(sql: str, entities: Dict[str, Any]) -> Tuple[str, List[str], List[str]]:
+    """Turn a query into a template by replacing literals that equal an entity with :slot parameters.
+
+    Returns:
+        Tuple of the template, the slots it binds and the string literals left as constants
+    """
+    _, tokens = normalize_sql(sql)
+    by_value = {}
+    for slot, value in entities.items():
+        key = value.lower() if isinstance(value, str) else value
+        by_value.setdefault(key, slot)
+
+    slots, constants, template = [], [], []
+    for token in tokens:
+        if token.startswith("'"):
+            value = token[1:-1].replace("''", "'")
+            slot = by_value.get(value.lower())
+            if slot is None:
+                constants.append(value)
+        elif token[0].isdigit():
+            value = float(token) if "." in token else int(token)
+            slot = by_value.get(value)
+        else:
+            slot = None
+        if slot is None:
+            template.append(token)
+        else:
+            template.append(f":{slot}")
+            slots.append(slot)
+    return " ".join(template), sorted(set(slots)), constants
+
+
+class SQLPlanCache:
+    """Cache of validated, parameterized SQL templates indexed by the embedding of the masked question.
+
+    A question whose masked form is close enough to a stored one is answered by
+    binding its entities into that template, skipping the list tables, schema,
+    checker and query steps of the SQL toolkit. A template is learned from the
+    last query the agent runs successfully in a turn that missed, once it is
+    validated by finish_turn; a later turn with the same question replaces it.
+    """
+
+    def __init__(self, db: CachedSQLDatabase, embeddings: Embeddings,
+                 plans_path: str = "fintech_app/data/sql_plans.db", similarity_threshold: float = 0.92,
+                 pending_ttl: float = 600.0):
+        """Initialize the plan cache.
+
+        Args:
+            db: Database the templates run against
+            embeddings: Embeddings used for the masked questions
+            plans_path: SQLite file where templates are stored
+            similarity_threshold: Minimum cosine similarity for a question to reuse a template
+            pending_ttl: Seconds a missed question waits for the query that answers it
+        """
+        self.db = db
+        self.embeddings = embeddings
+        self.plans_path = plans_path
+        self.similarity_threshold = similarity_threshold
+        self.pending_ttl = pending_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.learned = 0
+        self.rejected = 0
+        # Last missed question per user and the last query of its turn, until the turn ends
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        if os.path.dirname(plans_path):
+            os.makedirs(os.path.dirname(plans_path), exist_ok=True)
+        self._conn = sqlite3.connect(plans_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS sql_plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            masked_question TEXT UNIQUE,
+            question TEXT,
+            sql_template TEXT,
+            slots TEXT,
+            constants TEXT,
+            embedding BLOB,
+            hits INTEGER DEFAULT 0,
+            created_at TEXT
+        )
+        ''')
+        self._conn.commit()
+        self._load()
+
+    def _load(self) -> None:
+        rows = self._conn.execute(
+            "SELECT id, masked_question, question, sql_template, slots, constants, embedding FROM sql_plans ORDER BY id"
+        ).fetchall()
+        self._plans = [
+            {"id": row[0], "masked_question": row[1], "question": row[2], "sql_template": row[3],
+             "slots": json.loads(row[4]), "constants": json.loads(row[5])}
+            for row in rows
+        ]
+        vectors = [np.frombuffer(row[6], dtype=np.float32) for row in rows]
+        self._matrix = np.vstack(vectors) if vectors else None
+
+    def _embed(self, masked: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(masked), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, question: str, user_email: str) -> Optional[str]:
+        """Answer a question from a stored template.
+
+        Returns:
+            The query result, or None if no template fits and the SQL tools must be used
+        """
+        masked, entities = mask_question(question, user_email)
+        # Never bind another user's email into a template
+        if any(slot.startswith("email_") and value != user_email for slot, value in entities.items()):
+            return None
+
+        vector = self._embed(masked)
+        plan = self._match(masked, vector, question)
+        if plan is None or not set(plan["slots"]) <= set(entities):
+            with self._lock:
+                self.misses += 1
+                self._pending[user_email] = {"question": question, "masked": masked, "entities": entities,
+                                             "vector": vector, "created": time.time()}
+            return None
+
+        result = self.db.run(plan["sql_template"], parameters={slot: entities[slot] for slot in plan["slots"]})
+        with self._lock:
+            self.hits += 1
+            self._pending.pop(user_email, None)
+            self._conn.execute("UPDATE sql_plans SET hits = hits + 1 WHERE id = ?", (plan["id"],))
+            self._conn.commit()
+        return result
+
+    def _match(self, masked: str, vector: np.ndarray, question: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._matrix is None:
+                return None
+            similarities = self._matrix @ vector
+            plans = self._plans
+        for index in np.argsort(-similarities):
+            if similarities[index] < self.similarity_threshold:
+                return None
+            plan = plans[index]
+            # Entity types and order must agree, and constants taken from the question must still be in it
+            if _placeholders(plan["masked_question"]) != _placeholders(masked):
+                continue
+            if _PERIOD_WORDS_RE.findall(plan["masked_question"]) != _PERIOD_WORDS_RE.findall(masked):
+                continue
+            lowered = question.lower()
+            if all(constant.strip("%").lower() not in plan["question"].lower()
+                   or constant.strip("%").lower() in lowered for constant in plan["constants"]):
+                return plan
+        return None
+
+    def observe_query(self, sql: str, result: str) -> None:
+        """Note a successful sql_db_query run for the user whose question is pending.
+
+        Only the last such query of the turn is kept; earlier ones are usually
+        exploratory. finish_turn decides whether it is learned.
+        """
+        with self._lock:
+            now = time.time()
+            for email, entry in self._pending.items():
+                if now - entry["created"] <= self.pending_ttl and f"'{email.lower()}'" in sql.lower():
+                    entry["last_query"] = (sql, result)
+
+    def finish_turn(self, user_email: str, learn: bool = True) -> None:
+        """End the user's turn, learning a template from its last query if it answers the pending question.
+
+        The template is only stored if every entity of the question is bound to
+        one of its slots; a literal the question did not supply (such as a date
+        window written as '-3 months') would otherwise answer later questions
+        with a different value the same way. Slots are matched to literals
+        case-insensitively and numbers by value, so the template must also
+        reproduce the query's result with the question's entities bound.
+
+        Args:
+            user_email: Email of the user whose turn ended
+            learn: False when the turn failed or was cancelled; its queries are dropped
+        """
+        with self._lock:
+            entry = self._pending.pop(user_email, None)
+        if (not learn or entry is None or "last_query" not in entry
+                or time.time() - entry["created"] > self.pending_ttl):
+            return
+
+        sql, result = entry["last_query"]
+        template, slots, constants = parameterize_sql(sql, entry["entities"])
+        tokens = normalize_sql(template)[1]
+        unbound = [slot for slot in entry["entities"] if not slot.startswith("email_") and slot not in slots]
+        replayed = None
+        if not ("email_0" not in slots or unbound or not tokens or tokens[0] not in ("SELECT", "WITH")
+                or any(_QUESTION_LITERAL_RE.search(constant) for constant in constants)):
+            try:
+                replayed = self.db.run(template, parameters={slot: entry["entities"][slot] for slot in slots})
+            except Exception:
+                replayed = None
+        with self._lock:
+            if replayed is None or replayed != result:
+                self.rejected += 1
+                return
+            self._store(entry, template, slots, constants)
+
+    def _store(self, entry: Dict[str, Any], template: str, slots: List[str], constants: List[str]) -> None:
+        self._conn.execute('''
+        INSERT INTO sql_plans (masked_question, question, sql_template, slots, constants, embedding, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (masked_question) DO UPDATE SET question = excluded.question,
+            sql_template = excluded.sql_template, slots = excluded.slots,
+            constants = excluded.constants, embedding = excluded.embedding
+        ''', (entry["masked"], entry["question"], template, json.dumps(slots), json.dumps(constants),
+              entry["vector"].tobytes(), datetime.now().isoformat()))
+        self._conn.commit()
+        self.learned += 1
+        self._load()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss metrics for the plan cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "learned": self.learned,
+                "rejected": self.rejected,
+                "plans": len(self._plans),
+            }
+
+
+_shared_caches: Dict[str, SQLPlanCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_sql_plan_cache(db: CachedSQLDatabase, embeddings: Embeddings,
+                       plans_path: str = "fintech_app/data/sql_plans.db") -> SQLPlanCache:
+    """Get the process-wide plan cache stored at plans_path."""
+    with _shared_lock:
+        if plans_path not in _shared_caches:
+            _shared_caches[plans_path] = SQLPlanCache(db, embeddings, plans_path)
+        return _shared_caches[plans_path]
@@ -0,0 +1,284 @@
+import argparse
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from .database import DESCRIPTIONS, STOCK_SYMBOLS, create_tables
+from .migrations import migrate, restore_aggregate_triggers, suspend_aggregate_triggers
+
+FIRST_NAMES = np.array(['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+                        'David', 'Elizabeth', 'Priya', 'Wei', 'Carlos', 'Aisha', 'Siva', 'Emily'])
+LAST_NAMES = np.array(['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+                       'Wilson', 'Taylor', 'Patel', 'Chen', 'Lopez', 'Khan', 'Valluru', 'Nguyen'])
+
+# Spending categories: (share of expense transactions, lognormal mu, lognormal sigma) of the amount.
+# Income and rent are generated separately on a fixed cadence.
+EXPENSE_PROFILES = {
+    'Food': (0.34, 3.2, 0.7),
+    'Utilities': (0.08, 4.3, 0.5),
+    'Transportation': (0.16, 3.4, 0.8),
+    'Housing': (0.03, 5.0, 0.9),
+    'Entertainment': (0.12, 3.3, 0.8),
+    'Healthcare': (0.06, 4.0, 0.9),
+    'Shopping': (0.17, 3.8, 0.9),
+    'Education': (0.04, 4.6, 1.0),
+}
+
+# Seasonal spending multiplier per category: (amplitude, day of year of the peak)
+SEASONALITY = {
+    'Shopping': (0.45, 355),
+    'Entertainment': (0.25, 200),
+    'Transportation': (0.15, 210),
+    'Utilities': (0.20, 20),
+    'Education': (0.40, 245),
+}
+
+# Typical purchase price range of each symbol
+HIGH_PRICED = {'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META'}
+
+
+def _dates_to_strings(start: date, day_offsets: np.ndarray) -> np.ndarray:
+    """Convert day offsets from start into 'YYYY-MM-DD' strings."""
+    return (np.datetime64(start, 'D') + day_offsets.astype('timedelta64[D]')).astype(str)
+
+
+def _seasonal_day_weights(start: date, days: int, amplitude: float, peak_day: int) -> np.ndarray:
+    """Probability of a transaction falling on each day, peaking around peak_day of the year."""
+    day_of_year = (np.datetime64(start, 'D') + np.arange(days)).astype('datetime64[D]')
+    day_of_year = (day_of_year - day_of_year.astype('datetime64[Y]')).astype(int)
+    weights = 1 + amplitude * np.cos(2 * np.pi * (day_of_year - peak_day) / 365.25)
+    # Slightly more spending on weekends (1970-01-01 was a Thursday)
+    weekday = (np.datetime64(start, 'D') + np.arange(days)).astype(int) % 7
+    weights *= np.where((weekday == 2) | (weekday == 3), 1.15, 1.0)
+    return weights / weights.sum()
+
+
+class SyntheticDataGenerator:
+    """Vectorized generator of realistic users, transactions and portfolios.
+
+    Users are generated in blocks; every block is sampled with a handful of
+    NumPy calls and bulk inserted, so millions of users can be generated with
+    flat memory use. The same seed always produces the same data.
+    """
+
+    def __init__(self, db_path: str = "fintech_app/data/finance_data.db", seed: int = 42,
+                 months: int = 12, end_date: date = None, block_size: int = 10_000,
+                 expenses_per_month: float = 30.0):
+        """Initialize the generator.
+
+        Args:
+            db_path: SQLite database to fill
+            seed: Random seed; the same seed produces the same rows
+            months: Number of months of transaction history per user
+            end_date: Last day of the history (defaults to today)
+            block_size: Number of users generated and inserted at a time
+            expenses_per_month: Average number of expense transactions per user per month
+        """
+        self.db_path = db_path
+        self.rng = np.random.default_rng(seed)
+        self.end_date = end_date or date.today()
+        self.days = int(months * 30.44)
+        self.start_date = self.end_date - timedelta(days=self.days - 1)
+        self.block_size = block_size
+        self.expenses_per_month = expenses_per_month
+
+        self.expense_categories = np.array(list(EXPENSE_PROFILES))
+        shares = np.array([profile[0] for profile in EXPENSE_PROFILES.values()])
+        self.category_shares = shares / shares.sum()
+        self.amount_mu = np.array([profile[1] for profile in EXPENSE_PROFILES.values()])
+        self.amount_sigma = np.array([profile[2] for profile in EXPENSE_PROFILES.values()])
+        self.descriptions = np.array([DESCRIPTIONS[category] for category in self.expense_categories])
+        self.day_weights = np.array([
+            _seasonal_day_weights(self.start_date, self.days, *SEASONALITY.get(category, (0.0, 0)))
+            for category in self.expense_categories
+        ])
+        self.symbols = np.array(STOCK_SYMBOLS)
+        self.symbol_price_ranges = np.array([
+            (100, 3000) if symbol in HIGH_PRICED else (20, 500) for symbol in STOCK_SYMBOLS
+        ], dtype=float)
+
+    def generate(self, n_users: int, reset: bool = False) -> dict:
+        """Generate n_users users with their transactions and portfolios.
+
+        All rows are inserted in a single transaction.
+
+        Args:
+            n_users: Number of users to generate
+            reset: Delete all existing users, transactions and portfolio rows first
+
+        Returns:
+            dict: Row counts, elapsed seconds and rows/sec per table
+        """
+        conn = sqlite3.connect(self.db_path)
+        # Bulk load settings: in-memory journal, no fsync, large page cache
+        conn.execute("PRAGMA journal_mode=MEMORY")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-262144")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+        c = conn.cursor()
+        create_tables(c)
+
+        if not reset:
+            c.execute("SELECT COUNT(*) FROM users WHERE email_id LIKE 'user%@synthetic.example.com'")
+            if c.fetchone()[0]:
+                conn.close()
+                raise ValueError("Synthetic users already exist; pass reset=True to regenerate them.")
+
+        counts = {"users": 0, "transactions": 0, "portfolio": 0}
+        seconds = {"users": 0.0, "transactions": 0.0, "portfolio": 0.0}
+        start = time.perf_counter()
+        c.execute("BEGIN")
+        # Aggregates are recomputed once at the end instead of row by row
+        triggers_suspended = suspend_aggregate_triggers(conn)
+        if reset:
+            c.execute("DELETE FROM transactions")
+            c.execute("DELETE FROM portfolio")
+            c.execute("DELETE FROM users")
+
+        for first_user in range(0, n_users, self.block_size):
+            block = range(first_user, min(first_user + self.block_size, n_users))
+            emails = np.array([f"user{i:07d}@synthetic.example.com" for i in block])
+
+            for table, rows in (("users", self._users(emails)),
+                                ("transactions", self._transactions(emails)),
+                                ("portfolio", self._portfolio(emails))):
+                table_start = time.perf_counter()
+                columns = {
+                    "users": "email_id, name, join_date",
+                    "transactions": "email_id, date, amount, category, description",
+                    "portfolio": "email_id, symbol, shares, purchase_price, purchase_date",
+                }[table]
+                placeholders = ", ".join("?" * len(rows))
+                c.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                              zip(*(column.tolist() for column in rows)))
+                counts[table] += len(rows[0])
+                seconds[table] += time.perf_counter() - table_start
+
+        conn.commit()
+        # Indexes are cheaper to build once after the bulk load than to maintain during it
+        migrate(conn)
+        if triggers_suspended:
+            restore_aggregate_triggers(conn)
+        conn.close()
+
+        elapsed = time.perf_counter() - start
+        total_rows = sum(counts.values())
+        return {
+            "rows": counts,
+            "insert_rows_per_sec": {table: counts[table] / seconds[table] if seconds[table] else 0.0
+                                    for table in counts},
+            "elapsed_seconds": elapsed,
+            "rows_per_sec": total_rows / elapsed if elapsed else 0.0,
+        }
+
+    def _users(self, emails: np.ndarray) -> tuple:
+        n = len(emails)
+        names = np.char.add(np.char.add(self.rng.choice(FIRST_NAMES, n), " "), self.rng.choice(LAST_NAMES, n))
+        join_offsets = -self.rng.integers(30, 365 * 3, n)
+        return emails, names, _dates_to_strings(self.start_date, join_offsets)
+
+    def _transactions(self, emails: np.ndarray) -> tuple:
+        n = len(emails)
+        rng = self.rng
+
+        # Income: salaries paid biweekly or monthly, plus occasional side income
+        salary = rng.lognormal(8.2, 0.45, n).round(-1)
+        biweekly = rng.random(n) < 0.6
+        period = np.where(biweekly, 14, 30)
+        pay_count = (self.days - 1) // period + 1
+        pay_user = np.repeat(np.arange(n), pay_count)
+        pay_index = np.arange(len(pay_user)) - np.repeat(np.cumsum(pay_count) - pay_count, pay_count)
+        pay_day = np.minimum(pay_index * period[pay_user] + rng.integers(0, 3, len(pay_user)), self.days - 1)
+        pay_amount = np.where(biweekly[pay_user], salary[pay_user] / 2, salary[pay_user])
+        pay_amount = (pay_amount * rng.normal(1.0, 0.02, len(pay_user))).round(2)
+
+        side_count = rng.poisson(0.4 * self.days / 30.44, n)
+        side_user = np.repeat(np.arange(n), side_count)
+        side_day = rng.integers(0, self.days, len(side_user))
+        side_amount = rng.lognormal(6.0, 0.8, len(side_user)).round(2)
+        side_description = rng.choice(DESCRIPTIONS['Income'][1:], len(side_user))
+
+        # Rent or mortgage on the first of every month
+        rent = (salary * rng.uniform(0.25, 0.4, n)).round(0)
+        month_starts = np.flatnonzero(
+            (np.datetime64(self.start_date, 'D') + np.arange(self.days)).astype('datetime64[D]')
+            == (np.datetime64(self.start_date, 'D') + np.arange(self.days)).astype('datetime64[M]')
+        )
+        rent_user = np.repeat(np.arange(n), len(month_starts))
+        rent_day = np.tile(month_starts, n)
+        owns_home = rng.random(n) < 0.35
+        rent_description = np.where(owns_home[rent_user], 'Mortgage', 'Rent')
+
+        # Expenses: per-user activity level, per-category seasonality and amount distributions
+        activity = rng.gamma(4.0, self.expenses_per_month / 4.0, n)
+        expense_count = rng.poisson(activity * self.days / 30.44)
+        expense_user = np.repeat(np.arange(n), expense_count)
+        category_index = rng.choice(len(self.expense_categories), len(expense_user), p=self.category_shares)
+        expense_day = np.empty(len(expense_user), dtype=np.int64)
+        for i in range(len(self.expense_categories)):
+            mask = category_index == i
+            expense_day[mask] = rng.choice(self.days, mask.sum(), p=self.day_weights[i])
+        expense_amount = -rng.lognormal(self.amount_mu[category_index], self.amount_sigma[category_index]).round(2)
+        expense_description = self.descriptions[category_index, rng.integers(0, 5, len(expense_user))]
+
+        user = np.concatenate([pay_user, side_user, rent_user, expense_user])
+        day = np.concatenate([pay_day, side_day, rent_day, expense_day])
+        amount = np.concatenate([pay_amount, side_amount, -rent[rent_user], expense_amount])
+        category = np.concatenate([
+            np.full(len(pay_user) + len(side_user), 'Income'),
+            np.full(len(rent_user), 'Housing'),
+            self.expense_categories[category_index],
+        ])
+        description = np.concatenate([
+            np.full(len(pay_user), 'Salary'), side_description, rent_description, expense_description
+        ])
+
+        # Insert in (user, date) order, like a real ledger
+        order = np.lexsort((day, user))
+        return (emails[user[order]], _dates_to_strings(self.start_date, day[order]),
+                amount[order], category[order], description[order])
+
+    def _portfolio(self, emails: np.ndarray) -> tuple:
+        n = len(emails)
+        rng = self.rng
+
+        # 0-12 distinct holdings per user: take the first k of a random permutation of the symbols
+        holding_count = rng.binomial(12, 0.45, n)
+        permutations = np.argsort(rng.random((n, len(self.symbols))), axis=1)
+        mask = np.arange(len(self.symbols)) < holding_count[:, None]
+        user, rank = np.nonzero(mask)
+        symbol_index = permutations[user, rank]
+
+        low, high = self.symbol_price_ranges[symbol_index].T
+        purchase_price = rng.uniform(low, high).round(2)
+        shares = rng.lognormal(2.0, 1.0, len(user)).round(2)
+        purchase_day = -rng.integers(0, 365 * 3, len(user))
+        return (emails[user], self.symbols[symbol_index], shares, purchase_price,
+                _dates_to_strings(self.end_date, purchase_day))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic finance database for load testing.")
+    parser.add_argument("--users", type=int, default=100_000, help="Number of users to generate")
+    parser.add_argument("--months", type=int, default=12, help="Months of transaction history per user")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--db-path", default="fintech_app/data/finance_data.db", help="SQLite database to fill")
+    parser.add_argument("--block-size", type=int, default=10_000, help="Users generated per block")
+    parser.add_argument("--reset", action="store_true", help="Delete existing rows first")
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(args.db_path, seed=args.seed, months=args.months,
+                                       block_size=args.block_size)
+    report = generator.generate(args.users, reset=args.reset)
+
+    for table, count in report["rows"].items():
+        print(f"{table}: {count:,} rows ({report['insert_rows_per_sec'][table]:,.0f} rows/sec inserted)")
+    print(f"Total: {sum(report['rows'].values()):,} rows in {report['elapsed_seconds']:.1f}s "
+          f"({report['rows_per_sec']:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
-import yfinance as yf
-from langchain_core.tools import Tool
+from langchain_core.tools import StructuredTool, Tool
+from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_experimental.tools import PythonREPLTool
 from .database import get_db_toolkit
+from .market_data import format_quote, get_market_data_provider, parse_symbols
+from .portfolio import get_portfolio_performance
+from .python_workers import get_python_worker_pool
 from .rag import RAGManager
+from .spending import get_spending_summary
+from .sql_engine import get_sql_database
+from .sql_plans import get_sql_plan_cache
 from typing import List, cast, Optional
 
 def setup_tools(rag_manager: RAGManager, llm, user_email: Optional[str] = None):
@@ -14,16 +19,28 @@ def setup_tools(rag_manager: RAGManager, llm, user_email: Optional[str] = None):
         llm: The language model to use for SQL toolkit
         user_email: The email of the currently logged in user
     """
+    return setup_shared_tools(rag_manager, llm) + setup_user_tools(rag_manager, user_email)
+
+class SpendingSummaryInput(BaseModel):
+    period: str = Field(
+        default="current_month",
+        description="current_month, last_month, last_3_months, last_6_months, last_12_months, "
+                    "year_to_date, all, a year (2024), a month (2024-03) or a range (2024-01:2024-03)"
+    )
+    category: Optional[str] = Field(
+        default=None,
+        description="Optional category (e.g. Food, Housing, Income) to break down month by month"
+    )
+
+def setup_user_tools(rag_manager: RAGManager, user_email: Optional[str] = None):
+    """Set up the tools that are bound to the currently logged in user.
     
-    # Market Data Tool
-    def get_stock_price(ticker):
-        """Get the latest price for a stock ticker."""
-        try:
-            stock = yf.Ticker(ticker)
-            price = stock.history(period="1d")['Close'].iloc[-1]
-            return f"The current price of {ticker} is ${price:.2f}"
-        except Exception as e:
-            return f"Error fetching stock price: {str(e)}"
+    These are cheap to create, so they can be built per user on top of the shared tools.
+    
+    Args:
+        rag_manager: The RAG manager for financial knowledge retrieval
+        user_email: The email of the currently logged in user
+    """
     
     # Financial Knowledge Retrieval Tool
     def retrieve_financial_knowledge(query):
@@ -32,7 +49,8 @@ def setup_tools(rag_manager: RAGManager, llm, user_email: Optional[str] = None):
             print(f"Retrieving financial knowledge for user: {user_email}")
             print(f"Query: {query}")
             print("="*100)
-            # Use RAG chain with user_email as the session_id for conversation history
+            # Use RAG chain with user_email as the session_id for conversation history.
+            # The chain and its session store are built once and reused across calls.
             rag_chain = rag_manager.get_conversational_rag_chain()
             response = rag_chain.invoke(
                 {"input": query},
@@ -43,28 +61,60 @@ def setup_tools(rag_manager: RAGManager, llm, user_email: Optional[str] = None):
         except Exception as e:
             return f"Error retrieving financial knowledge: {str(e)}"
     
-    # Python REPL Tool for data analysis
-    python_repl = PythonREPLTool()
+    # Spending Summary Tool, answered from the precomputed monthly totals
+    def spending_summary(period: str = "current_month", category: Optional[str] = None):
+        """Summarize the user's spending by category for a period."""
+        try:
+            return get_spending_summary("fintech_app/data/finance_data.db", user_email, period, category)
+        except Exception as e:
+            return f"Error getting spending summary: {str(e)}"
     
-    # Tavily Search Tool for market research
-    tavily_search = TavilySearchResults(max_results=3)
+    # Portfolio Performance Tool, computed from the holdings and one batched price snapshot
+    def portfolio_performance():
+        """Show the user's holdings with cost basis, market value, P&L, weights and returns."""
+        try:
+            return get_portfolio_performance("fintech_app/data/finance_data.db", user_email)
+        except Exception as e:
+            return f"Error getting portfolio performance: {str(e)}"
+    
+    # Saved Query Tool, answered from SQL templates learned from earlier questions of the same shape
+    plan_cache = get_sql_plan_cache(get_sql_database("sqlite:///fintech_app/data/finance_data.db"),
+                                    rag_manager.embeddings)
+    
+    def lookup_saved_query(question: str):
+        """Answer a database question with a saved SQL template."""
+        try:
+            result = plan_cache.lookup(question, user_email)
+        except Exception as e:
+            return f"Error running saved query: {str(e)}"
+        if result is None:
+            return "No saved query matches this question. Use the SQL database tools to answer it."
+        return result or "The saved query returned no rows."
+    
+    # Python Tool for data analysis, run in the warm worker pool with a namespace per user
+    python_pool = get_python_worker_pool()
+    
+    def python_calculator(code):
+        """Run Python code in the user's persistent session."""
+        return python_pool.run(code, session_id=user_email or "anonymous")
     
-    # Create the tools list
     tools = [
-        Tool(
-            name="get_stock_price",
-            func=get_stock_price,
-            description="Get the current price of a stock. Input should be a valid stock ticker symbol (e.g., AAPL, MSFT)."
-        ),
         Tool(
             name="python_calculator",
-            func=python_repl.run,
-            description="Useful for performing calculations, data analysis, or generating visualizations. Input should be Python code."
+            func=python_calculator,
+            description="Useful for performing calculations, data analysis, or generating visualizations. "
+                        "Input should be Python code. pandas (pd), numpy (np) and matplotlib.pyplot (plt) are "
+                        "already imported, and variables such as DataFrames persist between calls. "
+                        "Use print(...) or end with an expression to see a value."
         ),
-        Tool(
-            name="market_research",
-            func=tavily_search.invoke,
-            description="Search the web for financial news, market analysis, or investment advice. Input should be a search query."
+        StructuredTool.from_function(
+            func=spending_summary,
+            name="get_spending_summary",
+            description="""Get the user's spending by category, total income and net savings for a period,
+            or the month-by-month totals of one category. Use this first for questions about spending,
+            budgets, income or expenses by category or month; only fall back to SQL for questions
+            it cannot answer, such as individual transactions.""",
+            args_schema=SpendingSummaryInput
         ),
         Tool.from_function(
             func=retrieve_financial_knowledge,
@@ -78,13 +128,94 @@ def setup_tools(rag_manager: RAGManager, llm, user_email: Optional[str] = None):
         )
     ]
     
+    if user_email:
+        tools.append(StructuredTool.from_function(
+            func=portfolio_performance,
+            name="get_portfolio_performance",
+            description="""Get the user's investment portfolio performance in one call: per holding and in total,
+            the cost basis, current market value, unrealized P&L, portfolio weight and time-weighted return,
+            all computed from current prices. Use this for any question about how the user's portfolio or
+            holdings are doing instead of SQL, get_stock_price or Python calculations."""
+        ))
+        tools.append(Tool.from_function(
+            func=lookup_saved_query,
+            name="lookup_saved_query",
+            description="""Answer a question about the user's transactions or portfolio with a saved,
+            validated SQL query for questions of the same shape. Input should be the user's question.
+            Try this before the SQL database tools; if it finds no saved query, use the SQL tools."""
+        ))
+    return tools
+
+def finish_user_turn(rag_manager: RAGManager, user_email: Optional[str], completed: bool = True):
+    """Tell the per-user caches that the user's turn ended.
+    
+    Args:
+        rag_manager: The RAG manager whose embeddings index the SQL plan cache
+        user_email: The logged in user's email
+        completed: False if the agent failed or was cancelled
+    """
+    if user_email:
+        plan_cache = get_sql_plan_cache(get_sql_database("sqlite:///fintech_app/data/finance_data.db"),
+                                        rag_manager.embeddings)
+        plan_cache.finish_turn(user_email, learn=completed)
+
+def setup_shared_tools(rag_manager: RAGManager, llm):
+    """Set up the tools that do not depend on the logged in user.
+    
+    These are expensive to build (SQL schema reflection, search client)
+    and can be shared by every session in the process.
+    
+    Args:
+        rag_manager: The RAG manager for financial knowledge retrieval
+        llm: The language model to use for SQL toolkit
+    """
+    
+    # Market Data Tool, batched and cached by the shared market data provider
+    market_data = get_market_data_provider()
+    
+    def get_stock_price(tickers):
+        """Get the latest prices for one or more stock tickers."""
+        try:
+            symbols = parse_symbols(tickers)
+            quotes = market_data.get_quotes(symbols)
+            lines = [format_quote(quotes[symbol]) if symbol in quotes else f"No price data found for {symbol}"
+                     for symbol in symbols]
+            return "\n".join(lines)
+        except Exception as e:
+            return f"Error fetching stock price: {str(e)}"
+    
+    # Start the Python workers now, so they are warm by the first analysis request
+    get_python_worker_pool()
+    
+    # Tavily Search Tool for market research
+    tavily_search = TavilySearchResults(max_results=3)
+    
+    # Create the tools list
+    tools = [
+        Tool(
+            name="get_stock_price",
+            func=get_stock_price,
+            description="Get the current price of one or more stocks. Input should be a stock ticker symbol "
+                        "(e.g., AAPL) or a comma-separated list of symbols (e.g., AAPL, MSFT, GOOGL) fetched in one call."
+        ),
+        Tool(
+            name="market_research",
+            func=tavily_search.invoke,
+            description="Search the web for financial news, market analysis, or investment advice. Input should be a search query."
+        )
+    ]
+    
     # Get the SQL toolkit and add its tools with custom descriptions
     sql_toolkit = get_db_toolkit(llm)
     sql_tools = sql_toolkit.get_tools()
     
     # Customize database tool descriptions to include user context and specific use cases
+    # Successful queries teach the plan cache templates for the questions that missed it
+    plan_cache = get_sql_plan_cache(sql_toolkit.db, rag_manager.embeddings)
+    
     for tool in sql_tools:
         if tool.name == "sql_db_query":
+            tool.query_listeners = [plan_cache.observe_query]
             tool.description = """
 Execute SQL queries on the finance database to retrieve information about:
 1. User details (from the 'users' table) - Access user profile information
@@ -102,6 +233,7 @@ Get schema information about the finance database tables:
 - users: User account information (email_id, name, join_date)
 - transactions: Financial transaction records (id, email_id, date, amount, category, description)
 - portfolio: Investment holdings (id, email_id, symbol, shares, purchase_price, purchase_date)
+- monthly_category_totals: Precomputed totals per user, month (YYYY-MM) and category (email_id, month, category, total, transaction_count)
 
 Use this to understand database structure before querying.
 """
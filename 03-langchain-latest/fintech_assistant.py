@@ -1,31 +1,43 @@
 import streamlit as st
+import hashlib
+import json
 import os
+import pickle
+import re
 import uuid
+import zlib
+import numpy as np
 import pandas as pd
 import sqlite3
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
-import yfinance as yf
 from io import StringIO
+from typing import Optional
 
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.runnables import ConfigurableFieldSpec
+from langchain_core.runnables import ConfigurableFieldSpec, RunnableLambda
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_openai_tools_agent
-from langchain_core.tools import Tool
+from langchain_core.tools import StructuredTool, Tool
+from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_community.utilities import SQLDatabase
 from langchain_core.output_parsers import StrOutputParser
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_experimental.tools import PythonREPLTool
 
 from langchain_community.vectorstores import FAISS
-from langchain_core.embeddings import OpenAIEmbeddings
+from langchain_community.vectorstores.faiss import dependable_faiss_import
+from langchain_openai import OpenAIEmbeddings
 from langchain_core.runnables import RunnablePassthrough
 from langchain.chains.combine_documents.stuff import create_stuff_documents_chain
 from langchain.chains.retrieval import create_retrieval_chain
 
+from fintech_app.utils.analytics import get_spending_analytics
+from fintech_app.utils.market_data import format_quote, get_market_data_provider, parse_symbols
+
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
@@ -95,29 +107,99 @@ def setup_database():
     
     return SQLDatabase.from_uri("sqlite:///finance_data.db")
 
-# Set up RAG with financial knowledge
+# Sample financial advice documents for the RAG chain
+FINANCIAL_DOCS = [
+    "When investing, diversification is key to reducing risk. Spread investments across different asset classes.",
+    "Emergency funds should cover 3-6 months of expenses and be kept in liquid accounts.",
+    "Tax-advantaged accounts like 401(k)s and IRAs offer significant benefits for retirement planning.",
+    "Dollar-cost averaging involves investing a fixed amount regularly regardless of market conditions.",
+    "Pay off high-interest debt before investing aggressively in the market.",
+    "Index funds offer low-cost exposure to broad market segments with minimal fees.",
+    "Rebalancing your portfolio periodically helps maintain your desired asset allocation.",
+    "The rule of 72 can estimate how long it takes to double your money. Divide 72 by the annual rate of return.",
+    "Time in the market beats timing the market. Long-term investing typically outperforms short-term trading.",
+    "Consider your risk tolerance and time horizon when choosing investments."
+]
+
+# Saved FAISS index of the advice documents, with a manifest of the content hashes it holds
+FAISS_INDEX_DIR = "faiss_index"
+
+
+def content_hash(text):
+    """Stable id of a document's content."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _load_faiss_index(index_dir, embeddings, memory_map):
+    """Load a vector store written by FAISS.save_local, optionally memory-mapping the index file."""
+    faiss = dependable_faiss_import()
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if memory_map else 0
+    index = faiss.read_index(os.path.join(index_dir, "index.faiss"), flags)
+    with open(os.path.join(index_dir, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def load_or_update_vectorstore(documents, embeddings, index_dir=FAISS_INDEX_DIR):
+    """Get a FAISS store of the documents, embedding only what the saved index does not hold yet.
+
+    Documents are keyed by the hash of their content. When the manifest in
+    index_dir lists exactly these hashes, the index is memory-mapped from disk
+    without any embedding calls. Otherwise new documents are embedded and
+    appended, removed ones are deleted, and the index and manifest are saved
+    again. A different embedding model or an unreadable index means a rebuild.
+    """
+    by_hash = {content_hash(doc.page_content): doc for doc in documents}
+    model = getattr(embeddings, "model", type(embeddings).__name__)
+    manifest_path = os.path.join(index_dir, "manifest.json")
+
+    manifest = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("embedding_model") != model:
+            manifest = None
+
+    vectorstore = None
+    if manifest is not None:
+        stored = manifest["documents"]
+        stored_set = set(stored)
+        new = [h for h in by_hash if h not in stored_set]
+        removed = [h for h in stored if h not in by_hash]
+        try:
+            if not new and not removed:
+                return _load_faiss_index(index_dir, embeddings, memory_map=True)
+            vectorstore = _load_faiss_index(index_dir, embeddings, memory_map=False)
+            if removed:
+                vectorstore.delete(removed)
+            if new:
+                vectorstore.add_documents([by_hash[h] for h in new], ids=new)
+        except (OSError, RuntimeError, pickle.UnpicklingError, EOFError):
+            # Index files missing or half-written: fall back to a rebuild
+            vectorstore = None
+
+    if vectorstore is None:
+        vectorstore = FAISS.from_documents(list(by_hash.values()), embeddings, ids=list(by_hash))
+
+    vectorstore.save_local(index_dir)
+    # The manifest is written last, and atomically, so it never lists documents the index lacks
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"embedding_model": model, "documents": list(vectorstore.index_to_docstore_id.values())}, f)
+    os.replace(tmp_path, manifest_path)
+    return vectorstore
+
+
+# Set up RAG with financial knowledge, once per process rather than on every rerun
+@st.cache_resource
 def setup_rag():
-    # Sample financial advice documents
-    financial_docs = [
-        "When investing, diversification is key to reducing risk. Spread investments across different asset classes.",
-        "Emergency funds should cover 3-6 months of expenses and be kept in liquid accounts.",
-        "Tax-advantaged accounts like 401(k)s and IRAs offer significant benefits for retirement planning.",
-        "Dollar-cost averaging involves investing a fixed amount regularly regardless of market conditions.",
-        "Pay off high-interest debt before investing aggressively in the market.",
-        "Index funds offer low-cost exposure to broad market segments with minimal fees.",
-        "Rebalancing your portfolio periodically helps maintain your desired asset allocation.",
-        "The rule of 72 can estimate how long it takes to double your money. Divide 72 by the annual rate of return.",
-        "Time in the market beats timing the market. Long-term investing typically outperforms short-term trading.",
-        "Consider your risk tolerance and time horizon when choosing investments."
-    ]
-    
     # Create documents
     from langchain_core.documents import Document
-    documents = [Document(page_content=doc, metadata={"source": "financial_advice"}) for doc in financial_docs]
+    documents = [Document(page_content=doc, metadata={"source": "financial_advice"}) for doc in FINANCIAL_DOCS]
     
-    # Create vector store
+    # Load the saved vector store, embedding only documents it does not hold yet
     embeddings = OpenAIEmbeddings()
-    vectorstore = FAISS.from_documents(documents=documents, embedding=embeddings)
+    vectorstore = load_or_update_vectorstore(documents, embeddings)
     retriever = vectorstore.as_retriever()
     
     # Create RAG chain
@@ -133,6 +215,20 @@ def setup_rag():
     
     return rag_chain
 
+class AnalyzeSpendingInput(BaseModel):
+    analysis: str = Field(
+        default="by_category",
+        description="by_category (totals and shares), monthly (month by category pivot), rolling "
+                    "(rolling 30 and 90-day spend), mom (month-over-month change per category), "
+                    "top (merchants/descriptions with the most spend) or outliers (unusually large transactions)"
+    )
+    category: Optional[str] = Field(default=None, description="Optional category to restrict to, e.g. Food")
+    period: str = Field(
+        default="all",
+        description="all, year_to_date, last_3_months, a year (2023), a month (2023-03) or a range (2023-01:2023-03)"
+    )
+    top_n: int = Field(default=10, description="Number of rows for top and outliers")
+
 # Define tools
 def setup_tools(db):
     # SQL Tool
@@ -146,33 +242,25 @@ def setup_tools(db):
         except Exception as e:
             return f"Error executing SQL query: {str(e)}"
     
-    # Market Data Tool
-    def get_stock_price(ticker):
-        """Get the latest price for a stock ticker."""
+    # Market Data Tool, batched and cached by the shared market data provider
+    def get_stock_price(tickers):
+        """Get the latest prices for one or more stock tickers."""
         try:
-            stock = yf.Ticker(ticker)
-            price = stock.history(period="1d")['Close'].iloc[-1]
-            return f"The current price of {ticker} is ${price:.2f}"
+            symbols = parse_symbols(tickers)
+            quotes = get_market_data_provider().get_quotes(symbols)
+            lines = [format_quote(quotes[symbol]) if symbol in quotes else f"No price data found for {symbol}"
+                     for symbol in symbols]
+            return "\n".join(lines)
         except Exception as e:
             return f"Error fetching stock price: {str(e)}"
     
-    # Transaction Analysis Tool
-    def analyze_spending(category=None):
-        """Analyze spending patterns, optionally filtering by category."""
+    # Transaction Analysis Tool, answered from the cached columnar copy of the transactions
+    analytics = get_spending_analytics('finance_data.db')
+    
+    def analyze_spending(analysis="by_category", category=None, period="all", top_n=10):
+        """Analyze spending patterns, optionally filtering by category and period."""
         try:
-            conn = sqlite3.connect('finance_data.db')
-            if category:
-                query = f"SELECT category, SUM(amount) as total FROM transactions WHERE category = '{category}' AND amount < 0 GROUP BY category"
-            else:
-                query = "SELECT category, SUM(amount) as total FROM transactions WHERE amount < 0 GROUP BY category"
-            
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            
-            if df.empty:
-                return "No transaction data available for analysis."
-            
-            return df.to_markdown()
+            return analytics.analyze(analysis, category=category, period=period, top_n=top_n)
         except Exception as e:
             return f"Error analyzing spending: {str(e)}"
     
@@ -192,12 +280,16 @@ def setup_tools(db):
         Tool(
             name="get_stock_price",
             func=get_stock_price,
-            description="Get the current price of a stock. Input should be a valid stock ticker symbol (e.g., AAPL, MSFT)."
+            description="Get the current price of one or more stocks. Input should be a stock ticker symbol "
+                        "(e.g., AAPL) or a comma-separated list of symbols (e.g., AAPL, MSFT, GOOGL) fetched in one call."
         ),
-        Tool(
-            name="analyze_spending",
+        StructuredTool.from_function(
             func=analyze_spending,
-            description="Analyze spending patterns by category. Input can be a specific category or empty for all categories."
+            name="analyze_spending",
+            description="Analyze spending patterns: totals by category, monthly pivots, rolling 30/90-day spend, "
+                        "month-over-month changes, top merchants/descriptions or unusual transactions. "
+                        "Prefer this over SQL for questions about spending.",
+            args_schema=AnalyzeSpendingInput
         ),
         Tool(
             name="python_calculator",
@@ -213,6 +305,114 @@ def setup_tools(db):
     
     return tools
 
+# Query routing
+# Example messages for each route; the router compares new messages against these locally, without an LLM call
+ROUTE_EXAMPLES = {
+    "advice": [
+        "What is your advice on saving for retirement?",
+        "Should I pay off debt or invest first?",
+        "What are the best practices for building an emergency fund?",
+        "How should I start investing?",
+        "Is it a good idea to invest in index funds?",
+        "What investment strategy do you recommend for a beginner?",
+        "How much of my income should I save?",
+        "What is dollar-cost averaging and should I use it?",
+    ],
+    "agent": [
+        "What's my current spending by category?",
+        "What's the price of AAPL stock?",
+        "Show me my investment portfolio performance",
+        "Calculate a monthly mortgage payment for $300,000",
+        "What are the latest news about interest rates?",
+        "How much did I spend on food last month?",
+        "List my recent transactions",
+        "Plot my monthly expenses",
+    ],
+}
+
+# Phrases that decide the route on their own
+ROUTE_KEYWORDS = {
+    "advice": re.compile(r"\b(advice|advise|best practices?|should i|recommend\w*|is it (a )?(good|wise|smart)|"
+                         r"better than|worth it|strateg\w*)\b", re.IGNORECASE),
+    "agent": re.compile(r"\b(my (spending|transactions?|portfolio|expenses|income|holdings)|price of|stock price|"
+                        r"calculate|plot|news|sql)\b", re.IGNORECASE),
+}
+
+
+def _hash_embedding(text, dimensions=512):
+    """Local bag-of-words embedding: hashed word unigrams and bigrams, L2-normalized."""
+    words = re.findall(r"[a-z0-9$']+", text.lower())
+    vector = np.zeros(dimensions)
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        vector[zlib.crc32(feature.encode("utf-8")) % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class PipelineRunCounter(BaseCallbackHandler):
+    """Counts the messages the history wrapper handles and the pipeline runs they start, from the run events."""
+
+    def __init__(self, stats, pipeline_routes):
+        self.stats = stats
+        self.pipeline_routes = pipeline_routes
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self.stats["messages"] += 1
+        route = self.pipeline_routes.get(kwargs.get("name"))
+        if route is not None:
+            self.stats["executions"][route] = self.stats["executions"].get(route, 0) + 1
+
+
+class QueryRouter:
+    """Routes each message to exactly one pipeline: the RAG chain for advice, the tool agent otherwise.
+
+    The intent is classified once per message, with keywords first and then the
+    similarity to the route examples. `counter` records the messages and the
+    pipeline runs it observes, so `stats` shows whether a message ever ran more
+    than one pipeline.
+    """
+
+    def __init__(self, rag_chain, agent_executor, stats, default_route="agent", min_similarity=0.15):
+        self.pipelines = {
+            "advice": rag_chain.with_config(run_name="advice_pipeline"),
+            "agent": agent_executor.with_config(run_name="agent_pipeline"),
+        }
+        self.stats = stats
+        self.counter = PipelineRunCounter(stats, {f"{route}_pipeline": route for route in self.pipelines})
+        self.default_route = default_route
+        self.min_similarity = min_similarity
+        self.centroids = {
+            route: np.mean([_hash_embedding(example) for example in examples], axis=0)
+            for route, examples in ROUTE_EXAMPLES.items()
+        }
+
+    def classify(self, query):
+        """Pick a route for a message, returning (route, reason)."""
+        matches = [route for route, pattern in ROUTE_KEYWORDS.items() if pattern.search(query)]
+        if len(matches) == 1:
+            return matches[0], "keyword"
+        vector = _hash_embedding(query)
+        scores = {route: float(vector @ centroid) for route, centroid in self.centroids.items()}
+        route = max(scores, key=scores.get)
+        if scores[route] < self.min_similarity:
+            return self.default_route, "default"
+        return route, f"similarity {scores[route]:.2f}"
+
+    def route(self, inputs):
+        """Classify the message once and run the one pipeline it belongs to."""
+        query = inputs["input"]
+        chat_history = inputs.get("chat_history", [])
+        route, _ = self.classify(query)
+        result = self.pipelines[route].invoke({"input": query, "chat_history": chat_history})
+        return {"output": result["answer"] if route == "advice" else result["output"], "route": route}
+
+    def executions_per_message(self):
+        """Pipeline executions per message; 1.0 means every message ran exactly one pipeline."""
+        executions = sum(self.stats["executions"].values())
+        return executions / self.stats["messages"] if self.stats["messages"] else 0.0
+
+
 # Create Agent with memory and tools
 def setup_agent(tools, rag_chain):
     # Define agent prompt
@@ -240,16 +440,12 @@ def setup_agent(tools, rag_chain):
     agent = create_openai_tools_agent(llm, tools, prompt)
     agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
     
-    # Combine agent with RAG chain
-    def process_query(query):
-        if "advice" in query.lower() or "best practices" in query.lower() or "should I" in query.lower():
-            return rag_chain.invoke({"input": query, "chat_history": []})
-        else:
-            return agent_executor.invoke({"input": query})
+    # Combine agent with RAG chain: every message is classified once and runs exactly one of them
+    router = QueryRouter(rag_chain, agent_executor, st.session_state.router_stats)
     
     # Create a combined runnable with message history
     combined_chain = RunnableWithMessageHistory(
-        lambda x: {"output": process_query(x["input"])["answer"] if "answer" in process_query(x["input"]) else process_query(x["input"])["output"]},
+        RunnableLambda(router.route),
         get_session_history,
         input_messages_key="input",
         history_messages_key="chat_history",
@@ -265,9 +461,10 @@ def setup_agent(tools, rag_chain):
                 name="Conversation ID",
             ),
         ],
-    )
+        output_messages_key="output",
+    ).with_config(callbacks=[router.counter])
     
-    return combined_chain
+    return combined_chain, router
 
 # Chat message history management
 def get_session_history(user_id: str, conversation_id: str) -> ChatMessageHistory:
@@ -322,6 +519,9 @@ def main():
     if "store" not in st.session_state:
         st.session_state.store = {}
 
+    if "router_stats" not in st.session_state:
+        st.session_state.router_stats = {"messages": 0, "executions": {}}
+
     if "user_id" not in st.session_state:
         st.session_state.user_id = str(uuid.uuid4())
 
@@ -343,7 +543,7 @@ def main():
     db = setup_database()
     rag_chain = setup_rag()
     tools = setup_tools(db)
-    combined_chain = setup_agent(tools, rag_chain)
+    combined_chain, router = setup_agent(tools, rag_chain)
     
     # Sidebar for conversation management
     with st.sidebar:
@@ -378,6 +578,10 @@ def main():
         - What are the latest news about interest rates?
         - Show me my investment portfolio performance
         """)
+        
+        st.divider()
+        st.caption(f"Messages routed: {router.stats['messages']}, "
+                   f"pipeline runs per message: {router.executions_per_message():.2f}")
     
     # Main chat interface
     current_conv = st.session_state.conversations[st.session_state.current_conversation_id]
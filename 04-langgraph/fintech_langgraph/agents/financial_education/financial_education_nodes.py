@@ -15,7 +15,7 @@ import os
 import json
 import logging
 import torch
-from langchain_openai import OpenAIEmbeddings
+from fintech_langgraph.knowledge_base.embedding_cache import get_cached_embeddings
 from fintech_langgraph.agents.financial_education.state import (
     FinancialEducationState,
     FinancialEducationInput,
@@ -32,7 +32,7 @@ logger = logging.getLogger(__name__)
 
 # Initialize components
 logger.info("Initializing components...")
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+embeddings = get_cached_embeddings(model="text-embedding-3-small")
 llm = ChatOpenAI(temperature=0.7)
 logger.info("Components initialized successfully")
 
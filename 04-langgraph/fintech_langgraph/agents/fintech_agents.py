@@ -2,17 +2,17 @@ from langchain_openai import ChatOpenAI
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, MessagesPlaceholder
 from langchain.schema import SystemMessage
-from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
-from langchain_community.utilities import SQLDatabase
 from langchain.tools import tool
-from langchain_experimental.tools import PythonREPLTool
 from langchain_community.tools.tavily_search import TavilySearchResults
 
 from typing import List, Dict, Any
 import os
 from dotenv import load_dotenv
 from fintech_langgraph.knowledge_base.chroma_manager import ChromaManager
-import yfinance as yf # type: ignore
+from fintech_langgraph.utils.sql_engine import CachedSQLDatabaseToolkit, get_sql_database
+from fintech_langgraph.utils.market_data import get_market_data_provider, parse_symbols
+from fintech_langgraph.utils.python_workers import POOL_SIZE, PythonWorkerTool
+from fintech_langgraph.utils.agents import ParallelAgentExecutor
 from datetime import datetime
 
 # Load environment variables
@@ -28,9 +28,9 @@ llm = ChatOpenAI(
     streaming=True
 )
 
-# Initialize SQL Database
-db = SQLDatabase.from_uri("sqlite:///fintech.db")
-sql_toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+# Initialize SQL Database (shared engine and cached schema)
+db = get_sql_database("sqlite:///fintech.db")
+sql_toolkit = CachedSQLDatabaseToolkit(db=db, llm=llm, scope="fintech_agents")
 
 # Initialize Tavily Search
 tavily_search = TavilySearchResults(max_results=3)
@@ -51,29 +51,41 @@ def search_knowledge_base(query: str) -> str:
 
 @tool
 def get_stock_price(symbol: str) -> str:
-    """Get real-time stock price and basic information for a given symbol.
+    """Get real-time stock price and basic information for one or more symbols.
     Use this tool when you need current market data for specific stocks.
+    Pass several symbols separated by commas (e.g. "AAPL, MSFT, GOOGL") to fetch them in one call.
     """
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        return f"""
-Symbol: {symbol}
-Current Price: ${info.get('currentPrice', 'N/A')}
-Previous Close: ${info.get('previousClose', 'N/A')}
-Day Range: ${info.get('dayLow', 'N/A')} - ${info.get('dayHigh', 'N/A')}
-52 Week Range: ${info.get('fiftyTwoWeekLow', 'N/A')} - ${info.get('fiftyTwoWeekHigh', 'N/A')}
-Market Cap: ${info.get('marketCap', 'N/A'):,.2f}
-Volume: {info.get('volume', 'N/A'):,}
-"""
+        symbols = parse_symbols(symbol)
+        quotes = get_market_data_provider().get_quotes(symbols)
+        results = []
+        for requested in symbols:
+            quote = quotes.get(requested)
+            if quote is None:
+                results.append(f"\nSymbol: {requested}\nNo market data found.\n")
+                continue
+            price = lambda value: f"${value:,.2f}" if value is not None else "N/A"
+            volume = f"{quote.volume:,}" if quote.volume is not None else "N/A"
+            results.append(f"""
+Symbol: {quote.symbol}
+Current Price: {price(quote.price)}
+Previous Close: {price(quote.previous_close)}
+Day Range: {price(quote.day_low)} - {price(quote.day_high)}
+52 Week Range: {price(quote.fifty_two_week_low)} - {price(quote.fifty_two_week_high)}
+Volume: {volume}
+""")
+        return "".join(results)
     except Exception as e:
         return f"Error fetching stock data for {symbol}: {str(e)}"
 
+# Python tool for the portfolio manager, with its own session in the worker pool
+python_tool = PythonWorkerTool(session_id="portfolio_manager")
+
 # Create tools list for portfolio manager
 portfolio_tools = [
     *sql_toolkit.get_tools(),
     search_knowledge_base,
-    PythonREPLTool(),
+    python_tool,
     tavily_search,
 
     get_stock_price
@@ -134,10 +146,13 @@ def create_agent_prompt(system_prompt: str) -> ChatPromptTemplate:
 def create_portfolio_manager_agent() -> AgentExecutor:
     prompt = create_agent_prompt(PORTFOLIO_MANAGER_PROMPT)
     agent = create_tool_calling_agent(llm=llm, tools=portfolio_tools, prompt=prompt)
-    return AgentExecutor(
+    # Tool calls of one step run concurrently; Python calls share a session, so they run in order
+    return ParallelAgentExecutor(
         agent=agent,
         tools=portfolio_tools,
         verbose=True,
-        max_iterations=20
+        max_iterations=20,
+        serial_tools=[python_tool.name],
+        tool_concurrency={python_tool.name: POOL_SIZE, tavily_search.name: 4}
     )
 
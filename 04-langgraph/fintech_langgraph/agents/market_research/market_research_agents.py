@@ -5,7 +5,8 @@ from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, Me
 from langchain.schema import SystemMessage
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain.tools import tool
-from langchain_experimental.tools import PythonREPLTool
+from fintech_langgraph.utils.python_workers import POOL_SIZE, PythonWorkerTool
+from fintech_langgraph.utils.agents import ParallelAgentExecutor
 from datetime import datetime
 
 # Get current date
@@ -149,39 +150,52 @@ def create_agent_prompt(system_prompt: str) -> ChatPromptTemplate:
         ]
     )
 
+# Python tool for the market research agents, with its own session in the worker pool
+python_tool = PythonWorkerTool(session_id="market_research")
+
 # Create tools list for market research agents
 market_research_tools = [
     tavily_search,
-    PythonREPLTool()
+    python_tool
 ]
 
+# Tool calls of one step run concurrently; Python calls share a session, so they run in order
+SERIAL_TOOLS = [python_tool.name]
+TOOL_CONCURRENCY = {python_tool.name: POOL_SIZE, tavily_search.name: 4}
+
 # Create agents
 def create_market_conditions_agent() -> AgentExecutor:
     prompt = create_agent_prompt(MARKET_CONDITIONS_PROMPT)
     agent = create_tool_calling_agent(llm=llm, tools=market_research_tools, prompt=prompt)
-    return AgentExecutor(
+    return ParallelAgentExecutor(
         agent=agent,
         tools=market_research_tools,
         verbose=True,
-        max_iterations=10
+        max_iterations=10,
+        serial_tools=SERIAL_TOOLS,
+        tool_concurrency=TOOL_CONCURRENCY
     )
 
 def create_sentiment_analysis_agent() -> AgentExecutor:
     prompt = create_agent_prompt(SENTIMENT_ANALYSIS_PROMPT)
     agent = create_tool_calling_agent(llm=llm, tools=market_research_tools, prompt=prompt)
-    return AgentExecutor(
+    return ParallelAgentExecutor(
         agent=agent,
         tools=market_research_tools,
         verbose=True,
-        max_iterations=10
+        max_iterations=10,
+        serial_tools=SERIAL_TOOLS,
+        tool_concurrency=TOOL_CONCURRENCY
     )
 
 def create_trend_analysis_agent() -> AgentExecutor:
     prompt = create_agent_prompt(TREND_ANALYSIS_PROMPT)
     agent = create_tool_calling_agent(llm=llm, tools=market_research_tools, prompt=prompt)
-    return AgentExecutor(
+    return ParallelAgentExecutor(
         agent=agent,
         tools=market_research_tools,
         verbose=True,
-        max_iterations=10
+        max_iterations=10,
+        serial_tools=SERIAL_TOOLS,
+        tool_concurrency=TOOL_CONCURRENCY
     ) 
\ No newline at end of file
@@ -2,6 +2,7 @@ from typing import Annotated, Sequence, TypedDict, Dict, Any, List, Union
 from langgraph.graph import StateGraph, END, START
 from langgraph.constants import Send
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 import logging
 import threading
@@ -12,6 +13,7 @@ from fintech_langgraph.agents.market_research.market_research_agents import (
     create_trend_analysis_agent
 )
 from fintech_langgraph.agents.market_research.state import MarketResearchState, MarketResearchInput
+from fintech_langgraph.main_graph.registry import ComponentRegistry
 
 # Configure logging
 logging.basicConfig(
@@ -27,6 +29,12 @@ llm = ChatOpenAI(
     streaming=True
 )
 
+# Research agents, built once and shared by every run of the graph
+research_agents = ComponentRegistry()
+research_agents.register("market_conditions", create_market_conditions_agent)
+research_agents.register("sentiment_analysis", create_sentiment_analysis_agent)
+research_agents.register("trend_analysis", create_trend_analysis_agent)
+
 def start_research(state: MarketResearchInput) -> Dict[str, Any]:
     """Initiates the market research process with parallel analysis"""
     thread_name = threading.current_thread().name
@@ -42,15 +50,15 @@ def start_research(state: MarketResearchInput) -> Dict[str, Any]:
         ]
     }
 
-def analyze_market_conditions(state: MarketResearchInput) -> Dict[str, Any]:
+def analyze_market_conditions(state: MarketResearchInput, config: RunnableConfig) -> Dict[str, Any]:
     """Analyze current market conditions"""
     thread_name = threading.current_thread().name
     logger.info(f"[{thread_name}] Starting market conditions analysis")
     try:
-        agent = create_market_conditions_agent()
+        agent = research_agents.get("market_conditions")
         query = f"Analyze current market conditions for {state['sector'] if state['sector'] else 'the market'} over {state['timeframe'] if state['timeframe'] else 'recent period'}. Consider: {state['query']}"
         logger.info(f"[{thread_name}] Executing market conditions query: {query}")
-        result = agent.invoke({"input": query})
+        result = agent.invoke({"input": query}, config)
         # Parse JSON response
         try:
             market_conditions = json.loads(result["output"])
@@ -63,15 +71,15 @@ def analyze_market_conditions(state: MarketResearchInput) -> Dict[str, Any]:
         logger.error(f"[{thread_name}] {error_msg}")
         return {"error": error_msg}
 
-def analyze_sentiment(state: MarketResearchInput) -> Dict[str, Any]:
+def analyze_sentiment(state: MarketResearchInput, config: RunnableConfig) -> Dict[str, Any]:
     """Analyze market sentiment"""
     thread_name = threading.current_thread().name
     logger.info(f"[{thread_name}] Starting sentiment analysis")
     try:
-        agent = create_sentiment_analysis_agent()
+        agent = research_agents.get("sentiment_analysis")
         query = f"Analyze market sentiment for {state['sector'] if state['sector'] else 'the market'} over {state['timeframe'] if state['timeframe'] else 'recent period'}. Consider: {state['query']}"
         logger.info(f"[{thread_name}] Executing sentiment analysis query: {query}")
-        result = agent.invoke({"input": query})
+        result = agent.invoke({"input": query}, config)
         # Parse JSON response
         try:
             sentiment_analysis = json.loads(result["output"])
@@ -84,15 +92,15 @@ def analyze_sentiment(state: MarketResearchInput) -> Dict[str, Any]:
         logger.error(f"[{thread_name}] {error_msg}")
         return {"error": error_msg}
 
-def analyze_trends(state: MarketResearchInput) -> Dict[str, Any]:
+def analyze_trends(state: MarketResearchInput, config: RunnableConfig) -> Dict[str, Any]:
     """Analyze market trends"""
     thread_name = threading.current_thread().name
     logger.info(f"[{thread_name}] Starting trend analysis")
     try:
-        agent = create_trend_analysis_agent()
+        agent = research_agents.get("trend_analysis")
         query = f"Analyze market trends for {state['sector'] if state['sector'] else 'the market'} over {state['timeframe'] if state['timeframe'] else 'recent period'}. Consider: {state['query']}"
         logger.info(f"[{thread_name}] Executing trend analysis query: {query}")
-        result = agent.invoke({"input": query})
+        result = agent.invoke({"input": query}, config)
         # Parse JSON response
         try:
             trend_analysis = json.loads(result["output"])
@@ -189,6 +197,9 @@ def create_market_research_graph():
     workflow.add_edge("analyze_trends", "generate_recommendations")
     workflow.add_edge("generate_recommendations", END)
 
+    # Build the research agents along with the graph, so the first run does not pay for them
+    research_agents.warm_up()
+
     logger.info("Market research graph created successfully")
     return workflow.compile()
 
@@ -5,9 +5,8 @@ from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.tools import Tool
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_chroma import Chroma
-from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
-from langchain_community.utilities.sql_database import SQLDatabase
-from langchain_openai import OpenAIEmbeddings
+from fintech_langgraph.knowledge_base.embedding_cache import get_cached_embeddings
+from fintech_langgraph.utils.sql_engine import CachedSQLDatabaseToolkit, get_sql_database
 from langchain.chains.combine_documents.stuff import create_stuff_documents_chain
 from langchain.chains.retrieval import create_retrieval_chain
 import yfinance as yf
@@ -32,12 +31,12 @@ logger = logging.getLogger(__name__)
 # Initialize global LLM and tools
 llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
 
-# Initialize database toolkit
-db = SQLDatabase.from_uri("sqlite:///fintech.db")
-db_toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+# Initialize database toolkit (shared engine and cached schema)
+db = get_sql_database("sqlite:///fintech.db")
+db_toolkit = CachedSQLDatabaseToolkit(db=db, llm=llm, scope="portfolio_optimization")
 
 # Initialize RAG components
-embeddings = OpenAIEmbeddings()
+embeddings = get_cached_embeddings()
 vector_store = Chroma(
     collection_name="fintech_knowledge",
     embedding_function=embeddings,
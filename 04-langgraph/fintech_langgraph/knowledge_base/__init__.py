@@ -3,5 +3,6 @@ This module contains the knowledge base management functionality.
 """
 
 from .chroma_manager import ChromaManager
+from .embedding_cache import CachedEmbeddings, get_cached_embeddings
 
-__all__ = ['ChromaManager'] 
\ No newline at end of file
+__all__ = ['ChromaManager', 'CachedEmbeddings', 'get_cached_embeddings'] 
\ No newline at end of file
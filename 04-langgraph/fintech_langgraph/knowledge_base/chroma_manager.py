@@ -1,11 +1,14 @@
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from typing import List, Dict, Any, Union
+import hashlib
 import os
+import re
 from dotenv import load_dotenv
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 import logging
+from fintech_langgraph.knowledge_base.embedding_cache import get_cached_embeddings
+from fintech_langgraph.knowledge_base.hybrid_search import BM25Index, hybrid_search
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -13,33 +16,51 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+def chunk_id(source: str, text: str, splitter_config: str) -> str:
+    """
+    Build a deterministic id for a chunk.
+    
+    The id is a hash of the source, the whitespace-normalized text and the
+    splitter configuration, so re-ingesting unchanged content yields the same ids.
+    """
+    normalized = re.sub(r"\s+", " ", text).strip()
+    key = "\x1f".join([source, normalized, splitter_config])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
 class ChromaManager:
-    def __init__(self):
+    def __init__(self, persist_directory: str = "./chroma_db"):
         logger.info("Initializing ChromaManager...")
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small"
-           
-        )
+        self.embeddings = get_cached_embeddings(model="text-embedding-3-small")
         self.vectorstore = Chroma(
-            persist_directory="./chroma_db",
+            persist_directory=persist_directory,
             embedding_function=self.embeddings
         )
+        # BM25 keyword index persisted alongside the Chroma data
+        self.bm25_index = BM25Index(os.path.join(persist_directory, "bm25_index.npz"))
+        added = self.bm25_index.sync_with_collection(self.vectorstore._collection)
+        if added:
+            logger.info(f"Indexed {added} existing chunks for keyword search")
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200
         )
+        self.splitter_config = "recursive:1000:200"
         logger.info("ChromaManager initialized successfully")
     
     def add_document(self, filename: str, content: Union[str, bytes]) -> str:
         """
         Add a document to the vector store.
         
+        Chunks are keyed by a content hash, and chunks that already exist in the
+        vector store are skipped, so re-uploading an unchanged file costs no
+        embedding calls.
+        
         Args:
             filename (str): Name of the file
             content (Union[str, bytes]): Content of the file, can be string or bytes
             
         Returns:
-            str: Success message
+            str: Success message with inserted/skipped counts
         """
         try:
             logger.info(f"Processing document: {filename}")
@@ -54,22 +75,36 @@ class ChromaManager:
             chunks = self.text_splitter.split_text(content)
             logger.info(f"Created {len(chunks)} chunks")
             
+            # Key every chunk by its content hash, dropping duplicates within the file
+            chunks_by_id = {}
+            for chunk in chunks:
+                chunks_by_id.setdefault(chunk_id(filename, chunk, self.splitter_config), chunk)
+            
+            # Skip chunks that are already in the vector store
+            existing_ids = set(self.vectorstore._collection.get(ids=list(chunks_by_id), include=[])["ids"])
+            new_ids = [cid for cid in chunks_by_id if cid not in existing_ids]
+            skipped = len(chunks) - len(new_ids)
+            logger.info(f"{len(new_ids)} new chunks, {skipped} already indexed")
+            
             # Create documents with metadata
             logger.info("Creating document objects...")
             documents = [
                 Document(
-                    page_content=chunk,
+                    page_content=chunks_by_id[cid],
                     metadata={"source": filename}
                 )
-                for chunk in chunks
+                for cid in new_ids
             ]
             
             # Add documents to vector store
-            logger.info("Adding documents to vector store...")
-            self.vectorstore.add_documents(documents)
-            logger.info(f"Successfully added {len(chunks)} chunks from {filename}")
+            if documents:
+                logger.info("Adding documents to vector store...")
+                self.vectorstore.add_documents(documents, ids=new_ids)
+                self.bm25_index.add(new_ids, [doc.page_content for doc in documents])
+                self.bm25_index.save()
+            logger.info(f"Successfully added {len(new_ids)} chunks from {filename}")
             
-            return f"Successfully added {len(chunks)} chunks from {filename}"
+            return f"Successfully added {len(new_ids)} chunks from {filename} ({skipped} unchanged chunks skipped)"
             
         except Exception as e:
             error_msg = f"Error adding document: {str(e)}"
@@ -77,10 +112,16 @@ class ChromaManager:
             raise Exception(error_msg)
     
     def search_documents(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
-        """Search the knowledge base for relevant documents."""
+        """
+        Search the knowledge base for relevant documents.
+        
+        Vector similarity and BM25 keyword results are fused with reciprocal rank
+        fusion, so exact terms like tickers or "401(k)" are matched as well.
+        The returned score is the fused score (higher is better).
+        """
         try:
             logger.info(f"Searching documents with query: {query}")
-            results = self.vectorstore.similarity_search_with_score(query, k=n_results)
+            results = hybrid_search(self.vectorstore, self.bm25_index, query, k=n_results)
             logger.info(f"Found {len(results)} results")
             return [
                 {
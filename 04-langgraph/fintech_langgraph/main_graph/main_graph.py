@@ -9,10 +9,15 @@ load_dotenv()
 from typing import Dict, Any, Optional
 from langgraph.graph import StateGraph, END
 from fintech_langgraph.main_graph.models import FintechState, AgentType, AgentResponse
-from fintech_langgraph.main_graph.supervisor import decide_next_step, COMPONENT_GRAPHS
+from fintech_langgraph.main_graph.supervisor import decide_next_step, get_router_stats, COMPONENT_GRAPHS
+from fintech_langgraph.main_graph.registry import ComponentRegistry
+from fintech_langgraph.utils.python_workers import RUN_SESSION_METADATA, reset_python_run
 import json
 import asyncio
 
+# Registry name of the main graph; components are registered under their agent type
+MAIN_GRAPH = "main_graph"
+
 
 def synthesize_responses(state: FintechState) -> FintechState:
     """
@@ -101,22 +106,21 @@ def handle_component(state: FintechState, agent_type: AgentType) -> FintechState
     """
     try:
         print(f"\nHandling component: {agent_type.value}")
-        # Get component graph
-        graph_creator = COMPONENT_GRAPHS.get(agent_type)
-        if graph_creator:
-            print(f"Graph creator found: {graph_creator}")
-            # Create the component
-            component = graph_creator()
+        # Get the component, compiled once and reused across hops and requests
+        if agent_type.value in component_registry:
+            component = component_registry.get(agent_type.value)
+            # Python calls of the component run in this run's own namespaces
+            config = {"metadata": {RUN_SESSION_METADATA: state.session_id}}
             
             # Handle input based on component type
             if agent_type in [AgentType.PORTFOLIO_MANAGER]:
                 # For agents, pass the user query directly
                 print(f"Agent input: {state.user_query}")
-                result = component.invoke({"input": state.user_query})
+                result = component.invoke({"input": state.user_query}, config=config)
             else:
                 # For subgraphs, pass input dict directly
                 print(f"Subgraph input: {state.input}")
-                result = component.invoke(state.input)
+                result = component.invoke(state.input, config=config)
             
             print(f"Component result: {result}")
             
@@ -151,6 +155,22 @@ def handle_component(state: FintechState, agent_type: AgentType) -> FintechState
         state.error = error_msg
         return state
 
+def create_component_registry() -> ComponentRegistry:
+    """
+    Create the registry of the main graph and its components.
+    
+    Returns:
+        Registry that compiles each of them once, on first use or at warm-up
+    """
+    registry = ComponentRegistry()
+    for agent_type, graph_creator in COMPONENT_GRAPHS.items():
+        registry.register(agent_type.value, graph_creator)
+    registry.register(MAIN_GRAPH, create_main_graph)
+    return registry
+
+# Process-wide registry; call component_registry.warm_up() at startup to compile everything ahead of the first query
+component_registry = create_component_registry()
+
 def run_main_graph(
     user_query: str,
     initial_context: Optional[Dict[str, Any]] = None
@@ -165,8 +185,8 @@ def run_main_graph(
     Returns:
         Dict containing the final state
     """
-    # Create the graph
-    graph = create_main_graph()
+    # Get the compiled graph
+    graph = component_registry.get(MAIN_GRAPH)
     
     # Prepare initial state
     initial_state = FintechState(
@@ -175,7 +195,10 @@ def run_main_graph(
     )
     
     # Run the graph
-    result = graph.invoke(initial_state)
+    try:
+        result = graph.invoke(initial_state)
+    finally:
+        reset_python_run(initial_state.session_id)
     
     return result 
 
@@ -211,8 +234,9 @@ async def run_all_use_cases():
         # }
     ]
 
-    # Create the graph
-    graph = create_main_graph()
+    # Compile the main graph and every component before the first query
+    component_registry.warm_up()
+    graph = component_registry.get(MAIN_GRAPH)
     
     # Run each use case
     for use_case in use_cases:
@@ -243,9 +267,14 @@ async def run_all_use_cases():
                 
         except Exception as e:
             print(f"Error executing use case: {str(e)}")
+        finally:
+            reset_python_run(initial_state.session_id)
         
         print(f"\n{'-'*80}\n")
         await asyncio.sleep(1)  # Small delay between use cases
+    
+    print(f"Component registry: {json.dumps(component_registry.stats(), indent=2)}")
+    print(f"Supervisor routing: {json.dumps(get_router_stats(), indent=2)}")
 
 if __name__ == "__main__":
     asyncio.run(run_all_use_cases()) 
\ No newline at end of file
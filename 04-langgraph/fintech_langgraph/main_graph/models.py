@@ -1,3 +1,4 @@
+import uuid
 from typing import List, Dict, Any, Optional, Union
 from pydantic import BaseModel, Field
 from enum import Enum
@@ -19,6 +20,8 @@ class FintechState(BaseModel):
     """State for the main fintech graph"""
     # Core state fields
     user_query: str
+    # Names this run's Python namespaces, so runs never see each other's variables
+    session_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
     current_step: int = Field(default=0)
     final_response: Optional[str] = None
     error: Optional[str] = None
@@ -35,4 +38,8 @@ class FintechState(BaseModel):
     market_research_state: Dict[str, Any] = Field(default_factory=dict)
     
     # Minimal context for routing
-    next_component: Optional[str] = None 
\ No newline at end of file
+    next_component: Optional[str] = None
+    # Components the query needs, in order, and their inputs; once all have responded the supervisor finishes
+    required_components: List[str] = Field(default_factory=list)
+    component_inputs: Dict[str, Any] = Field(default_factory=dict)
+    llm_calls: int = Field(default=0) 
\ No newline at end of file
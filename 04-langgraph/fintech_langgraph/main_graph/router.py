@@ -0,0 +1,238 @@
+"""
+Local routing for the supervisor.
+
+Classifies a user query over the components of the main graph with keyword
+rules and a hashed bag-of-words similarity, and builds each component's input
+from the query without calling the LLM. Queries the router is not confident
+about are left to the LLM supervisor.
+"""
+import logging
+import re
+import sqlite3
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fintech_langgraph.main_graph.models import AgentType
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Phrases that point at a component on their own
+COMPONENT_KEYWORDS = {
+    AgentType.PORTFOLIO_OPTIMIZATION: re.compile(
+        r"\b(rebalanc\w*|optimi[sz]\w*|realloca\w*|asset allocation|allocation of my)\b", re.IGNORECASE),
+    AgentType.PORTFOLIO_MANAGER: re.compile(
+        r"\b((my|the) (portfolio|holdings|positions)|performance|stock price|price of|should i (buy|sell))\b",
+        re.IGNORECASE),
+    AgentType.FINANCIAL_EDUCATION: re.compile(
+        r"\b(learn\w*|teach\w*|explain\w*|beginner|basics|learning path|what does \w+( \w+)? mean)\b",
+        re.IGNORECASE),
+    AgentType.MARKET_RESEARCH: re.compile(
+        r"\b(sector|industry|market (trends?|conditions|sentiment|outlook|analysis)|outlook|growth potential|"
+        r"key players|competitors)\b", re.IGNORECASE),
+}
+
+# Components that already cover another one's request when both match
+SUBSUMES = {AgentType.PORTFOLIO_OPTIMIZATION: [AgentType.PORTFOLIO_MANAGER]}
+
+# Example queries per component, for queries that no keyword decides
+COMPONENT_EXAMPLES = {
+    AgentType.PORTFOLIO_MANAGER: [
+        "What is the current performance of my portfolio?",
+        "How are my holdings doing today?",
+        "What is the current price of AAPL?",
+        "Show me the value of my investments",
+    ],
+    AgentType.FINANCIAL_EDUCATION: [
+        "I want to learn about value investing strategies",
+        "Explain how bonds work",
+        "What is the difference between an ETF and a mutual fund?",
+        "Teach me the basics of diversification",
+    ],
+    AgentType.PORTFOLIO_OPTIMIZATION: [
+        "Rebalance my portfolio for long-term growth",
+        "Optimize my portfolio for income with low risk",
+        "How should I reallocate my portfolio to reduce risk?",
+    ],
+    AgentType.MARKET_RESEARCH: [
+        "Analyze the growth potential of the renewable energy sector",
+        "What are the market trends in technology stocks?",
+        "Research the outlook for healthcare companies over the next year",
+    ],
+}
+
+SECTORS = ["renewable energy", "clean energy", "technology", "tech", "healthcare", "financials", "finance",
+           "banking", "real estate", "energy", "utilities", "consumer staples", "consumer discretionary",
+           "industrials", "materials", "telecommunications", "semiconductors", "biotech", "cryptocurrency",
+           "crypto", "tobacco", "defense", "automotive", "retail"]
+
+TOPICS = ["value investing", "growth investing", "dividend investing", "index funds", "etfs", "mutual funds",
+          "bonds", "options", "stocks", "retirement planning", "retirement", "budgeting", "taxes",
+          "diversification", "risk management", "asset allocation", "real estate", "cryptocurrency",
+          "compound interest", "dollar-cost averaging", "emergency fund", "credit", "debt"]
+
+_SECTORS_RE = re.compile(r"\b(" + "|".join(re.escape(sector) for sector in SECTORS) + r")\b", re.IGNORECASE)
+_TOPICS_RE = re.compile(r"\b(" + "|".join(re.escape(topic) for topic in TOPICS) + r")\b", re.IGNORECASE)
+_TIMEFRAME_RE = re.compile(r"\b(?:next|past|last|over|coming|within)\s+(\d+|one|two|three|five|ten)\s+"
+                           r"(day|week|month|quarter|year)s?\b", re.IGNORECASE)
+_PORTFOLIO_ID_RE = re.compile(r"\b(?:portfolio\s*(?:\(\s*)?(?:id\s*[:#]?\s*|#\s*|number\s*)|id\s*[:#]?\s*)(\d+)",
+                              re.IGNORECASE)
+
+
+def _hash_embedding(text: str, dimensions: int = 512) -> np.ndarray:
+    """Local bag-of-words embedding: hashed word unigrams and bigrams, L2-normalized."""
+    words = re.findall(r"[a-z0-9$']+", text.lower())
+    vector = np.zeros(dimensions)
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        vector[zlib.crc32(feature.encode("utf-8")) % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class LocalRouter:
+    """Picks the components a query needs and builds their inputs, without the LLM."""
+
+    def __init__(self, db_path: str = "fintech.db", min_similarity: float = 0.2, min_margin: float = 0.05):
+        """
+        Initialize the router.
+
+        Args:
+            db_path: SQLite database with the portfolios table, to find a portfolio's user
+            min_similarity: Lowest similarity to the closest component's examples to route without the LLM
+            min_margin: Lowest lead of the closest component over the runner-up
+        """
+        self.db_path = db_path
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.centroids = {
+            agent_type: np.mean([_hash_embedding(example) for example in examples], axis=0)
+            for agent_type, examples in COMPONENT_EXAMPLES.items()
+        }
+
+    def classify(self, query: str) -> Tuple[List[AgentType], str]:
+        """
+        Pick the components a query needs.
+
+        Returns:
+            Tuple of the components to run (one, or none when not confident) and the reason
+        """
+        matches = [agent_type for agent_type, pattern in COMPONENT_KEYWORDS.items() if pattern.search(query)]
+        for agent_type in list(matches):
+            for covered in SUBSUMES.get(agent_type, []):
+                if covered in matches:
+                    matches.remove(covered)
+
+        if len(matches) == 1:
+            return matches, "keyword"
+        if matches:
+            # Keywords of several components: the similarity cannot tell them apart reliably, so the LLM decides
+            return [], f"ambiguous keywords ({', '.join(agent_type.value for agent_type in matches)})"
+
+        vector = _hash_embedding(query)
+        scores = {agent_type: float(vector @ centroid) for agent_type, centroid in self.centroids.items()}
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        best, runner_up = scores[ranked[0]], scores[ranked[1]]
+        if best >= self.min_similarity and best - runner_up >= self.min_margin:
+            return [ranked[0]], f"similarity {best:.2f}"
+        return [], f"low confidence (similarity {best:.2f}, margin {best - runner_up:.2f})"
+
+    def build_input(self, agent_type: AgentType, query: str) -> Optional[Dict[str, Any]]:
+        """Build a component's input from the query, or None if a required field cannot be filled."""
+        if agent_type == AgentType.PORTFOLIO_MANAGER:
+            return {"query": query}
+        if agent_type == AgentType.MARKET_RESEARCH:
+            return self._market_research_input(query)
+        if agent_type == AgentType.FINANCIAL_EDUCATION:
+            return self._financial_education_input(query)
+        if agent_type == AgentType.PORTFOLIO_OPTIMIZATION:
+            return self._portfolio_optimization_input(query)
+        return None
+
+    def _market_research_input(self, query: str) -> Dict[str, Any]:
+        sector = _SECTORS_RE.search(query)
+        timeframe = _TIMEFRAME_RE.search(query)
+        return {
+            "query": query,
+            "sector": sector.group(1).lower() if sector else None,
+            "timeframe": f"{timeframe.group(1)} {timeframe.group(2).lower()}s" if timeframe else None,
+        }
+
+    def _financial_education_input(self, query: str) -> Optional[Dict[str, Any]]:
+        topics = list(dict.fromkeys(match.lower() for match in _TOPICS_RE.findall(query)))
+        if not topics:
+            about = re.search(r"\b(?:learn|know|understand|explain)\w*\s+(?:more\s+)?(?:about\s+)?([^.?!,]{3,60})",
+                              query, re.IGNORECASE)
+            if not about:
+                return None
+            topics = [about.group(1).strip().lower()]
+
+        lowered = query.lower()
+        if re.search(r"\b(advanced|expert|professional)\b", lowered):
+            level = "advanced"
+        elif re.search(r"\b(intermediate|some experience)\b", lowered):
+            level = "intermediate"
+        else:
+            level = "beginner"
+        if re.search(r"\b(practical|step[- ]by[- ]step|hands[- ]on|examples?)\b", lowered):
+            style = "practical"
+        elif re.search(r"\b(theor\w*|concepts?|academic)\b", lowered):
+            style = "theoretical"
+        else:
+            style = "mixed"
+        return {"user_query": query, "user_knowledge_level": level, "topics_of_interest": topics,
+                "learning_style": style, "user_context": {}}
+
+    def _portfolio_optimization_input(self, query: str) -> Optional[Dict[str, Any]]:
+        portfolio_id = _PORTFOLIO_ID_RE.search(query)
+        if not portfolio_id:
+            return None
+        user_id = self._portfolio_user(portfolio_id.group(1))
+        if user_id is None:
+            return None
+
+        lowered = query.lower()
+        if re.search(r"\b(growth|grow|appreciation)\b", lowered):
+            goal = "growth"
+        elif re.search(r"\b(income|dividends?|yield)\b", lowered):
+            goal = "income"
+        else:
+            goal = "balanced"
+        risk = re.search(r"\b(low|medium|moderate|high|conservative|aggressive)\b[\w -]{0,12}\brisk\b", lowered)
+        risk_tolerance = {"moderate": "medium", "conservative": "low", "aggressive": "high"}.get(
+            risk.group(1), risk.group(1)) if risk else "medium"
+        if re.search(r"\b(long[- ]term|retire\w*|decades?)\b", lowered):
+            horizon = "long"
+        elif re.search(r"\b(short[- ]term|next few months)\b", lowered):
+            horizon = "short"
+        else:
+            horizon = "medium"
+
+        constraints: Dict[str, Any] = {}
+        excluded = re.findall(r"\b(?:avoid|exclude|excluding|no|without)\s+(?:any\s+)?([\w -]{3,40})", lowered)
+        sectors = [match.group(1) for text in excluded for match in _SECTORS_RE.finditer(text)]
+        if sectors:
+            constraints["excluded_sectors"] = list(dict.fromkeys(sectors))
+        dividend = re.search(r"(\d+(?:\.\d+)?)\s*%\s*(?:or more\s+)?dividend", lowered)
+        if dividend:
+            constraints["required_dividend"] = float(dividend.group(1))
+        max_position = re.search(r"(?:max(?:imum)?|at most|no more than)\s+(\d+(?:\.\d+)?)\s*%", lowered)
+        if max_position:
+            constraints["max_position"] = float(max_position.group(1))
+
+        return {"user_id": user_id, "portfolio_id": portfolio_id.group(1), "optimization_goal": goal,
+                "risk_tolerance": risk_tolerance, "time_horizon": horizon, "constraints": constraints}
+
+    def _portfolio_user(self, portfolio_id: str) -> Optional[str]:
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                row = conn.execute("SELECT user_id FROM portfolios WHERE portfolio_id = ?",
+                                   (int(portfolio_id),)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not look up the user of portfolio {portfolio_id}: {e}")
+            return None
+        return str(row[0]) if row else None
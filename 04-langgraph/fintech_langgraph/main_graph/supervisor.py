@@ -1,9 +1,11 @@
 import json
+import threading
 from typing import Dict, Any
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import SystemMessage, HumanMessage
 from fintech_langgraph.main_graph.models import FintechState, AgentType
+from fintech_langgraph.main_graph.router import LocalRouter
 from fintech_langgraph.agents.portfolio_optimization.portfolio_optimization_subgraph import create_portfolio_optimization_graph
 from fintech_langgraph.agents.financial_education.financial_education_subgraph import create_financial_education_subgraph
 from fintech_langgraph.agents.market_research.market_research_graph import create_market_research_graph
@@ -98,8 +100,82 @@ Valid component names are:
 - end
 """
 
+# Local router for the first hop; the LLM supervisor is only asked when it is not confident
+router = LocalRouter()
+
+# Supervisor decisions and LLM calls across all queries
+ROUTER_STATS = {"queries": 0, "llm_calls": 0, "local_decisions": 0, "rule_decisions": 0, "llm_decisions": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        ROUTER_STATS[key] += 1
+
+
+def get_router_stats() -> Dict[str, Any]:
+    """Return supervisor decision counts and the average number of LLM calls per query"""
+    with _stats_lock:
+        stats = dict(ROUTER_STATS)
+    stats["llm_calls_per_query"] = stats["llm_calls"] / stats["queries"] if stats["queries"] else 0.0
+    return stats
+
+
+def _apply_decision(state: FintechState, next_component: str, reasoning: str, input_data: Any) -> FintechState:
+    """Update the state with a decision and print it"""
+    state.current_step += 1
+    state.next_component = next_component
+    state.input = input_data
+
+    # Print the decision for visibility
+    print(f"\n=== Step {state.current_step} Decision ===")
+    print(f"Next Component: {next_component}")
+    print(f"Reasoning: {reasoning}")
+    if input_data:
+        print("\nInput Data in decide_next_step:")
+        print(json.dumps(input_data, indent=2))
+    print("===========================\n")
+    print(f"State: {state}")
+    return state
+
+
 def decide_next_step(state: FintechState) -> FintechState:
-    """Decide the next step based on current state"""
+    """Decide the next step based on current state.
+
+    Once the components a query needs are known, the remaining steps follow
+    from a rule: run the ones that have not responded yet, then end (or
+    synthesize, when several responded). The first step is routed locally, and
+    the LLM is only asked when the local router is not confident.
+    """
+    if state.current_step == 0:
+        _count("queries")
+
+    if state.required_components:
+        _count("rule_decisions")
+        responded = {response.agent_type.value for response in state.agent_responses}
+        pending = [component for component in state.required_components if component not in responded]
+        if state.error or not pending:
+            finish = "synthesize" if len(state.required_components) > 1 and not state.error else "end"
+            return _apply_decision(state, finish, "Every required component has responded", {})
+        return _apply_decision(state, pending[0], "Next required component",
+                               state.component_inputs.get(pending[0], {}))
+
+    if state.current_step == 0:
+        components, reason = router.classify(state.user_query)
+        inputs = {component.value: router.build_input(component, state.user_query) for component in components}
+        if components and all(input_data is not None for input_data in inputs.values()):
+            _count("local_decisions")
+            state.required_components = [component.value for component in components]
+            state.component_inputs = inputs
+            return _apply_decision(state, components[0].value, f"Local router ({reason})",
+                                   inputs[components[0].value])
+        print(f"Local router could not decide ({reason or 'missing input fields'}); asking the LLM")
+
+    return decide_with_llm(state)
+
+
+def decide_with_llm(state: FintechState) -> FintechState:
+    """Decide the next step with the LLM supervisor"""
     
     # Create the prompt
     prompt = ChatPromptTemplate.from_messages([
@@ -119,6 +195,8 @@ Please decide the next step and update the state accordingly.""")
     
     # Get the decision from the LLM
     response = llm.invoke(prompt.format_messages())
+    state.llm_calls += 1
+    _count("llm_calls")
     
     try:
         # Parse the response
@@ -127,21 +205,12 @@ Please decide the next step and update the state accordingly.""")
         reasoning = decision["reasoning"]
         input_data = decision.get("input_data", {})
         
-        # Update state
-        state.current_step += 1
-        state.next_component = next_component
-        state.input = input_data
-        
-        # Print the decision for visibility
-        print(f"\n=== Step {state.current_step} Decision ===")
-        print(f"Next Component: {next_component}")
-        print(f"Reasoning: {reasoning}")
-        if input_data:
-            print("\nInput Data in decide_next_step:")
-            print(json.dumps(input_data, indent=2))
-        print("===========================\n")
-        print(f"State: {state}")
-        return state
+        _count("llm_decisions")
+        # The chosen component is the one the query needs; once it has responded, the rule finishes
+        if next_component in [agent_type.value for agent_type in AgentType]:
+            state.required_components = [next_component]
+            state.component_inputs = {next_component: input_data}
+        return _apply_decision(state, next_component, reasoning, input_data)
     except Exception as e:
         state.error = f"Error making decision: {str(e)}"
         return state 
\ No newline at end of file
@@ -0,0 +1,283 @@
+"""
+Batched, cached market data with a Yahoo Finance backend and a local replay backend.
+"""
+
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Quote:
+    """Latest market data for one symbol."""
+    symbol: str
+    price: float
+    previous_close: Optional[float] = None
+    day_low: Optional[float] = None
+    day_high: Optional[float] = None
+    fifty_two_week_low: Optional[float] = None
+    fifty_two_week_high: Optional[float] = None
+    volume: Optional[int] = None
+    as_of: Optional[str] = None
+
+
+def quote_from_history(symbol: str, history: pd.DataFrame) -> Optional[Quote]:
+    """Build a quote from daily OHLCV bars (columns Open, High, Low, Close, Volume), oldest first."""
+    history = history.dropna(subset=["Close"])
+    if history.empty:
+        return None
+    last = history.iloc[-1]
+    year = history[history.index >= history.index[-1] - pd.Timedelta(days=365)]
+    return Quote(
+        symbol=symbol,
+        price=float(last["Close"]),
+        previous_close=float(history["Close"].iloc[-2]) if len(history) > 1 else None,
+        day_low=float(last["Low"]),
+        day_high=float(last["High"]),
+        fifty_two_week_low=float(year["Low"].min()),
+        fifty_two_week_high=float(year["High"].max()),
+        volume=int(last["Volume"]) if pd.notna(last["Volume"]) else None,
+        as_of=history.index[-1].strftime("%Y-%m-%d"),
+    )
+
+
+class MarketDataBackend(ABC):
+    """Source of daily price history. Every call covers a whole batch of symbols."""
+
+    @abstractmethod
+    def fetch_history(self, symbols: List[str], period: str) -> Dict[str, pd.DataFrame]:
+        """Get daily OHLCV bars per symbol. Symbols without data are left out."""
+
+    def fetch_quotes(self, symbols: List[str]) -> Dict[str, Quote]:
+        """Get the latest quote per symbol. Symbols without data are left out."""
+        quotes = {}
+        for symbol, history in self.fetch_history(symbols, "1y").items():
+            quote = quote_from_history(symbol, history)
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+
+class YFinanceBackend(MarketDataBackend):
+    """Yahoo Finance backend: one yf.download call per batch of symbols."""
+
+    def fetch_history(self, symbols: List[str], period: str) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+
+        data = yf.download(symbols, period=period, interval="1d", group_by="ticker",
+                           auto_adjust=False, progress=False, threads=True)
+        if data.empty:
+            return {}
+        if not isinstance(data.columns, pd.MultiIndex):
+            # A single symbol comes back without the ticker level
+            return {symbols[0]: data}
+        histories = {}
+        for symbol in symbols:
+            if symbol in data.columns.get_level_values(0):
+                history = data[symbol].dropna(how="all")
+                if not history.empty:
+                    histories[symbol] = history
+        return histories
+
+
+class ReplayBackend(MarketDataBackend):
+    """Replays daily bars from a local CSV or Parquet file, for tests and benchmarks.
+
+    The file holds one row per symbol and day with columns date, symbol, open,
+    high, low, close and volume. Reading Parquet needs pyarrow.
+    """
+
+    # Trading days covered by the yfinance period strings
+    PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260}
+
+    def __init__(self, path: str, as_of: Optional[str] = None):
+        """Load the replay file.
+
+        Args:
+            path: CSV or Parquet file with daily bars
+            as_of: Optional date (YYYY-MM-DD) to replay up to, instead of the last day in the file
+        """
+        if path.endswith(".parquet"):
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path)
+        frame.columns = [column.lower() for column in frame.columns]
+        frame["date"] = pd.to_datetime(frame["date"])
+        frame["symbol"] = frame["symbol"].str.upper()
+        if as_of:
+            frame = frame[frame["date"] <= pd.Timestamp(as_of)]
+        frame = frame.rename(columns={"open": "Open", "high": "High", "low": "Low",
+                                      "close": "Close", "volume": "Volume"})
+        self._histories = {
+            symbol: group.set_index("date").sort_index()[["Open", "High", "Low", "Close", "Volume"]]
+            for symbol, group in frame.groupby("symbol")
+        }
+
+    def fetch_history(self, symbols: List[str], period: str) -> Dict[str, pd.DataFrame]:
+        days = self.PERIOD_DAYS.get(period)
+        return {
+            symbol: self._histories[symbol] if days is None else self._histories[symbol].iloc[-days:]
+            for symbol in symbols if symbol in self._histories
+        }
+
+
+class MarketDataProvider:
+    """Batched market data with a TTL cache and in-flight request coalescing.
+
+    Cached symbols are answered from memory, and all the missing symbols of a
+    call are fetched from the backend in one batch. A symbol that another
+    thread is already fetching is not requested again; the caller waits for
+    that fetch instead.
+    """
+
+    def __init__(self, backend: MarketDataBackend, quote_ttl: float = 60.0, history_ttl: float = 3600.0):
+        """Initialize the provider.
+
+        Args:
+            backend: Where market data comes from
+            quote_ttl: Seconds a quote is served from the cache
+            history_ttl: Seconds a price history is served from the cache
+        """
+        self.backend = backend
+        self.quote_ttl = quote_ttl
+        self.history_ttl = history_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+        # (kind, symbol) -> (fetched at, value)
+        self._cache: Dict[tuple, tuple] = {}
+        # (kind, symbol) -> Future of the fetch in progress
+        self._in_flight: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def get_quotes(self, symbols: Iterable[str]) -> Dict[str, Quote]:
+        """Get the latest quotes for a batch of symbols. Unknown symbols are left out."""
+        return self._get_batch("quote", symbols, self.quote_ttl, self.backend.fetch_quotes)
+
+    def get_quote(self, symbol: str) -> Optional[Quote]:
+        """Get the latest quote for one symbol, or None if it is unknown."""
+        return self.get_quotes([symbol]).get(symbol.strip().upper())
+
+    def get_history(self, symbols: Iterable[str], period: str = "1y") -> Dict[str, pd.DataFrame]:
+        """Get daily OHLCV bars for a batch of symbols. Unknown symbols are left out."""
+        return self._get_batch(f"history:{period}", symbols, self.history_ttl,
+                               lambda batch: self.backend.fetch_history(batch, period))
+
+    def _get_batch(self, kind: str, symbols: Iterable[str], ttl: float,
+                   fetch: Callable[[List[str]], Dict[str, object]]) -> Dict[str, object]:
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol and symbol.strip()))
+        results: Dict[str, object] = {}
+        waiting: Dict[str, Future] = {}
+        to_fetch: List[str] = []
+        now = time.monotonic()
+
+        with self._lock:
+            for symbol in symbols:
+                key = (kind, symbol)
+                cached = self._cache.get(key)
+                if cached is not None and now - cached[0] < ttl:
+                    self.hits += 1
+                    if cached[1] is not None:
+                        results[symbol] = cached[1]
+                elif key in self._in_flight:
+                    self.coalesced += 1
+                    waiting[symbol] = self._in_flight[key]
+                else:
+                    self.misses += 1
+                    self._in_flight[key] = Future()
+                    to_fetch.append(symbol)
+            if to_fetch:
+                self.fetches += 1
+
+        if to_fetch:
+            futures = {symbol: self._in_flight[(kind, symbol)] for symbol in to_fetch}
+            logger.info(f"Fetching {kind} for {len(to_fetch)} symbol(s): {', '.join(to_fetch)}")
+            try:
+                fetched = fetch(to_fetch)
+            except Exception as e:
+                logger.error(f"Error fetching {kind} for {', '.join(to_fetch)}: {str(e)}")
+                with self._lock:
+                    for symbol in to_fetch:
+                        del self._in_flight[(kind, symbol)]
+                for future in futures.values():
+                    future.set_exception(e)
+                raise
+            fetched_at = time.monotonic()
+            with self._lock:
+                for symbol in to_fetch:
+                    # Unknown symbols are cached too, so they are not fetched again on every call
+                    self._cache[(kind, symbol)] = (fetched_at, fetched.get(symbol))
+                    del self._in_flight[(kind, symbol)]
+            for symbol, future in futures.items():
+                future.set_result(fetched.get(symbol))
+                if fetched.get(symbol) is not None:
+                    results[symbol] = fetched[symbol]
+
+        for symbol, future in waiting.items():
+            value = future.result()
+            if value is not None:
+                results[symbol] = value
+
+        return {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+    def stats(self) -> Dict[str, float]:
+        """Return cache and batching metrics for the provider."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "backend_fetches": self.fetches,
+            }
+
+
+def format_quote(quote: Quote) -> str:
+    """Describe a quote in one line for the agent."""
+    text = f"The current price of {quote.symbol} is ${quote.price:.2f}"
+    if quote.previous_close:
+        change = (quote.price / quote.previous_close - 1) * 100
+        text += f" ({change:+.2f}% from the previous close of ${quote.previous_close:.2f})"
+    return text
+
+
+def parse_symbols(text: str) -> List[str]:
+    """Split tool input such as 'AAPL, msft GOOGL' into symbols."""
+    return [symbol.strip().upper().lstrip("$") for symbol in text.replace(",", " ").split() if symbol.strip()]
+
+
+_shared_provider: Optional[MarketDataProvider] = None
+_shared_lock = threading.Lock()
+
+
+def get_market_data_provider() -> MarketDataProvider:
+    """Get the process-wide market data provider.
+
+    Set MARKET_DATA_REPLAY_PATH to a CSV or Parquet file of daily bars to replay
+    local data instead of calling Yahoo Finance (and MARKET_DATA_REPLAY_AS_OF to
+    replay up to a given date).
+    """
+    global _shared_provider
+    with _shared_lock:
+        if _shared_provider is None:
+            replay_path = os.getenv("MARKET_DATA_REPLAY_PATH")
+            if replay_path:
+                logger.info(f"Replaying market data from {replay_path}")
+                backend = ReplayBackend(replay_path, as_of=os.getenv("MARKET_DATA_REPLAY_AS_OF"))
+            else:
+                backend = YFinanceBackend()
+            _shared_provider = MarketDataProvider(backend)
+        return _shared_provider
@@ -0,0 +1,355 @@
+"""
+Pool of pre-warmed, resource-limited Python worker processes for the agents' Python tool.
+"""
+
+import ast
+import contextlib
+import importlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+from langchain_core.tools import BaseTool
+
+try:
+    import resource
+    import signal
+except ImportError:  # Windows: no rlimits, only the wall-clock timeout applies
+    resource = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Modules imported once per worker and available in every session namespace
+PRELOADED_MODULES = {"np": "numpy", "pd": "pandas", "plt": "matplotlib.pyplot"}
+# Runnable config metadata key naming the run whose Python namespaces a tool call belongs to
+RUN_SESSION_METADATA = "python_run_session"
+# Worker processes of the shared pool; no more Python calls than this can run at once
+POOL_SIZE = 2
+
+
+class CPULimitExceeded(BaseException):
+    """Raised inside a worker when a call uses up its CPU time.
+
+    A BaseException, like KeyboardInterrupt, so code that catches Exception cannot swallow it.
+    """
+
+
+def sanitize_input(code: str) -> str:
+    """Strip whitespace, markdown code fences and a leading 'python' from model-written code."""
+    code = re.sub(r"^(\s|`)*(?i:python)?\s*", "", code)
+    return re.sub(r"(\s|`)*$", "", code)
+
+
+def _set_memory_limit(memory_limit_mb: int) -> None:
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _set_cpu_limit(cpu_seconds: Optional[float]) -> None:
+    """Let the worker use cpu_seconds more CPU time (None removes the limit)."""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if cpu_seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _on_cpu_limit(signum, frame):
+    raise CPULimitExceeded("CPU time limit exceeded")
+
+
+def _execute(code: str, namespace: dict, cpu_seconds: float, max_output_chars: int) -> tuple:
+    """Run code in a namespace, returning its printed output and the value of a trailing expression."""
+    output = io.StringIO()
+    try:
+        tree = ast.parse(code)
+        last_expression = None
+        if tree.body and isinstance(tree.body[-1], ast.Expr):
+            last_expression = ast.Expression(tree.body.pop().value)
+        _set_cpu_limit(cpu_seconds)
+        try:
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                exec(compile(tree, "<python>", "exec"), namespace)
+                if last_expression is not None:
+                    value = eval(compile(last_expression, "<python>", "eval"), namespace)
+                    if value is not None:
+                        print(repr(value))
+        finally:
+            _set_cpu_limit(None)
+    except MemoryError:
+        output.write("MemoryError: the code exceeded the memory limit")
+    except CPULimitExceeded as e:
+        output.write(f"CPULimitExceeded: {e}")
+    except Exception as e:
+        output.write(f"{type(e).__name__}: {e}")
+    text = output.getvalue()
+    if len(text) > max_output_chars:
+        text = text[:max_output_chars] + f"\n... (output truncated to {max_output_chars} characters)"
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource is not None else 0.0
+    return text, max_rss_mb
+
+
+def _worker_main(conn, memory_limit_mb: int, max_output_chars: int) -> None:
+    """Worker process: import the analysis libraries once, then run code for many sessions."""
+    # Plots can only be saved to files, never shown
+    os.environ["MPLBACKEND"] = "Agg"
+    preloaded = {}
+    for alias, module_name in PRELOADED_MODULES.items():
+        try:
+            preloaded[alias] = importlib.import_module(module_name)
+        except ImportError:
+            pass
+
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    _set_memory_limit(memory_limit_mb)
+    namespaces: Dict[str, dict] = {}
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        command = message[0]
+        if command == "stop":
+            break
+        if command == "reset":
+            namespaces.pop(message[1], None)
+            conn.send(("", 0.0))
+            continue
+        _, session_id, code, cpu_seconds = message
+        namespace = namespaces.setdefault(session_id, {"__name__": "__main__", **preloaded})
+        conn.send(_execute(code, namespace, cpu_seconds, max_output_chars))
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.calls = 0
+        self.sessions = set()
+        self.lock = threading.Lock()
+
+
+class PythonWorkerPool:
+    """Pool of pre-warmed Python worker processes for the agents' Python tool.
+
+    Workers import pandas, numpy and matplotlib once at start. Each session is
+    pinned to one worker and keeps its own namespace there, so DataFrames survive
+    between calls. Every call runs under a CPU time limit, the worker under a
+    memory limit, and a call that runs past the timeout kills its worker. Workers
+    are recycled after a number of calls or once their memory grows too large;
+    sessions on a replaced worker start again with an empty namespace.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, timeout: float = 30.0, cpu_limit_seconds: float = 20.0,
+                 memory_limit_mb: int = 2048, max_calls_per_worker: int = 200, recycle_rss_mb: int = 1024,
+                 max_output_chars: int = 10_000):
+        """Start the worker processes.
+
+        Args:
+            size: Number of worker processes
+            timeout: Seconds of wall-clock time a call may take before its worker is killed
+            cpu_limit_seconds: Seconds of CPU time a call may use
+            memory_limit_mb: Address space limit of each worker
+            max_calls_per_worker: Calls after which a worker is replaced
+            recycle_rss_mb: Peak resident memory after which a worker is replaced
+            max_output_chars: Longest output returned to the agent
+        """
+        self.size = size
+        self.timeout = timeout
+        self.cpu_limit_seconds = cpu_limit_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.max_calls_per_worker = max_calls_per_worker
+        self.recycle_rss_mb = recycle_rss_mb
+        self.max_output_chars = max_output_chars
+
+        self.calls = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycled = 0
+        # Spawn, so workers do not inherit the threads and state of the app process
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[_Worker] = [self._start_worker() for _ in range(size)]
+        self._session_workers: Dict[str, int] = {}
+        # Sessions whose namespace was lost since their last call
+        self._reset_sessions = set()
+        self._lock = threading.Lock()
+
+    def _start_worker(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.memory_limit_mb, self.max_output_chars),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _worker_index(self, session_id: str) -> int:
+        with self._lock:
+            if session_id not in self._session_workers:
+                # Pin new sessions to the worker with the fewest sessions
+                index = min(range(self.size), key=lambda i: len(self._workers[i].sessions))
+                self._session_workers[session_id] = index
+                self._workers[index].sessions.add(session_id)
+            return self._session_workers[session_id]
+
+    def _replace_worker(self, index: int) -> None:
+        """Kill a worker and start a fresh one. Called with the worker's lock held."""
+        worker = self._workers[index]
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=5)
+        worker.conn.close()
+        with self._lock:
+            self._reset_sessions.update(worker.sessions)
+            for session_id in worker.sessions:
+                self._session_workers.pop(session_id, None)
+            self._workers[index] = self._start_worker()
+
+    def run(self, code: str, session_id: str = "default") -> str:
+        """Run code in a session's namespace and return its output."""
+        code = sanitize_input(code)
+        index = self._worker_index(session_id)
+        worker = self._workers[index]
+        with worker.lock:
+            if self._workers[index] is not worker:
+                # The worker was replaced while waiting for its lock
+                return self.run(code, session_id)
+            with self._lock:
+                self.calls += 1
+                note = ""
+                if session_id in self._reset_sessions:
+                    self._reset_sessions.discard(session_id)
+                    note = "Note: the Python session was reset, so variables from earlier calls are gone.\n"
+
+            try:
+                worker.conn.send(("run", session_id, code, self.cpu_limit_seconds))
+                if not worker.conn.poll(self.timeout):
+                    with self._lock:
+                        self.timeouts += 1
+                    logger.warning(f"Python call of session {session_id} timed out, replacing worker {index}")
+                    self._replace_worker(index)
+                    return f"{note}Error: the code did not finish within {self.timeout:.0f} seconds and was stopped."
+                output, max_rss_mb = worker.conn.recv()
+            except (EOFError, OSError):
+                with self._lock:
+                    self.crashes += 1
+                logger.warning(f"Python worker {index} crashed during a call of session {session_id}")
+                self._replace_worker(index)
+                return f"{note}Error: the Python worker crashed, most likely by exceeding its memory or CPU limit."
+
+            worker.calls += 1
+            if worker.calls >= self.max_calls_per_worker or max_rss_mb >= self.recycle_rss_mb:
+                with self._lock:
+                    self.recycled += 1
+                logger.info(f"Recycling Python worker {index} after {worker.calls} calls ({max_rss_mb:.0f} MB peak)")
+                self._replace_worker(index)
+            return note + output
+
+    def reset_run(self, run_session: str) -> None:
+        """Drop the namespaces of every session of one run (session ids '<run_session>:<name>')."""
+        with self._lock:
+            session_ids = [session_id for session_id in self._session_workers
+                           if session_id.startswith(f"{run_session}:")]
+        for session_id in session_ids:
+            self.reset_session(session_id)
+
+    def reset_session(self, session_id: str) -> None:
+        """Drop a session's namespace."""
+        with self._lock:
+            index = self._session_workers.pop(session_id, None)
+            self._reset_sessions.discard(session_id)
+        if index is None:
+            return
+        worker = self._workers[index]
+        with worker.lock:
+            worker.sessions.discard(session_id)
+            try:
+                worker.conn.send(("reset", session_id))
+                worker.conn.recv()
+            except (EOFError, OSError):
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """Return call, timeout, crash and recycling counts for the pool."""
+        with self._lock:
+            return {
+                "workers": self.size,
+                "sessions": len(self._session_workers),
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+                "recycled": self.recycled,
+            }
+
+    def shutdown(self) -> None:
+        """Stop every worker process."""
+        for worker in self._workers:
+            with worker.lock:
+                try:
+                    worker.conn.send(("stop",))
+                except (EOFError, OSError):
+                    pass
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.process.kill()
+
+
+_shared_pool: Optional[PythonWorkerPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_python_worker_pool() -> PythonWorkerPool:
+    """Get the process-wide Python worker pool, starting its workers on first use."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            logger.info("Starting Python worker pool")
+            _shared_pool = PythonWorkerPool()
+        return _shared_pool
+
+
+def reset_python_run(run_session: str) -> None:
+    """Drop the namespaces a run created in the shared pool, without starting the pool for it."""
+    with _shared_lock:
+        pool = _shared_pool
+    if pool is not None:
+        pool.reset_run(run_session)
+
+
+class PythonWorkerTool(BaseTool):
+    """Python tool that runs code in the shared worker pool instead of in-process.
+
+    Calls made under a runnable config whose metadata sets RUN_SESSION_METADATA
+    get a namespace of their own for that run; reset_python_run drops it once
+    the run is over.
+    """
+
+    name: str = "Python_REPL"
+    description: str = (
+        "A Python shell. Use this to execute python commands. Input should be a valid python command. "
+        "pandas (pd), numpy (np) and matplotlib.pyplot (plt) are already imported, and variables such as "
+        "DataFrames persist between calls. If you want to see the output of a value, you should print it "
+        "out with `print(...)` or end with an expression."
+    )
+    session_id: str = "default"
+
+    def _run(self, query: str, run_manager=None) -> str:
+        run_session = run_manager.metadata.get(RUN_SESSION_METADATA) if run_manager else None
+        session_id = f"{run_session}:{self.session_id}" if run_session else self.session_id
+        return get_python_worker_pool().run(query, session_id=session_id)
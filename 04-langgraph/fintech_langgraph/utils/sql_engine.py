@@ -0,0 +1,355 @@
+"""
+Shared database engines, cached schema reflection and a query result cache for the SQL tools.
+"""
+
+import contextvars
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
+from langchain_community.tools.sql_database.tool import QuerySQLDataBaseTool
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+_engines: Dict[Tuple[str, bool], Engine] = {}
+_databases: Dict[str, "CachedSQLDatabase"] = {}
+_lock = threading.Lock()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Table holding a data version per table, bumped by triggers on every write
+VERSIONS_TABLE = "table_versions"
+
+# Name of the tool (and scope) currently running a query, used for per-tool cache metrics
+_current_tool = contextvars.ContextVar("current_sql_tool", default="sql_database")
+
+# String literals, quoted identifiers, numbers, words and operators
+_SQL_TOKEN_RE = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]"
+    r"|\d+(?:\.\d+)?|[A-Za-z_][A-Za-z0-9_$]*|<=|>=|<>|!=|==|\|\||\S"
+)
+_WRITE_KEYWORDS = {"INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER",
+                   "ATTACH", "DETACH", "PRAGMA", "VACUUM", "REINDEX"}
+
+
+def _configure_sqlite(read_only: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA busy_timeout = 30000")
+        if read_only:
+            # Query tools can never modify the database through this pool
+            cursor.execute("PRAGMA query_only = ON")
+        else:
+            # WAL lets readers run while a writer is active; the setting persists in the file
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+    return on_connect
+
+
+def get_engine(uri: str, read_only: bool = False) -> Engine:
+    """Get the process-wide SQLAlchemy engine (and connection pool) for a database URI.
+
+    Args:
+        uri: Database URI, e.g. sqlite:///fintech.db
+        read_only: Return the read-only pool used by query tools
+    """
+    key = (uri, read_only)
+    with _lock:
+        if key not in _engines:
+            if read_only and (uri, False) not in _engines:
+                # The writer pool switches the database to WAL mode on its first connection
+                _engines[(uri, False)] = _create_engine(uri, read_only=False)
+                _engines[(uri, False)].connect().close()
+            _engines[key] = _create_engine(uri, read_only)
+        return _engines[key]
+
+
+def _create_engine(uri: str, read_only: bool) -> Engine:
+    engine = create_engine(
+        uri,
+        pool_size=5,
+        max_overflow=10,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    event.listen(engine, "connect", _configure_sqlite(read_only))
+    return engine
+
+
+def normalize_sql(sql: str) -> Tuple[str, List[str]]:
+    """Normalize a query so equivalent spellings share a cache entry.
+
+    Whitespace is collapsed, keywords and identifiers are uppercased (string
+    literals are kept as they are) and the items of literal IN lists are sorted.
+
+    Returns:
+        Tuple of the normalized SQL and its tokens
+    """
+    tokens = []
+    for token in _SQL_TOKEN_RE.findall(sql.strip().rstrip(";")):
+        if token[0] in "'\"`[" or token[0].isdigit():
+            tokens.append(token)
+        else:
+            tokens.append(token.upper())
+
+    # Sort literal lists: IN ('b', 'a') -> IN ('a', 'b')
+    i = 0
+    while i < len(tokens):
+        if tokens[i] == "IN" and i + 1 < len(tokens) and tokens[i + 1] == "(":
+            end = tokens.index(")", i + 2) if ")" in tokens[i + 2:] else -1
+            items = tokens[i + 2:end:2] if end > 0 else []
+            commas = tokens[i + 3:end:2] if end > 0 else []
+            if items and all(item[0] in "'0123456789" for item in items) and all(c == "," for c in commas):
+                tokens[i + 2:end:2] = sorted(items)
+            i = end if end > 0 else i + 1
+        i += 1
+    return " ".join(tokens), tokens
+
+
+def _identifier_names(tokens: List[str]) -> set:
+    """Uppercased names of the words and quoted identifiers ("x", `x`, [x]) among normalized tokens."""
+    names = set()
+    for token in tokens:
+        if token[0] == '"':
+            names.add(token[1:-1].replace('""', '"').upper())
+        elif token[0] in "`[":
+            names.add(token[1:-1].upper())
+        elif token[0] != "'" and not token[0].isdigit():
+            names.add(token)
+    return names
+
+
+class QueryResultCache:
+    """LRU cache of query results, keyed by normalized SQL and the data versions of the tables it reads."""
+
+    def __init__(self, max_entries: int = 512, max_result_chars: int = 200_000):
+        self.max_entries = max_entries
+        self.max_result_chars = max_result_chars
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, tool: str) -> Optional[str]:
+        with self._lock:
+            stats = self._stats.setdefault(tool, {"hits": 0, "misses": 0, "uncached": 0})
+            result = self._entries.get(key)
+            if result is None:
+                stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            stats["hits"] += 1
+            return result
+
+    def put(self, key: tuple, result: str) -> None:
+        if len(result) > self.max_result_chars:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def count_uncached(self, tool: str) -> None:
+        with self._lock:
+            self._stats.setdefault(tool, {"hits": 0, "misses": 0, "uncached": 0})["uncached"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counts and hit rate per tool."""
+        with self._lock:
+            report = {}
+            for tool, stats in self._stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                report[tool] = {**stats, "hit_rate": stats["hits"] / lookups if lookups else 0.0}
+            report["entries"] = len(self._entries)
+            return report
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """SQLDatabase that keeps the table list and table info (schema and sample rows) in memory.
+
+    The snapshot is refreshed only when SQLite's schema_version changes, so
+    sql_db_schema and sql_db_list_tables are answered without re-reflecting.
+    SELECT results are cached per normalized query; triggers bump a per-table
+    data version on every write, so a write invalidates exactly the cached
+    results that read the written table.
+    """
+
+    def __init__(self, engine: Engine, writer_engine: Optional[Engine] = None,
+                 query_cache: Optional[QueryResultCache] = None, **kwargs):
+        self._init_kwargs = kwargs
+        self._writer_engine = writer_engine
+        self.query_cache = query_cache or QueryResultCache()
+        self._table_info_cache: Dict[Tuple[str, ...], str] = {}
+        self._usable_tables_cache: Optional[List[str]] = None
+        # Reentrant: SQLDatabase.get_table_info calls get_usable_table_names
+        self._cache_lock = threading.RLock()
+        # None while SQLDatabase.__init__ is still reflecting the schema
+        self._snapshot_version: Optional[int] = None
+        self._install_version_triggers(engine)
+        super().__init__(engine, **kwargs)
+        self._snapshot_version = self._schema_version()
+
+    def _schema_version(self) -> int:
+        with self._engine.connect() as conn:
+            return conn.exec_driver_sql("PRAGMA schema_version").scalar()
+
+    def _install_version_triggers(self, engine: Engine) -> None:
+        """Create the data version table and write triggers for every table that lacks them.
+
+        The versions of all tables are bumped, since writes made while the
+        triggers were missing went unrecorded.
+        """
+        if self._writer_engine is None:
+            return
+        with self._writer_engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (table_name TEXT PRIMARY KEY, version INTEGER)"
+            )
+            tables = [row[0] for row in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            ) if row[0] != VERSIONS_TABLE]
+            for table in tables:
+                for operation in ("INSERT", "UPDATE", "DELETE"):
+                    conn.exec_driver_sql(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{operation.lower()}
+                    AFTER {operation} ON "{table}"
+                    BEGIN
+                        INSERT INTO {VERSIONS_TABLE} (table_name, version) VALUES ('{table}', 1)
+                        ON CONFLICT (table_name) DO UPDATE SET version = version + 1;
+                    END''')
+                conn.exec_driver_sql(f'''
+                INSERT INTO {VERSIONS_TABLE} (table_name, version) VALUES ('{table}', 1)
+                ON CONFLICT (table_name) DO UPDATE SET version = version + 1''')
+
+    def _clear_snapshot(self) -> None:
+        self._table_info_cache.clear()
+        self._usable_tables_cache = None
+
+    def _check_schema(self) -> None:
+        """Drop the snapshot and reflect the schema again if it changed."""
+        if self._snapshot_version is None:
+            return
+        version = self._schema_version()
+        if version == self._snapshot_version:
+            return
+        logger.info(f"Schema of {self._engine.url} changed, refreshing table info")
+        # New tables need version triggers too
+        self._install_version_triggers(self._engine)
+        self._snapshot_version = self._schema_version()
+        self._clear_snapshot()
+        super().__init__(self._engine, **self._init_kwargs)
+
+    def get_usable_table_names(self) -> Iterable[str]:
+        with self._cache_lock:
+            self._check_schema()
+            if self._usable_tables_cache is None:
+                self._usable_tables_cache = [table for table in super().get_usable_table_names()
+                                             if table != VERSIONS_TABLE]
+            return list(self._usable_tables_cache)
+
+    def get_table_info(self, table_names: Optional[List[str]] = None) -> str:
+        with self._cache_lock:
+            self._check_schema()
+            key = tuple(sorted(table_names)) if table_names else ()
+            if key not in self._table_info_cache:
+                self._table_info_cache[key] = super().get_table_info(table_names)
+            return self._table_info_cache[key]
+
+    def run(self, command, fetch="all", include_columns=False, **kwargs):
+        """Execute a SQL command, answering repeated SELECTs from the result cache."""
+        # run_no_throw passes parameters=None and execution_options=None explicitly
+        extra_options = any(value is not None for value in kwargs.values())
+        if not isinstance(command, str) or fetch != "all" or include_columns or extra_options:
+            return super().run(command, fetch, include_columns, **kwargs)
+        return self.run_cached(command)
+
+    def run_cached(self, command: str) -> str:
+        """Run a query through the result cache."""
+        tool = _current_tool.get()
+        normalized, tokens = normalize_sql(command)
+        if not tokens or tokens[0] not in ("SELECT", "WITH") or _WRITE_KEYWORDS.intersection(tokens):
+            self.query_cache.count_uncached(tool)
+            return super().run(command)
+
+        # Any known table name among the tokens counts as read; over-matching only costs a miss
+        names = _identifier_names(tokens)
+        read_tables = sorted(table for table in self.get_usable_table_names() if table.upper() in names)
+        if not read_tables:
+            # Nothing a write would invalidate the entry by
+            self.query_cache.count_uncached(tool)
+            return super().run(command)
+        # Read the versions before the query, so a concurrent write can never be cached as current
+        versions = self._table_versions(read_tables)
+        key = (normalized, versions)
+
+        result = self.query_cache.get(key, tool)
+        if result is None:
+            result = super().run(command)
+            self.query_cache.put(key, result)
+        return result
+
+    def _table_versions(self, tables: List[str]) -> tuple:
+        if not tables:
+            return ()
+        placeholders = ", ".join("?" * len(tables))
+        with self._engine.connect() as conn:
+            rows = dict(conn.exec_driver_sql(
+                f"SELECT table_name, version FROM {VERSIONS_TABLE} WHERE table_name IN ({placeholders})",
+                tuple(tables),
+            ).fetchall())
+        return tuple((table, rows.get(table, 0)) for table in tables)
+
+    def query_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Result cache hit/miss metrics per tool."""
+        return self.query_cache.stats()
+
+
+class CachedQuerySQLDataBaseTool(QuerySQLDataBaseTool):
+    """sql_db_query tool whose cache hits and misses are reported under its own scope.
+
+    Listeners are called with the query and its result after every successful run.
+    """
+
+    scope: str = "default"
+    query_listeners: List[Callable[[str, str], None]] = []
+
+    def _run(self, query: str, run_manager=None):
+        token = _current_tool.set(f"{self.name}:{self.scope}")
+        try:
+            result = self.db.run_no_throw(query)
+        finally:
+            _current_tool.reset(token)
+        if not result.startswith("Error:"):
+            for listener in self.query_listeners:
+                listener(query, result)
+        return result
+
+
+class CachedSQLDatabaseToolkit(SQLDatabaseToolkit):
+    """SQLDatabaseToolkit whose query tool reports result cache metrics under a scope name."""
+
+    scope: str = "default"
+
+    def get_tools(self):
+        tools = super().get_tools()
+        for i, tool in enumerate(tools):
+            if isinstance(tool, QuerySQLDataBaseTool):
+                tools[i] = CachedQuerySQLDataBaseTool(db=self.db, description=tool.description, scope=self.scope)
+        return tools
+
+
+def get_sql_database(uri: str) -> CachedSQLDatabase:
+    """Get the process-wide SQLDatabase for query tools, backed by the read-only pool."""
+    with _lock:
+        database = _databases.get(uri)
+    if database is None:
+        logger.info(f"Reflecting schema of {uri}")
+        database = CachedSQLDatabase(get_engine(uri, read_only=True), writer_engine=get_engine(uri))
+        with _lock:
+            database = _databases.setdefault(uri, database)
+    return database
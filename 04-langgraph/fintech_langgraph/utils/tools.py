@@ -2,14 +2,13 @@
 Utility functions for tool management.
 """
 
-from langchain_community.utilities import SQLDatabase
-from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
 from langchain_openai import ChatOpenAI
+from fintech_langgraph.utils.sql_engine import CachedSQLDatabaseToolkit, get_sql_database
 
-# Initialize database connection and toolkit
-db = SQLDatabase.from_uri("sqlite:///fintech.db")
+# Initialize database connection and toolkit on the shared read-only pool
+db = get_sql_database("sqlite:///fintech.db")
 llm = ChatOpenAI(model="gpt-4o-mini")
-toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+toolkit = CachedSQLDatabaseToolkit(db=db, llm=llm, scope="tools")
 
 # Export the toolkit directly
 __all__ = ["toolkit"] 
\ No newline at end of file